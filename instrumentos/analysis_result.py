@@ -0,0 +1,203 @@
+"""
+Analysis Result Module
+Compact result of analyze_audio that keeps no decoded audio in memory
+
+The decoded signal is dropped as soon as the analysis is done; only a
+few milliseconds of waveform are kept for display. Anything else (an
+envelope of the whole file, a range of samples) is read back from the
+file on demand through a lazy view (memory-mapped AudioView for WAV,
+decoding StreamView for compressed formats).
+"""
+
+import numpy as np
+from decoders import open_audio
+from waveform_lod import EnvelopePyramid
+
+
+# Length of the waveform kept with every result, in seconds
+PREVIEW_SECONDS = 0.05
+
+
+class AnalysisResult:
+    """
+    Result of analyzing one audio file
+    
+    Fields are attributes, but the object also behaves like the dict that
+    analyze_audio used to return (result['note'], result.get('cents')),
+    and pickles to a few hundred bytes plus the short preview.
+    """
+    
+    FIELDS = ('frequency', 'note', 'exact_frequency', 'cents', 'note_formatted',
+              'tuning_status', 'sample_rate', 'duration', 'success', 'error')
+    
+    __slots__ = FIELDS + ('file_path', '_preview', '_envelope', '_lod')
+    
+    def __init__(self, file_path, success=True, error=None, frequency=None, note=None,
+                 exact_frequency=None, cents=None, note_formatted=None, tuning_status=None,
+                 sample_rate=None, duration=None, preview=None):
+        """
+        Args:
+            file_path (str): Analyzed file, used to reload samples on demand
+            success (bool): Whether the analysis succeeded
+            error (str): Error message of a failed analysis
+            frequency (float): Detected fundamental frequency
+            note (str): Closest musical note
+            exact_frequency (float): Exact frequency of the note
+            cents (float): Deviation in cents
+            note_formatted (str): Formatted note name
+            tuning_status (str): Tuning status label
+            sample_rate (int): Audio sample rate
+            duration (float): Audio duration in seconds
+            preview (numpy.array): First samples of the signal (optional)
+        """
+        self.file_path = file_path
+        self.success = success
+        self.error = error
+        self.frequency = frequency
+        self.note = note
+        self.exact_frequency = exact_frequency
+        self.cents = cents
+        self.note_formatted = note_formatted
+        self.tuning_status = tuning_status
+        self.sample_rate = sample_rate
+        self.duration = duration
+        self._preview = preview
+        self._envelope = None
+        self._lod = None
+    
+    @classmethod
+    def from_dict(cls, file_path, fields):
+        """
+        Rebuild a result from to_dict() output (e.g. a cache entry)
+        
+        Args:
+            file_path (str): Analyzed file
+            fields (dict): Result fields
+            
+        Returns:
+            AnalysisResult: The result, without a preview
+        """
+        return cls(file_path, **{key: fields.get(key) for key in cls.FIELDS})
+    
+    def __getstate__(self):
+        # Envelope and LOD pyramid are caches: recomputed on demand after unpickling
+        return {key: getattr(self, key) for key in self.FIELDS + ('file_path', '_preview')}
+    
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+        self._envelope = None
+        self._lod = None
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key):
+        return key in self.FIELDS
+    
+    def get(self, key, default=None):
+        """Field value by name, like dict.get"""
+        return getattr(self, key) if key in self.FIELDS else default
+    
+    def keys(self):
+        return self.FIELDS
+    
+    def to_dict(self):
+        """
+        Returns:
+            dict: Result fields only (JSON-serializable, no samples)
+        """
+        return {key: getattr(self, key) for key in self.FIELDS}
+    
+    def __repr__(self):
+        if not self.success:
+            return f"AnalysisResult({self.file_path!r}, error={self.error!r})"
+        return (f"AnalysisResult({self.file_path!r}, note={self.note!r}, "
+                f"frequency={self.frequency:.2f}, cents={self.cents:+.1f})")
+    
+    def _open(self):
+        return open_audio(self.file_path)
+    
+    def load_samples(self, start=0, stop=None):
+        """
+        Read a range of samples back from the file
+        
+        Args:
+            start (int): First sample
+            stop (int): One past the last sample (default: end of file)
+            
+        Returns:
+            numpy.array: Mono float32 samples
+        """
+        audio = self._open()
+        try:
+            return audio.read(start, audio.num_samples if stop is None else stop)
+        finally:
+            audio.close()
+    
+    def waveform_preview(self):
+        """
+        The first PREVIEW_SECONDS of the signal
+        
+        Returns:
+            numpy.array: Mono float32 samples (read from the file if the
+                result was created without them, e.g. from the cache)
+        """
+        if self._preview is None:
+            self._preview = self.load_samples(0, int(PREVIEW_SECONDS * self.sample_rate))
+        return self._preview
+    
+    def envelope(self, num_points=1000):
+        """
+        Min/max envelope of the whole signal, decimated to num_points
+        
+        The file is streamed chunk by chunk, so this works for files larger
+        than memory. The last envelope computed is kept.
+        
+        Args:
+            num_points (int): Number of envelope points
+            
+        Returns:
+            tuple: (times, minimum, maximum) arrays of up to num_points
+                entries; times are the start of each block in seconds
+        """
+        if self._envelope is not None and self._envelope[0] == num_points:
+            return self._envelope[1]
+        
+        audio = self._open()
+        try:
+            block = max(1, -(-audio.num_samples // num_points))
+            # Chunks hold a whole number of blocks, so no block is split
+            chunk_size = block * max(1, 2 ** 20 // block)
+            minimum, maximum = [], []
+            for chunk in audio.iter_chunks(chunk_size):
+                padded = np.pad(chunk, (0, -len(chunk) % block), mode='edge')
+                blocks = padded.reshape(-1, block)
+                minimum.append(blocks.min(axis=1))
+                maximum.append(blocks.max(axis=1))
+        finally:
+            audio.close()
+        
+        minimum = np.concatenate(minimum) if minimum else np.zeros(0, dtype=np.float32)
+        maximum = np.concatenate(maximum) if maximum else np.zeros(0, dtype=np.float32)
+        times = np.arange(len(minimum)) * block / audio.sample_rate
+        self._envelope = (num_points, (times, minimum, maximum))
+        return times, minimum, maximum
+    
+    def waveform_lod(self):
+        """
+        Min/max envelope pyramid of the whole signal for zoomable plots
+        
+        Built on first use by streaming the file, then kept (it is a
+        fraction of the signal's size and is not pickled).
+        
+        Returns:
+            EnvelopePyramid: Pyramid over a memory-mapped view of the file,
+                with x in seconds
+        """
+        if self._lod is None:
+            audio = self._open()
+            self._lod = EnvelopePyramid(audio, x_step=1 / audio.sample_rate)
+        return self._lod
@@ -0,0 +1,128 @@
+"""
+Analysis Worker Module
+Runs file analysis off the GUI thread with cancellation and progress reporting
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from audio_analyzer import analyze_audio, AnalysisCancelled
+
+
+class AnalysisJob:
+    """Handle for one submitted analysis"""
+    
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._cancelled = threading.Event()
+        self.future = None
+    
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+    
+    def cancel(self):
+        """
+        Request cancellation; the job stops at its next progress check
+        
+        Checks happen between analysis stages (load, segment, pitch, note),
+        not inside them: a stage already running, such as the FFT, is
+        finished first and its result discarded.
+        """
+        self._cancelled.set()
+
+
+class BackgroundAnalyzer:
+    """
+    Runs analyze_audio jobs on a worker thread, one at a time
+    
+    Submitting a new job cancels the one in flight, and callbacks of
+    cancelled or superseded jobs are never delivered. A cancelled job's
+    progress hook raises AnalysisCancelled at the next stage boundary,
+    which analyze_audio lets through instead of turning it into a failed
+    result. All callbacks are passed to `dispatch`, which must run them on
+    the GUI thread (for Tk, through a queue drained by root.after()).
+    """
+    
+    def __init__(self, dispatch, analyze=analyze_audio, **analyze_kwargs):
+        """
+        Args:
+            dispatch (callable): dispatch(fn) schedules fn() on the GUI thread
+            analyze (callable): Analysis function taking (file_path,
+                progress=..., **analyze_kwargs)
+            **analyze_kwargs: Extra keyword arguments for the analysis
+        """
+        self._dispatch = dispatch
+        self._analyze = analyze
+        self._analyze_kwargs = analyze_kwargs
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._current = None
+        self._lock = threading.Lock()
+    
+    @property
+    def busy(self):
+        """Whether a job is queued or running"""
+        job = self._current
+        return job is not None and not job.future.done()
+    
+    def submit(self, file_path, on_done, on_progress=None, on_error=None):
+        """
+        Analyze a file in the background, cancelling any job in flight
+        
+        Args:
+            file_path (str): Path to audio file
+            on_done (callable): on_done(result) with the analysis result
+            on_progress (callable): on_progress(fraction, stage)
+            on_error (callable): on_error(exception) if the job itself fails
+            
+        Returns:
+            AnalysisJob: Handle that can be cancelled
+        """
+        job = AnalysisJob(file_path)
+        with self._lock:
+            if self._current is not None:
+                self._current.cancel()
+            self._current = job
+            job.future = self._executor.submit(self._run, job, on_done, on_progress, on_error)
+        return job
+    
+    def cancel(self):
+        """Cancel the job in flight, if any"""
+        with self._lock:
+            if self._current is not None:
+                self._current.cancel()
+                self._current = None
+    
+    def shutdown(self):
+        """Cancel pending work and stop the worker thread"""
+        self.cancel()
+        self._executor.shutdown(wait=False)
+    
+    def _deliver(self, job, callback, *args):
+        """Run callback on the GUI thread unless the job is stale by then"""
+        def call():
+            if not job.cancelled and job is self._current:
+                callback(*args)
+        self._dispatch(call)
+    
+    def _run(self, job, on_done, on_progress, on_error):
+        if job.cancelled:
+            return
+        
+        def progress(fraction, stage):
+            if job.cancelled:
+                raise AnalysisCancelled()
+            if on_progress is not None:
+                self._deliver(job, on_progress, fraction, stage)
+        
+        try:
+            result = self._analyze(job.file_path, progress=progress, **self._analyze_kwargs)
+        except AnalysisCancelled:
+            return
+        except Exception as e:
+            if on_error is not None:
+                self._deliver(job, on_error, e)
+            return
+        
+        if job.cancelled:
+            return
+        self._deliver(job, on_done, result)
@@ -4,54 +4,167 @@ Handles audio file loading, FFT analysis, and note detection
 """
 
 import numpy as np
-from scipy.io import wavfile
-from scipy.fft import fft, fftfreq
-import wave
-from note_frequencies import get_note_from_frequency, format_note_name
+from note_frequencies import get_note_from_frequency, format_note_name, DEFAULT_TUNING
+from wav_reader import to_float32, to_mono_float32
+from decoders import open_audio, is_wav
+from dsp_utils import (INTERPOLATION_METHODS, get_window, get_rfft_frequencies,
+                       interpolated_peak_frequency, parabolic_peak_offsets,
+                       phase_vocoder_frequency)
+from pitch_detectors import yin_pitch, autocorrelation_pitch
+from instruments import get_instrument
+from segmentation import segment_notes, main_segment
+from analysis_result import AnalysisResult, PREVIEW_SECONDS
+from instrumentation import stage, count, lazy_import
 
 
-def load_audio(file_path):
+def load_audio(file_path, mmap=False, mono=True):
     """
     Load audio file and return audio data with sample rate
     
     Args:
-        file_path (str): Path to audio file
+        file_path (str): Path to audio file (WAV, FLAC, or any format
+            of decoders.supported_extensions())
+        mmap (bool): Memory-map the file instead of decoding it into RAM.
+            The returned AudioView downmixes to mono and converts to float
+            only the chunks that are actually indexed; compressed files
+            get a StreamView that decodes those chunks on demand.
+        mono (bool): Downmix to mono float32. With False the samples are
+            returned as (frames, channels) in the file's native dtype.
         
     Returns:
         tuple: (audio_data, sample_rate)
     """
     try:
-        # Try to load as WAV file
-        sample_rate, audio_data = wavfile.read(file_path)
-        
-        # Convert to mono if stereo
-        if len(audio_data.shape) > 1:
-            audio_data = np.mean(audio_data, axis=1)
-        
-        # Normalize to float
-        if audio_data.dtype == np.int16:
-            audio_data = audio_data.astype(np.float32) / 32768.0
-        elif audio_data.dtype == np.int32:
-            audio_data = audio_data.astype(np.float32) / 2147483648.0
-        
-        return audio_data, sample_rate
+        with stage('load'):
+            if mmap:
+                # Bytes are counted by the view as chunks are read
+                audio_data = open_audio(file_path, mono=mono)
+                return audio_data, audio_data.sample_rate
+            
+            with stage('read'):
+                if is_wav(file_path):
+                    wavfile = lazy_import('scipy.io.wavfile')
+                    sample_rate, audio_data = wavfile.read(file_path)
+                else:
+                    stream = open_audio(file_path, mono=False)
+                    audio_data, sample_rate = stream.read_native(), stream.sample_rate
+                    stream.close()
+            count('bytes_read', audio_data.nbytes)
+            
+            if not mono:
+                return audio_data.reshape(len(audio_data), -1), sample_rate
+            
+            # Convert to mono if stereo and normalize to float32 in a single pass
+            with stage('normalize'):
+                audio_data = to_mono_float32(audio_data)
+            
+            return audio_data, sample_rate
     
     except Exception as e:
         raise Exception(f"Error loading audio file: {str(e)}")
 
 
-def get_fundamental_frequency(audio_data, sample_rate, window_size=None):
+def _search_band(freqs, min_freq=20, max_freq=5000):
+    """
+    Locate the index range of the pitch search band on a frequency axis
+    
+    Args:
+        freqs (numpy.array): Ascending frequency axis in Hz
+        min_freq (float): Lowest frequency to consider (below is likely noise)
+        max_freq (float): Highest frequency to consider for a fundamental
+        
+    Returns:
+        tuple: (min_idx, max_idx) slice bounds into freqs
+    """
+    min_idx = np.argmax(freqs > min_freq)
+    max_idx = np.argmax(freqs > max_freq)
+    
+    if max_idx == 0:
+        max_idx = len(freqs)
+    
+    return min_idx, max_idx
+
+
+# A peak at 1/2 ... 1/5 of the tallest one, at least this strong relative
+# to it, is taken as the real fundamental (see _lowest_subharmonic)
+SUBHARMONIC_RATIO = 0.1
+MAX_SUBHARMONIC = 5
+SUBHARMONIC_TOLERANCE_CENTS = 30
+
+
+def _lowest_subharmonic(magnitude, peak_idx, min_idx):
+    """
+    Move a spectral peak down to the fundamental it is a harmonic of
+    
+    Low strings often have a weaker fundamental than their 2nd or 3rd
+    harmonic, so the tallest peak is an octave (or a twelfth) too high.
+    Only safe when min_idx excludes the hum and rumble below the
+    instrument's lowest note.
+    
+    Args:
+        magnitude (numpy.array): Magnitude spectrum
+        peak_idx (int): Tallest peak in the search band
+        min_idx (int): Lowest bin of the search band
+        
+    Returns:
+        int: Bin of the lowest sub-harmonic peak found, or peak_idx
+    """
+    threshold = SUBHARMONIC_RATIO * magnitude[peak_idx]
+    tolerance = 2 ** (SUBHARMONIC_TOLERANCE_CENTS / 1200) - 1
+    
+    # Each step moves down to a sub-harmonic; repeating reaches the
+    # fundamental from harmonics above MAX_SUBHARMONIC too (6th -> 2nd -> 1st)
+    moved = True
+    while moved:
+        moved = False
+        for divisor in range(MAX_SUBHARMONIC, 1, -1):
+            centre = peak_idx / divisor
+            width = max(1, int(np.ceil(centre * tolerance)))
+            lo = max(int(round(centre)) - width, min_idx, 1)
+            hi = int(round(centre)) + width + 1
+            if hi - lo < 1:
+                continue
+            
+            candidate = lo + np.argmax(magnitude[lo:hi])
+            is_peak = magnitude[candidate - 1] < magnitude[candidate] > magnitude[candidate + 1]
+            if is_peak and magnitude[candidate] >= threshold:
+                peak_idx, moved = candidate, True
+                break
+    
+    return peak_idx
+
+
+def get_fundamental_frequency(audio_data, sample_rate, window_size=None,
+                              interpolation='parabolic', min_freq=20, max_freq=5000,
+                              octave_check=False):
     """
     Extract fundamental frequency using FFT
     
+    The raw FFT peak is only accurate to one bin (sample_rate / window_size),
+    so by default the peak is refined to a fraction of a bin. This gives
+    cent-level accuracy from short 2048-4096 sample windows.
+    
     Args:
         audio_data (numpy.array): Audio signal data
         sample_rate (int): Sample rate in Hz
         window_size (int): Size of analysis window (default: use full signal)
+        interpolation (str): Peak estimator:
+            - 'parabolic': Quadratic fit on the log magnitude (default)
+            - 'phase': Phase advance between two overlapping frames a
+              quarter window apart (phase vocoder)
+            - 'none': Raw FFT bin centre
+        min_freq (float): Lowest frequency searched (below is likely noise)
+        max_freq (float): Highest frequency searched
+        octave_check (bool): Prefer a clear peak at 1/2-1/5 of the tallest
+            one (needs a min_freq close to the lowest expected note)
         
     Returns:
         float: Fundamental frequency in Hz
     """
+    if interpolation not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {interpolation}")
+    rfft = lazy_import('scipy.fft').rfft
+    
     # Use a window of the signal for analysis
     if window_size is None:
         window_size = len(audio_data)
@@ -59,49 +172,376 @@ def get_fundamental_frequency(audio_data, sample_rate, window_size=None):
     # Take the middle portion of the audio for more stable results
     start_idx = max(0, len(audio_data) // 2 - window_size // 2)
     end_idx = min(len(audio_data), start_idx + window_size)
-    windowed_data = audio_data[start_idx:end_idx]
+    segment = audio_data[start_idx:end_idx]
+    
+    # The phase vocoder needs a second frame: split the segment into two
+    # overlapping frames hop samples apart
+    hop_size = len(segment) // 4 if interpolation == 'phase' else 0
+    frame_size = len(segment) - hop_size
     
     # Apply Hamming window to reduce spectral leakage
-    window = np.hamming(len(windowed_data))
-    windowed_data = windowed_data * window
+    with stage('window'):
+        window = get_window('hamming', frame_size)
+        windowed = segment[:frame_size] * window
     
-    # Compute FFT
-    fft_data = fft(windowed_data)
-    fft_freqs = fftfreq(len(windowed_data), 1/sample_rate)
+    # Compute FFT (rfft only computes the positive frequencies)
+    with stage('fft'):
+        spectrum = rfft(windowed)
+        magnitude = np.abs(spectrum)
+    count('samples_transformed', frame_size)
+    count('fft', label=frame_size)
     
-    # Only consider positive frequencies
-    positive_freqs = fft_freqs[:len(fft_freqs)//2]
-    magnitude = np.abs(fft_data[:len(fft_data)//2])
+    with stage('peak'):
+        positive_freqs = get_rfft_frequencies(frame_size, sample_rate)
+        
+        # Find the peak frequency (fundamental) within the search band
+        min_freq_idx, max_freq_idx = _search_band(positive_freqs, min_freq, max_freq)
+        
+        if max_freq_idx <= min_freq_idx:
+            return 0.0
+        
+        peak_idx = min_freq_idx + np.argmax(magnitude[min_freq_idx:max_freq_idx])
+        if octave_check:
+            peak_idx = _lowest_subharmonic(magnitude, peak_idx, min_freq_idx)
+        
+        if interpolation == 'none':
+            return positive_freqs[peak_idx]
+        
+        if interpolation == 'phase' and hop_size > 0:
+            with stage('fft'):
+                next_spectrum = rfft(segment[hop_size:hop_size + frame_size] * window)
+            count('samples_transformed', frame_size)
+            count('fft', label=frame_size)
+            return phase_vocoder_frequency(spectrum, next_spectrum, peak_idx,
+                                           hop_size, frame_size, sample_rate)
+        
+        return interpolated_peak_frequency(magnitude, peak_idx, frame_size, sample_rate)
+
+
+def get_channel_frequencies(audio_data, sample_rate, window_size=None,
+                            interpolation='parabolic'):
+    """
+    Extract the fundamental frequency of every channel with one batched FFT
     
-    # Find the peak frequency (fundamental)
-    # Ignore very low frequencies (below 20 Hz) which are likely noise
-    min_freq_idx = np.argmax(positive_freqs > 20)
-    max_freq_idx = np.argmax(positive_freqs > 5000)  # Ignore above 5kHz for fundamental
+    Same analysis as get_fundamental_frequency, but the middle segment of
+    all channels goes through a single rfft along the frame axis. Samples
+    stay in their native dtype until that segment is cut out, and only the
+    segment is converted to float32.
     
-    if max_freq_idx == 0:
-        max_freq_idx = len(positive_freqs)
+    Args:
+        audio_data (numpy.array): (frames, channels) samples in any dtype,
+            e.g. from load_audio(mono=False)
+        sample_rate (int): Sample rate in Hz
+        window_size (int): Size of analysis window (default: use full signal)
+        interpolation (str): Peak estimator ('parabolic', 'phase' or 'none')
+        
+    Returns:
+        numpy.array: Fundamental frequency in Hz of each channel (0.0 for
+            silent channels)
+    """
+    if interpolation not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {interpolation}")
+    rfft = lazy_import('scipy.fft').rfft
+    
+    if window_size is None:
+        window_size = len(audio_data)
+    
+    start_idx = max(0, len(audio_data) // 2 - window_size // 2)
+    end_idx = min(len(audio_data), start_idx + window_size)
+    segment = to_float32(np.asarray(audio_data[start_idx:end_idx]).reshape(end_idx - start_idx, -1))
+    
+    hop_size = len(segment) // 4 if interpolation == 'phase' else 0
+    frame_size = len(segment) - hop_size
+    channels = segment.shape[1]
+    
+    window = get_window('hamming', frame_size).astype(np.float32)[:, None]
+    spectrum = rfft(segment[:frame_size] * window, axis=0)
+    magnitude = np.abs(spectrum)
+    positive_freqs = get_rfft_frequencies(frame_size, sample_rate)
+    
+    min_freq_idx, max_freq_idx = _search_band(positive_freqs)
+    if max_freq_idx <= min_freq_idx:
+        return np.zeros(channels)
     
-    search_range = magnitude[min_freq_idx:max_freq_idx]
-    search_freqs = positive_freqs[min_freq_idx:max_freq_idx]
+    band = magnitude[min_freq_idx:max_freq_idx]
+    peak_idx = min_freq_idx + np.argmax(band, axis=0)
     
-    if len(search_range) == 0:
-        return 0.0
+    if interpolation == 'none':
+        frequencies = positive_freqs[peak_idx]
+    elif interpolation == 'phase' and hop_size > 0:
+        next_spectrum = rfft(segment[hop_size:hop_size + frame_size] * window, axis=0)
+        frequencies = np.array([
+            phase_vocoder_frequency(spectrum[:, ch], next_spectrum[:, ch], peak_idx[ch],
+                                    hop_size, frame_size, sample_rate)
+            for ch in range(channels)])
+    else:
+        offsets = parabolic_peak_offsets(magnitude.T, peak_idx)
+        frequencies = (peak_idx + offsets) * sample_rate / frame_size
+    
+    # Silent channels have no peak at all
+    return np.where(band.max(axis=0) > 0, frequencies, 0.0)
+
+
+# Bump whenever a change to the analysis alters its results, so cached
+# results (see result_cache) from older versions are no longer used
+ENGINE_VERSION = 3
+
+# Pitch detection engines selectable by name. Every detector is called as
+# detector(audio_data, sample_rate, window_size=None, interpolation=...)
+# and returns the fundamental frequency in Hz.
+PITCH_METHODS = {
+    'fft': get_fundamental_frequency,
+    'yin': yin_pitch,
+    'autocorr': autocorrelation_pitch,
+}
+
+
+def register_pitch_method(name, detector):
+    """
+    Make a pitch detector selectable by name in analyze_audio and the CLI
+    
+    Args:
+        name (str): Method name
+        detector (callable): detector(audio_data, sample_rate, window_size=None,
+            interpolation='parabolic') -> float
+    """
+    PITCH_METHODS[name] = detector
+
+
+def detect_pitch(audio_data, sample_rate, method='fft', window_size=None,
+                 interpolation='parabolic', **band):
+    """
+    Estimate the fundamental frequency with the named engine
     
-    peak_idx = np.argmax(search_range)
-    fundamental_freq = search_freqs[peak_idx]
+    Args:
+        audio_data (numpy.array): Audio signal data
+        sample_rate (int): Sample rate in Hz
+        method (str): Engine name in PITCH_METHODS ('fft', 'yin', 'autocorr')
+        window_size (int): Size of analysis window (default: engine specific)
+        interpolation (str): Sub-bin/sub-sample refinement
+        **band: Search range (min_freq, max_freq in Hz), passed on to the
+            detector; all built-in engines accept it
+        
+    Returns:
+        float: Fundamental frequency in Hz
+    """
+    try:
+        detector = PITCH_METHODS[method]
+    except KeyError:
+        raise ValueError(f"Unknown pitch detection method: {method}")
     
-    return fundamental_freq
+    return detector(audio_data, sample_rate, window_size=window_size,
+                    interpolation=interpolation, **band)
 
 
-def analyze_audio(file_path):
+def track_pitch(file_path, frame_size=4096, hop_size=1024, silence_threshold=1e-3,
+                interpolation='parabolic', method='fft', tuning=None, instrument=None):
+    """
+    Track the pitch of a WAV file frame by frame without loading it whole
+    
+    The file is memory-mapped and read in hop-sized blocks into a single
+    frame buffer, and the analysis window, frequency axis and search band
+    are computed once and reused for every frame, so memory stays bounded
+    by frame_size no matter how long the recording is.
+    
+    Args:
+        file_path (str): Path to WAV file
+        frame_size (int): Samples per analysis frame
+        hop_size (int): Samples between the starts of consecutive frames
+        silence_threshold (float): Frames with a lower RMS are reported
+            as silent (frequency 0.0, no note)
+        interpolation (str): Peak estimator ('parabolic', 'phase' or 'none',
+            see get_fundamental_frequency). 'phase' compares each frame with
+            the previous one, so it needs hop_size <= frame_size / 2 and
+            falls back to 'parabolic' on the first frame after silence.
+        method (str): Pitch engine; engines other than 'fft' are run on
+            each frame as a whole
+        tuning (TuningSystem): Reference pitch and temperament for the notes
+            (default: equal temperament, A4 = 440 Hz)
+        instrument: Instrument profile or name (see instruments.get_instrument).
+            Limits the search to the instrument's range (with the octave
+            check of get_fundamental_frequency) and reports the nearest open
+            string; frames are not decimated.
+        
+    Yields:
+        dict: Per-frame record containing:
+            - 'time': Centre of the frame in seconds
+            - 'frequency': Detected fundamental frequency
+            - 'note': Closest musical note (None when silent)
+            - 'cents': Deviation in cents (None when silent)
+    """
+    if frame_size <= 0 or hop_size <= 0:
+        raise ValueError("frame_size and hop_size must be positive")
+    if interpolation not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {interpolation}")
+    if interpolation == 'phase' and hop_size > frame_size // 2:
+        raise ValueError("Phase interpolation needs hop_size <= frame_size / 2")
+    if method not in PITCH_METHODS:
+        raise ValueError(f"Unknown pitch detection method: {method}")
+    rfft = lazy_import('scipy.fft').rfft
+    
+    profile = get_instrument(instrument) if instrument is not None else None
+    band = {'min_freq': profile.min_freq, 'max_freq': profile.max_freq} if profile else {}
+    identify_note = profile.identify_note if profile else get_note_from_frequency
+    
+    audio = open_audio(file_path)
+    try:
+        sample_rate = audio.sample_rate
+        total_samples = len(audio)
+        
+        # Everything that only depends on the frame size is built once
+        window = get_window('hamming', frame_size).astype(np.float32)
+        freqs = get_rfft_frequencies(frame_size, sample_rate)
+        min_idx, max_idx = _search_band(freqs, **band)
+        frame = np.zeros(frame_size, dtype=np.float32)
+        windowed = np.empty(frame_size, dtype=np.float32)
+        
+        # Prime the buffer with the first frame (zero-padded if the file is short)
+        first = audio.read(0, frame_size)
+        frame[:len(first)] = first
+        start = 0
+        previous_spectrum = None
+        
+        while True:
+            np.multiply(frame, window, out=windowed)
+            rms = np.sqrt(np.mean(np.square(frame)))
+            
+            if rms < silence_threshold or max_idx <= min_idx:
+                frequency, note, cents = 0.0, None, None
+                previous_spectrum = None
+            elif method != 'fft':
+                frequency = float(detect_pitch(frame, sample_rate, method,
+                                               interpolation=interpolation, **band))
+                note, _, cents = identify_note(frequency, tuning)
+            else:
+                with stage('fft'):
+                    spectrum = rfft(windowed)
+                    magnitude = np.abs(spectrum)
+                count('samples_transformed', frame_size)
+                count('fft', label=frame_size)
+                peak_idx = min_idx + np.argmax(magnitude[min_idx:max_idx])
+                if profile is not None:
+                    peak_idx = _lowest_subharmonic(magnitude, peak_idx, min_idx)
+                
+                if interpolation == 'none':
+                    frequency = float(freqs[peak_idx])
+                elif interpolation == 'phase' and previous_spectrum is not None:
+                    frequency = float(phase_vocoder_frequency(previous_spectrum, spectrum,
+                                                              peak_idx, hop_size, frame_size,
+                                                              sample_rate))
+                else:
+                    frequency = float(interpolated_peak_frequency(magnitude, peak_idx,
+                                                                  frame_size, sample_rate))
+                
+                previous_spectrum = spectrum
+                note, _, cents = identify_note(frequency, tuning)
+            
+            yield {
+                'time': (start + frame_size / 2) / sample_rate,
+                'frequency': frequency,
+                'note': note,
+                'cents': cents
+            }
+            
+            # Stop once the next hop would run past the end of the file
+            if start + hop_size + frame_size > total_samples:
+                break
+            
+            block = audio.read(start + frame_size, start + frame_size + hop_size)
+            if len(block) < hop_size:
+                break
+            
+            if hop_size >= frame_size:
+                frame[:] = block[hop_size - frame_size:]
+            else:
+                frame[:-hop_size] = frame[hop_size:]
+                frame[-hop_size:] = block
+            start += hop_size
+    finally:
+        audio.close()
+
+
+def get_tuning_status(cents):
+    """
+    Describe how far a note is from being in tune
+    
+    Args:
+        cents (float): Deviation in cents, or None when no note was found
+        
+    Returns:
+        str: Tuning status label (None without a note)
+    """
+    if cents is None:
+        return None
+    
+    # Determine if in tune (within ±10 cents is considered good)
+    if abs(cents) < 10:
+        return "En tono ✓"
+    elif cents > 0:
+        return "Agudo (sostenido)"
+    else:
+        return "Grave (bemol)"
+
+
+class AnalysisCancelled(Exception):
+    """Raised from a progress hook to abort analyze_audio (see analysis_worker)"""
+
+
+def _no_progress(fraction, stage):
+    pass
+
+
+def _detect_in_band(audio_data, sample_rate, method, interpolation, profile):
+    """Fundamental frequency, within the instrument's range if a profile is given"""
+    if profile is None:
+        return detect_pitch(audio_data, sample_rate, method, interpolation=interpolation)
+    
+    if method == 'fft':
+        # The FFT covers the whole signal: decimating it shrinks the
+        # transform, and the bounded band makes the octave check safe
+        band_data, band_rate = profile.band_limit(audio_data, sample_rate)
+        return get_fundamental_frequency(
+            band_data, band_rate, interpolation=interpolation,
+            min_freq=profile.min_freq, max_freq=profile.max_freq, octave_check=True)
+    
+    # Time-domain engines only read a few periods: the band is enough
+    return detect_pitch(audio_data, sample_rate, method, interpolation=interpolation,
+                        min_freq=profile.min_freq, max_freq=profile.max_freq)
+
+
+def analyze_audio(file_path, mmap=False, interpolation='parabolic', progress=None,
+                  method='fft', cache=None, tuning=None, instrument=None, segment=True):
     """
     Complete audio analysis: load file, detect frequency, identify note
     
     Args:
         file_path (str): Path to audio file
+        mmap (bool): Memory-map the file instead of decoding it into RAM
+        interpolation (str): Sub-bin peak estimator ('parabolic', 'phase'
+            or 'none', see get_fundamental_frequency)
+        progress (callable): Called as progress(fraction, stage) before each
+            stage. Raising AnalysisCancelled from it aborts the analysis and
+            propagates to the caller; the check only happens between
+            stages, so a running stage (e.g. the FFT) is finished first.
+        method (str): Pitch engine: 'fft' (spectral peak), 'yin' or
+            'autocorr' (time-domain period detection, better for low notes
+            with strong harmonics), or any name added with register_pitch_method
+        cache (ResultCache): Persistent result cache. On a hit the stored
+            result is returned without decoding the file; successful misses
+            are stored.
+        tuning (TuningSystem): Reference pitch and temperament the note and
+            cents are measured against (default: equal temperament, A4 = 440 Hz)
+        instrument: Instrument profile or name (see instruments.get_instrument).
+            The signal is band-limited and decimated to the instrument's
+            range before detection, and instruments with strings report the
+            nearest open string as the note.
+        segment (bool): Detect the pitch on the sustain of the main note
+            only (see segmentation), skipping leading and trailing silence,
+            the attack and the decay tail. With False the whole file is
+            analysed.
         
     Returns:
-        dict: Analysis results containing:
+        AnalysisResult: Analysis results (also readable like a dict):
             - 'frequency': Detected fundamental frequency
             - 'note': Closest musical note
             - 'exact_frequency': Exact frequency of the note
@@ -109,38 +549,194 @@ def analyze_audio(file_path):
             - 'note_formatted': Formatted note name
             - 'sample_rate': Audio sample rate
             - 'duration': Audio duration in seconds
-            - 'audio_data': Raw audio data for visualization
+            The decoded audio is not kept: use waveform_preview(), envelope()
+            or load_samples() to read it back from the file.
     """
+    if progress is None:
+        progress = _no_progress
+    
     try:
+        profile = get_instrument(instrument) if instrument is not None else None
+        
+        if cache is not None:
+            cache_key = cache.key(file_path, {'method': method, 'interpolation': interpolation,
+                                              'tuning': (tuning or DEFAULT_TUNING).params(),
+                                              'instrument': profile and profile.params(),
+                                              'segment': segment, 'engine': ENGINE_VERSION})
+            with stage('cache'):
+                cached = cache.get(cache_key)
+            if cached is not None:
+                progress(1.0, 'done')
+                return AnalysisResult.from_dict(file_path, cached)
+        
         # Load audio
-        audio_data, sample_rate = load_audio(file_path)
+        progress(0.0, 'load')
+        audio_data, sample_rate = load_audio(file_path, mmap=mmap)
         duration = len(audio_data) / sample_rate
         
-        # Get fundamental frequency
-        fundamental_freq = get_fundamental_frequency(audio_data, sample_rate)
+        # Only the stable part of the main note is worth transforming
+        pitch_data = audio_data
+        if segment:
+            progress(0.1, 'segment')
+            with stage('segment'):
+                note_segment = main_segment(segment_notes(audio_data, sample_rate))
+                if note_segment is not None:
+                    pitch_data = np.asarray(
+                        audio_data[note_segment['sustain_start']:note_segment['sustain_end']])
+        
+        # Get fundamental frequency, within the instrument's range if known
+        progress(0.3, 'pitch')
+        with stage('pitch'):
+            fundamental_freq = _detect_in_band(pitch_data, sample_rate, method, interpolation,
+                                               profile)
+        if not fundamental_freq > 0:
+            # The detectors return 0.0 for silence or too short a signal
+            raise ValueError("No pitch detected (silence or signal too short)")
         
         # Identify note
-        note, exact_freq, cents = get_note_from_frequency(fundamental_freq)
-        note_formatted = format_note_name(note)
-        
-        # Determine if in tune (within ±10 cents is considered good)
-        if abs(cents) < 10:
-            tuning_status = "En tono ✓"
-        elif cents > 0:
-            tuning_status = "Agudo (sostenido)"
-        else:
-            tuning_status = "Grave (bemol)"
+        progress(0.9, 'note')
+        with stage('note'):
+            if profile is None:
+                note, exact_freq, cents = get_note_from_frequency(fundamental_freq, tuning)
+            else:
+                note, exact_freq, cents = profile.identify_note(fundamental_freq, tuning)
+            note_formatted = format_note_name(note)
+            
+            tuning_status = get_tuning_status(cents)
+        
+        result = AnalysisResult(
+            file_path,
+            frequency=fundamental_freq,
+            note=note,
+            exact_frequency=exact_freq,
+            cents=cents,
+            note_formatted=note_formatted,
+            tuning_status=tuning_status,
+            sample_rate=sample_rate,
+            duration=duration,
+            preview=np.array(audio_data[:int(PREVIEW_SECONDS * sample_rate)], dtype=np.float32)
+        )
+        if cache is not None:
+            cache.put(cache_key, result.to_dict())
+        
+        progress(1.0, 'done')
+        return result
+    
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        return AnalysisResult(file_path, success=False, error=str(e))
+
+
+def analyze_channels(file_path, mmap=False, interpolation='parabolic', window_size=None,
+                     tuning=None):
+    """
+    Per-channel audio analysis, without downmixing to mono
+    
+    Useful for multi-microphone captures, where each channel may pick up
+    a different source.
+    
+    Args:
+        file_path (str): Path to audio file
+        mmap (bool): Memory-map the file; only the analysed segment is read
+        interpolation (str): Sub-bin peak estimator ('parabolic', 'phase' or 'none')
+        window_size (int): Size of analysis window (default: use full signal)
+        tuning (TuningSystem): Reference pitch and temperament (default:
+            equal temperament, A4 = 440 Hz)
+        
+    Returns:
+        dict: 'channels' (one dict per channel with 'channel', 'frequency',
+            'note', 'note_formatted', 'exact_frequency', 'cents' and
+            'tuning_status'), 'sample_rate', 'duration', 'success' and 'error'
+    """
+    try:
+        audio_data, sample_rate = load_audio(file_path, mmap=mmap, mono=False)
+        frequencies = get_channel_frequencies(audio_data, sample_rate, window_size,
+                                              interpolation)
+        notes, exact_freqs, cents = get_note_from_frequency(frequencies, tuning)
+        
+        channels = []
+        for channel, frequency in enumerate(frequencies):
+            note = notes[channel]
+            channels.append({
+                'channel': channel,
+                'frequency': float(frequency),
+                'note': note,
+                'note_formatted': format_note_name(note),
+                'exact_frequency': float(exact_freqs[channel]) if note else None,
+                'cents': float(cents[channel]) if note else None,
+                'tuning_status': get_tuning_status(cents[channel]) if note else None
+            })
+        
+        return {
+            'channels': channels,
+            'sample_rate': sample_rate,
+            'duration': len(audio_data) / sample_rate,
+            'success': True,
+            'error': None
+        }
+    
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def analyze_notes(file_path, mmap=False, interpolation='parabolic', method='fft',
+                  tuning=None, instrument=None):
+    """
+    Per-note analysis of a take with several notes (scales, arpeggios,
+    one string after another)
+    
+    The recording is split at note onsets and silences (see segmentation)
+    and the pitch of each note is detected on its sustain only.
+    
+    Args:
+        file_path (str): Path to audio file
+        mmap (bool): Memory-map the file; only the audible frames and the
+            sustain of each note are transformed
+        interpolation (str): Sub-bin peak estimator ('parabolic', 'phase' or 'none')
+        method (str): Pitch engine name in PITCH_METHODS
+        tuning (TuningSystem): Reference pitch and temperament (default:
+            equal temperament, A4 = 440 Hz)
+        instrument: Instrument profile or name (see instruments.get_instrument)
+        
+    Returns:
+        dict: 'notes' (one dict per note with 'start', 'end', 'sustain_start'
+            and 'sustain_end' in seconds, 'frequency', 'note', 'note_formatted',
+            'exact_frequency', 'cents' and 'tuning_status'), 'sample_rate',
+            'duration', 'success' and 'error'
+    """
+    try:
+        profile = get_instrument(instrument) if instrument is not None else None
+        identify_note = profile.identify_note if profile else get_note_from_frequency
+        audio_data, sample_rate = load_audio(file_path, mmap=mmap)
+        
+        notes = []
+        for note_segment in segment_notes(audio_data, sample_rate):
+            sustain = np.asarray(
+                audio_data[note_segment['sustain_start']:note_segment['sustain_end']])
+            frequency = float(_detect_in_band(sustain, sample_rate, method, interpolation,
+                                              profile))
+            note, exact_freq, cents = identify_note(frequency, tuning)
+            notes.append({
+                'start': note_segment['start'] / sample_rate,
+                'end': note_segment['end'] / sample_rate,
+                'sustain_start': note_segment['sustain_start'] / sample_rate,
+                'sustain_end': note_segment['sustain_end'] / sample_rate,
+                'frequency': frequency,
+                'note': note,
+                'note_formatted': format_note_name(note),
+                'exact_frequency': exact_freq,
+                'cents': cents,
+                'tuning_status': get_tuning_status(cents) if note else None
+            })
         
         return {
-            'frequency': fundamental_freq,
-            'note': note,
-            'exact_frequency': exact_freq,
-            'cents': cents,
-            'note_formatted': note_formatted,
-            'tuning_status': tuning_status,
+            'notes': notes,
             'sample_rate': sample_rate,
-            'duration': duration,
-            'audio_data': audio_data,
+            'duration': len(audio_data) / sample_rate,
             'success': True,
             'error': None
         }
@@ -154,14 +750,101 @@ def analyze_audio(file_path):
 
 if __name__ == "__main__":
     # Test the analyzer
-    import sys
+    import argparse
+    import instrumentation
+    from result_cache import ResultCache, DEFAULT_CACHE_PATH
+    from tuning import TEMPERAMENTS, NOTE_NAMES, get_tuning
     
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
-        print(f"Analyzing: {file_path}")
-        print("-" * 60)
-        
-        result = analyze_audio(file_path)
+    parser = argparse.ArgumentParser(description="Detect the musical note in an audio file")
+    parser.add_argument('file', help="Path to the audio file to analyze")
+    parser.add_argument('--track', action='store_true',
+                        help="Print a frame-by-frame pitch track instead of a single note")
+    parser.add_argument('--channels', action='store_true',
+                        help="Analyze every channel separately instead of the mono mix "
+                             "(FFT engine only)")
+    parser.add_argument('--notes', action='store_true',
+                        help="Split the take into notes and analyze each one")
+    parser.add_argument('--no-segment', action='store_true',
+                        help="Analyze the whole file instead of the sustain of its main note")
+    parser.add_argument('--frame-size', type=int, default=4096,
+                        help="Samples per frame for --track (default: 4096)")
+    parser.add_argument('--hop-size', type=int, default=1024,
+                        help="Samples between frames for --track (default: 1024)")
+    parser.add_argument('--method', choices=sorted(PITCH_METHODS), default='fft',
+                        help="Pitch detection engine (default: fft)")
+    parser.add_argument('--interpolation', choices=INTERPOLATION_METHODS, default='parabolic',
+                        help="Sub-bin peak estimator (default: parabolic)")
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH, metavar='PATH',
+                        help=f"Reuse results of unchanged files from a cache database "
+                             f"(default path: {DEFAULT_CACHE_PATH})")
+    parser.add_argument('--reference', type=float, default=440.0, metavar='HZ',
+                        help="Frequency of A4 (default: 440; e.g. 415 baroque, 442 orchestra)")
+    parser.add_argument('--temperament', default='equal',
+                        help=f"{', '.join(TEMPERAMENTS)} or a Scala .scl file (default: equal)")
+    parser.add_argument('--key', choices=NOTE_NAMES, default='C',
+                        help="Note the temperament is built on (default: C)")
+    parser.add_argument('--instrument',
+                        help="Limit the search to an instrument and snap to its strings: "
+                             "guitar, bass, violin, piano, or custom strings such as "
+                             "D2,A2,D3,G3,B3,E4")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print how long each stage took and how much data it handled")
+    parser.add_argument('--profile-output', metavar='PATH',
+                        help="Also write the profile to a file: Prometheus text for *.prom, "
+                             "JSON lines otherwise")
+    args = parser.parse_args()
+    if args.profile or args.profile_output:
+        instrumentation.enable()
+    tuning = get_tuning(args.temperament, args.reference, args.key)
+    
+    file_path = args.file
+    print(f"Analyzing: {file_path}")
+    print("-" * 60)
+    
+    if args.track:
+        print(f"{'Time (s)':>9}  {'Frequency':>11}  {'Note':<5} {'Cents':>7}")
+        for frame in track_pitch(file_path, args.frame_size, args.hop_size,
+                                 interpolation=args.interpolation, method=args.method,
+                                 tuning=tuning, instrument=args.instrument):
+            if frame['note'] is None:
+                print(f"{frame['time']:9.3f}  {'--':>11}  {'--':<5} {'--':>7}")
+            else:
+                print(f"{frame['time']:9.3f}  {frame['frequency']:8.2f} Hz  "
+                      f"{format_note_name(frame['note']):<5} {frame['cents']:+7.1f}")
+    elif args.channels:
+        result = analyze_channels(file_path, interpolation=args.interpolation, tuning=tuning)
+        if result['success']:
+            print(f"{'Channel':>7}  {'Frequency':>11}  {'Note':<5} {'Cents':>7}  Status")
+            for channel in result['channels']:
+                if channel['note'] is None:
+                    print(f"{channel['channel']:>7}  {'--':>11}  {'--':<5} {'--':>7}")
+                else:
+                    print(f"{channel['channel']:>7}  {channel['frequency']:8.2f} Hz  "
+                          f"{channel['note_formatted']:<5} {channel['cents']:+7.1f}  "
+                          f"{channel['tuning_status']}")
+        else:
+            print(f"Error: {result['error']}")
+    elif args.notes:
+        result = analyze_notes(file_path, interpolation=args.interpolation, method=args.method,
+                               tuning=tuning, instrument=args.instrument)
+        if result['success']:
+            print(f"{'Start (s)':>9}  {'End (s)':>9}  {'Frequency':>11}  {'Note':<5} {'Cents':>7}  "
+                  f"Status")
+            for note in result['notes']:
+                if note['note'] is None:
+                    print(f"{note['start']:9.3f}  {note['end']:9.3f}  {'--':>11}  {'--':<5} "
+                          f"{'--':>7}")
+                else:
+                    print(f"{note['start']:9.3f}  {note['end']:9.3f}  "
+                          f"{note['frequency']:8.2f} Hz  {note['note_formatted']:<5} "
+                          f"{note['cents']:+7.1f}  {note['tuning_status']}")
+        else:
+            print(f"Error: {result['error']}")
+    else:
+        cache = ResultCache(args.cache) if args.cache else None
+        result = analyze_audio(file_path, interpolation=args.interpolation,
+                               method=args.method, cache=cache, tuning=tuning,
+                               instrument=args.instrument, segment=not args.no_segment)
         
         if result['success']:
             print(f"Detected Frequency: {result['frequency']:.2f} Hz")
@@ -172,5 +855,9 @@ if __name__ == "__main__":
             print(f"Duration: {result['duration']:.2f} seconds")
         else:
             print(f"Error: {result['error']}")
-    else:
-        print("Usage: python audio_analyzer.py <audio_file.wav>")
+    
+    sinks = [instrumentation.sink_for_path(args.profile_output)] if args.profile_output else []
+    if args.profile:
+        print("-" * 60)
+        sinks.append(instrumentation.print_report)
+    instrumentation.disable(sinks)
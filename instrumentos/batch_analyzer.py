@@ -0,0 +1,226 @@
+"""
+Batch Analyzer Module
+Analyzes whole directories of audio files in parallel and streams the results
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+import numpy as np
+from audio_analyzer import analyze_audio, PITCH_METHODS
+from decoders import supported_extensions
+from result_cache import ResultCache, DEFAULT_CACHE_PATH
+from tuning import TEMPERAMENTS, NOTE_NAMES, get_tuning
+
+
+# Fields written for every file; raw audio never leaves the worker process
+RESULT_FIELDS = [
+    'file', 'success', 'error', 'frequency', 'note', 'exact_frequency',
+    'cents', 'tuning_status', 'sample_rate', 'duration'
+]
+
+AUDIO_EXTENSIONS = supported_extensions()
+
+
+def find_audio_files(patterns, extensions=AUDIO_EXTENSIONS):
+    """
+    Expand directories, glob patterns and file names into audio file paths
+    
+    Directories are walked recursively. Files are yielded lazily, so huge
+    sample libraries start processing before the walk is finished.
+    
+    Args:
+        patterns (list): Directories, glob patterns (e.g. 'lib/**/*.wav')
+            or individual files
+        extensions (tuple): Lower-case extensions accepted when walking
+            directories
+            
+    Yields:
+        str: Path to an audio file
+    """
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        yield os.path.join(root, name)
+        elif glob.has_magic(pattern):
+            for path in sorted(glob.iglob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    yield path
+        else:
+            yield pattern
+
+
+def _to_builtin(value):
+    """Convert numpy scalars to plain Python values for JSON/CSV output"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def analyze_file(file_path, **analyze_kwargs):
+    """
+    Analyze one file and keep only the small, picklable result fields
+    
+    This is the function run in the worker processes. It never raises:
+    corrupt or unreadable files come back with success=False.
+    
+    Args:
+        file_path (str): Path to audio file
+        **analyze_kwargs: Options passed to analyze_audio (e.g. method)
+        
+    Returns:
+        dict: Record with the keys listed in RESULT_FIELDS
+    """
+    try:
+        result = analyze_audio(file_path, **analyze_kwargs)
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    
+    record = {'file': file_path}
+    for key in RESULT_FIELDS[1:]:
+        record[key] = _to_builtin(result.get(key))
+    return record
+
+
+def analyze_batch(file_paths, workers=None, chunksize=4, **analyze_kwargs):
+    """
+    Analyze many files over a process pool, streaming the results
+    
+    Files are submitted in bounded batches so neither the list of pending
+    paths nor the results pile up in the parent process. Results are
+    yielded in input order.
+    
+    Args:
+        file_paths (iterable): Paths to audio files
+        workers (int): Number of worker processes (default: CPU count,
+            1 runs everything in the current process)
+        chunksize (int): Files sent to a worker per task
+        **analyze_kwargs: Options passed to analyze_audio (e.g. method, or
+            cache=ResultCache(...), which every worker opens on its own)
+        
+    Yields:
+        dict: One record per file (see analyze_file)
+    """
+    file_paths = iter(file_paths)
+    analyze = partial(analyze_file, **analyze_kwargs)
+    
+    if workers == 1:
+        for file_path in file_paths:
+            yield analyze(file_path)
+        return
+    
+    workers = workers or os.cpu_count() or 1
+    batch_size = workers * chunksize * 4
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(file_paths, batch_size))
+            if not batch:
+                break
+            yield from executor.map(analyze, batch, chunksize=chunksize)
+
+
+def write_jsonl(records, out):
+    """
+    Write records as JSON Lines, flushing after each one
+    
+    Args:
+        records (iterable): Result records
+        out (file): Text stream to write to
+        
+    Returns:
+        tuple: (total, failed) number of records written
+    """
+    total = failed = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out.flush()
+        total += 1
+        failed += not record['success']
+    return total, failed
+
+
+def write_csv(records, out):
+    """
+    Write records as CSV with a header row, flushing after each one
+    
+    Args:
+        records (iterable): Result records
+        out (file): Text stream to write to
+        
+    Returns:
+        tuple: (total, failed) number of records written
+    """
+    writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS)
+    writer.writeheader()
+    total = failed = 0
+    for record in records:
+        writer.writerow(record)
+        out.flush()
+        total += 1
+        failed += not record['success']
+    return total, failed
+
+
+def main(argv=None):
+    """Command line entry point for batch analysis"""
+    parser = argparse.ArgumentParser(
+        description="Analyze every audio file in directories or glob patterns")
+    parser.add_argument('paths', nargs='+',
+                        help="Directories, glob patterns or audio files")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument('-c', '--chunksize', type=int, default=4,
+                        help="Files per worker task (default: 4)")
+    parser.add_argument('-f', '--format', choices=['jsonl', 'csv'], default='jsonl',
+                        help="Output format (default: jsonl)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="Output file (default: stdout)")
+    parser.add_argument('-m', '--method', choices=sorted(PITCH_METHODS), default='fft',
+                        help="Pitch detection engine (default: fft)")
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH, metavar='PATH',
+                        help=f"Skip unchanged files already analysed, using a cache "
+                             f"database (default path: {DEFAULT_CACHE_PATH})")
+    parser.add_argument('--cache-size', type=float, default=64,
+                        help="Cache size limit in MB (default: 64)")
+    parser.add_argument('--reference', type=float, default=440.0, metavar='HZ',
+                        help="Frequency of A4 (default: 440)")
+    parser.add_argument('--temperament', default='equal',
+                        help=f"{', '.join(TEMPERAMENTS)} or a Scala .scl file (default: equal)")
+    parser.add_argument('--key', choices=NOTE_NAMES, default='C',
+                        help="Note the temperament is built on (default: C)")
+    parser.add_argument('--instrument',
+                        help="guitar, bass, violin, piano, or custom strings such as "
+                             "D2,A2,D3,G3,B3,E4 (narrows the search and snaps to strings)")
+    parser.add_argument('--no-segment', action='store_true',
+                        help="Analyze whole files instead of the sustain of their main note")
+    args = parser.parse_args(argv)
+    
+    cache = ResultCache(args.cache, int(args.cache_size * 2 ** 20)) if args.cache else None
+    records = analyze_batch(find_audio_files(args.paths), args.workers, args.chunksize,
+                            method=args.method, cache=cache,
+                            tuning=get_tuning(args.temperament, args.reference, args.key),
+                            instrument=args.instrument, segment=not args.no_segment)
+    write = write_csv if args.format == 'csv' else write_jsonl
+    
+    if args.output == '-':
+        total, failed = write(records, sys.stdout)
+    else:
+        with open(args.output, 'w', newline='', encoding='utf-8') as out:
+            total, failed = write(records, out)
+    
+    print(f"Analyzed {total} files ({failed} failed)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Pitch Benchmark Module
+Measures accuracy and speed of every analysis path on a synthetic corpus
+
+The corpus is synthesized in memory from the note table (C0-B8) with
+detuning, harmonics, noise and varied sample rates and durations, so the
+expected frequency of every case is known exactly.
+
+Usage:
+    python benchmark.py --cases 300 --json results.json
+    python benchmark.py --cases 300 --baseline results.json   # exit 1 on regression
+    python benchmark.py --startup   # import time of the command line modules
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from audio_analyzer import detect_pitch
+from generate_samples import synthesize_note
+from note_frequencies import NOTE_FREQUENCIES
+from spectral_analysis import SpectralAnalyzer
+
+
+# Harmonic profiles: relative amplitudes of harmonics 2, 3, ...
+HARMONIC_PROFILES = {
+    'pure': (),
+    'rich': (0.5, 0.33, 0.25, 0.2),
+    'weak_fundamental': (2.0, 1.0, 0.5),
+}
+
+DEFAULT_DETUNES = (-30.0, -10.0, 0.0, 10.0, 30.0)
+DEFAULT_NOISE_LEVELS = (0.0, 0.05)
+DEFAULT_SAMPLE_RATES = (22050, 44100, 48000)
+DEFAULT_DURATIONS = (0.25, 1.0)
+
+# Errors larger than this are octave/harmonic mistakes, not tuning error
+GROSS_ERROR_CENTS = 50.0
+
+# Command line entry points whose import time is guarded by --startup
+STARTUP_MODULES = ('audio_analyzer', 'spectral_analysis', 'segmentation', 'batch_analyzer',
+                   'note_monitor', 'polyphonic', 'tuner_server')
+
+# Packages that cost hundreds of ms to import and are only loaded by the
+# code that uses them; importing an entry point must not pull them in
+LAZY_MODULES = ('scipy.fft', 'scipy.io', 'scipy.signal', 'scipy.ndimage', 'matplotlib',
+                'tkinter')
+
+# Import time allowed per entry point, on top of the interpreter's own start
+DEFAULT_STARTUP_LIMIT_MS = 400.0
+
+# Run in a fresh interpreter: time one import and list what it loaded
+_STARTUP_PROBE = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "__import__(sys.argv[1])\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'ms': elapsed * 1000, 'modules': sorted(sys.modules)}))\n"
+)
+
+
+def _spectral_analyzer_pitch(audio_data, sample_rate):
+    analyzer = SpectralAnalyzer.from_array(audio_data, sample_rate)
+    return analyzer.find_fundamental_and_harmonics()['fundamental']['frequency']
+
+
+# Analysis paths under test: name -> function(audio_data, sample_rate)
+ANALYSIS_PATHS = {
+    'fft': lambda x, sr: detect_pitch(x, sr, 'fft'),
+    'fft-4096': lambda x, sr: detect_pitch(x, sr, 'fft', window_size=4096),
+    'fft-phase-4096': lambda x, sr: detect_pitch(x, sr, 'fft', window_size=4096,
+                                                 interpolation='phase'),
+    'yin': lambda x, sr: detect_pitch(x, sr, 'yin'),
+    'autocorr': lambda x, sr: detect_pitch(x, sr, 'autocorr'),
+    'spectral': _spectral_analyzer_pitch,
+}
+
+
+def build_corpus(num_cases=None, detunes=DEFAULT_DETUNES, profiles=HARMONIC_PROFILES,
+                 noise_levels=DEFAULT_NOISE_LEVELS, sample_rates=DEFAULT_SAMPLE_RATES,
+                 durations=DEFAULT_DURATIONS, seed=0):
+    """
+    Describe the benchmark cases (the audio is synthesized lazily)
+    
+    Args:
+        num_cases (int): Random subset size (default: every combination)
+        detunes (sequence): Detuning in cents applied to each note
+        profiles (dict): Harmonic profiles by name
+        noise_levels (sequence): Noise standard deviations
+        sample_rates (sequence): Sample rates in Hz
+        durations (sequence): Durations in seconds
+        seed (int): Seed for the subset choice, phases and noise
+        
+    Returns:
+        list: Case dicts with 'note', 'frequency', 'profile', 'noise',
+            'sample_rate', 'duration' and 'seed'
+    """
+    cases = []
+    for note, detune, profile, noise, sample_rate, duration in itertools.product(
+            NOTE_FREQUENCIES, detunes, profiles, noise_levels, sample_rates, durations):
+        frequency = NOTE_FREQUENCIES[note] * 2 ** (detune / 1200)
+        if frequency >= sample_rate / 2:
+            continue
+        cases.append({
+            'note': note,
+            'frequency': frequency,
+            'profile': profile,
+            'noise': noise,
+            'sample_rate': sample_rate,
+            'duration': duration,
+        })
+    
+    rng = np.random.default_rng(seed)
+    if num_cases is not None and num_cases < len(cases):
+        chosen = np.sort(rng.choice(len(cases), num_cases, replace=False))
+        cases = [cases[i] for i in chosen]
+    for case in cases:
+        case['seed'] = int(rng.integers(2 ** 31))
+    return cases
+
+
+def synthesize_case(case, profiles=HARMONIC_PROFILES):
+    """
+    Synthesize the audio of one benchmark case
+    
+    Args:
+        case (dict): Case from build_corpus
+        
+    Returns:
+        numpy.array: float32 audio data
+    """
+    rng = np.random.default_rng(case['seed'])
+    return synthesize_note(case['frequency'], case['duration'], case['sample_rate'],
+                           harmonics=profiles[case['profile']], noise=case['noise'],
+                           phase=rng.uniform(0, 2 * np.pi), rng=rng)
+
+
+def _cents_error(estimated, expected):
+    if not estimated or estimated <= 0:
+        return np.inf
+    return 1200 * np.log2(estimated / expected)
+
+
+def run_benchmark(cases, paths=None, memory=True):
+    """
+    Run every analysis path over the corpus
+    
+    Timing and accuracy are measured in one pass, after every path has run
+    once untimed so lazy imports and first-call setup are not counted (see
+    --startup for those); peak memory is measured separately under
+    tracemalloc on the longest case, so its overhead does not distort the
+    timings.
+    
+    Args:
+        cases (list): Cases from build_corpus
+        paths (list): Names from ANALYSIS_PATHS (default: all)
+        memory (bool): Also measure peak memory
+        
+    Returns:
+        dict: Report per path with 'files', 'ms_per_file', 'frames_per_sec',
+            'realtime_factor', 'peak_memory_mb' and cent error statistics
+    """
+    paths = list(ANALYSIS_PATHS) if paths is None else paths
+    elapsed = dict.fromkeys(paths, 0.0)
+    errors = {name: [] for name in paths}
+    total_samples = 0
+    total_duration = 0.0
+    
+    warm_up = synthesize_case(cases[0])
+    for name in paths:
+        ANALYSIS_PATHS[name](warm_up, cases[0]['sample_rate'])
+    
+    for case in cases:
+        audio_data = synthesize_case(case)
+        total_samples += len(audio_data)
+        total_duration += case['duration']
+        for name in paths:
+            start = time.perf_counter()
+            estimated = ANALYSIS_PATHS[name](audio_data, case['sample_rate'])
+            elapsed[name] += time.perf_counter() - start
+            errors[name].append(_cents_error(estimated, case['frequency']))
+    
+    longest = max(cases, key=lambda case: case['duration'] * case['sample_rate'])
+    report = {}
+    for name in paths:
+        abs_errors = np.abs(np.array(errors[name]))
+        gross = abs_errors > GROSS_ERROR_CENTS
+        fine = abs_errors[~gross]
+        report[name] = {
+            'files': len(cases),
+            'ms_per_file': 1000 * elapsed[name] / len(cases),
+            'frames_per_sec': total_samples / elapsed[name] if elapsed[name] else float('inf'),
+            'realtime_factor': total_duration / elapsed[name] if elapsed[name] else float('inf'),
+            'gross_error_rate': float(np.mean(gross)),
+            'cents_p50': float(np.percentile(fine, 50)) if len(fine) else None,
+            'cents_p90': float(np.percentile(fine, 90)) if len(fine) else None,
+            'cents_p99': float(np.percentile(fine, 99)) if len(fine) else None,
+            'cents_max': float(np.max(fine)) if len(fine) else None,
+        }
+        if memory:
+            report[name]['peak_memory_mb'] = _peak_memory(name, longest)
+    return report
+
+
+def _peak_memory(name, case):
+    """Peak memory (MB) allocated while analysing one case"""
+    audio_data = synthesize_case(case)
+    tracemalloc.start()
+    try:
+        ANALYSIS_PATHS[name](audio_data, case['sample_rate'])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def compare_with_baseline(report, baseline, speed_tolerance=0.25, cents_tolerance=0.5,
+                          gross_tolerance=0.01):
+    """
+    List regressions of a report against a saved baseline
+    
+    Args:
+        report (dict): Result of run_benchmark
+        baseline (dict): Earlier result of run_benchmark
+        speed_tolerance (float): Allowed relative slowdown of ms_per_file
+        cents_tolerance (float): Allowed increase of cents_p90
+        gross_tolerance (float): Allowed increase of gross_error_rate
+        
+    Returns:
+        list: Human readable regression messages (empty if none)
+    """
+    regressions = []
+    for name, current in report.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current['ms_per_file'] > base['ms_per_file'] * (1 + speed_tolerance):
+            regressions.append(f"{name}: {current['ms_per_file']:.2f} ms/file "
+                               f"(baseline {base['ms_per_file']:.2f})")
+        if (current['cents_p90'] is not None and base['cents_p90'] is not None
+                and current['cents_p90'] > base['cents_p90'] + cents_tolerance):
+            regressions.append(f"{name}: p90 error {current['cents_p90']:.2f} cents "
+                               f"(baseline {base['cents_p90']:.2f})")
+        if current['gross_error_rate'] > base['gross_error_rate'] + gross_tolerance:
+            regressions.append(f"{name}: gross error rate {current['gross_error_rate']:.1%} "
+                               f"(baseline {base['gross_error_rate']:.1%})")
+    return regressions
+
+
+def measure_startup(modules=STARTUP_MODULES, runs=5):
+    """
+    Import time of each module in fresh interpreters
+    
+    Args:
+        modules (sequence): Module names to import
+        runs (int): Interpreters started per module (the median is kept)
+        
+    Returns:
+        dict: Per module:
+            - 'ms': Median import time in milliseconds
+            - 'eager': LAZY_MODULES that the import loaded
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    report = {}
+    for module in modules:
+        times = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, '-c', _STARTUP_PROBE, module], cwd=directory,
+                                    capture_output=True, text=True, check=True).stdout
+            probe = json.loads(output.splitlines()[-1])
+            times.append(probe['ms'])
+        loaded = set(probe['modules'])
+        report[module] = {
+            'ms': float(np.median(times)),
+            'eager': [name for name in LAZY_MODULES if name in loaded]
+        }
+    return report
+
+
+def startup_regressions(report, limit_ms=DEFAULT_STARTUP_LIMIT_MS):
+    """
+    Args:
+        report (dict): Result of measure_startup
+        limit_ms (float): Allowed import time per module
+        
+    Returns:
+        list: Human readable problem messages (empty if none)
+    """
+    problems = []
+    for module, row in report.items():
+        if row['eager']:
+            problems.append(f"{module}: imports {', '.join(row['eager'])} at load")
+        if row['ms'] > limit_ms:
+            problems.append(f"{module}: {row['ms']:.0f} ms to import (limit {limit_ms:.0f})")
+    return problems
+
+
+def print_report(report):
+    """Print the benchmark report as a table"""
+    print(f"{'Path':<16} {'ms/file':>9} {'Mframes/s':>10} {'x realtime':>11} {'peak MB':>8} "
+          f"{'gross':>7} {'p50 ¢':>7} {'p90 ¢':>7} {'p99 ¢':>7}")
+    print("-" * 92)
+    for name, row in report.items():
+        cents = [f"{row[key]:7.2f}" if row[key] is not None else f"{'--':>7}"
+                 for key in ('cents_p50', 'cents_p90', 'cents_p99')]
+        peak = row.get('peak_memory_mb')
+        peak = f"{peak:8.1f}" if peak is not None else f"{'--':>8}"
+        print(f"{name:<16} {row['ms_per_file']:9.2f} {row['frames_per_sec'] / 1e6:10.2f} "
+              f"{row['realtime_factor']:11.1f} {peak} {row['gross_error_rate']:7.1%} "
+              f"{' '.join(cents)}")
+
+
+def main(argv=None):
+    """Command line entry point for the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark pitch detection speed and accuracy")
+    parser.add_argument('--cases', type=int, default=200,
+                        help="Number of random corpus cases (0 = every combination)")
+    parser.add_argument('--paths', nargs='+', choices=list(ANALYSIS_PATHS),
+                        help="Analysis paths to run (default: all)")
+    parser.add_argument('--seed', type=int, default=0, help="Corpus seed")
+    parser.add_argument('--no-memory', action='store_true', help="Skip peak memory measurement")
+    parser.add_argument('--json', help="Write the report to this JSON file")
+    parser.add_argument('--baseline', help="Compare against a saved JSON report; "
+                                           "exit with status 1 on regression")
+    parser.add_argument('--startup', action='store_true',
+                        help="Instead of the corpus, time the import of the command line "
+                             "modules and exit with status 1 if one is too slow or loads "
+                             "plotting/GUI/heavy scipy modules eagerly")
+    parser.add_argument('--startup-limit', type=float, default=DEFAULT_STARTUP_LIMIT_MS,
+                        metavar='MS', help=f"Import time allowed per module with --startup "
+                                           f"(default: {DEFAULT_STARTUP_LIMIT_MS:.0f})")
+    args = parser.parse_args(argv)
+    
+    if args.startup:
+        startup = measure_startup()
+        print(f"{'Module':<20} {'import ms':>10}  Eager heavy imports")
+        print("-" * 60)
+        for module, row in startup.items():
+            print(f"{module:<20} {row['ms']:10.1f}  {', '.join(row['eager']) or '-'}")
+        problems = startup_regressions(startup, args.startup_limit)
+        if problems:
+            print("\nStartup regressions:")
+            for message in problems:
+                print(f"  ✗ {message}")
+            sys.exit(1)
+        print("\n✓ Startup within limits")
+        return
+    
+    cases = build_corpus(args.cases or None, seed=args.seed)
+    print(f"Corpus: {len(cases)} cases")
+    report = run_benchmark(cases, args.paths, memory=not args.no_memory)
+    print_report(report)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for message in regressions:
+                print(f"  ✗ {message}")
+            sys.exit(1)
+        print("\n✓ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Decoders Module
+Pluggable audio decoders behind the same lazy view as memory-mapped WAV
+
+WAV files are memory-mapped (wav_reader.AudioView). Compressed formats
+are decoded block by block instead: a StreamView offers the same
+interface as AudioView (read, read_native, slicing, iter_chunks,
+select_channel) and pulls decoded blocks from a decoder only as far as
+the samples asked for, keeping a short history for overlapping reads.
+Nothing is transcoded to a temporary WAV and a long recording is never
+held in memory as a whole.
+
+Decoders are looked up by the file's signature (then by extension):
+soundfile (libsndfile) when it is installed, otherwise the pure NumPy
+FLAC reader; register_decoder adds others.
+"""
+
+import copy
+import os
+import numpy as np
+from wav_reader import AudioView, to_float32, to_mono_float32, DEFAULT_CHUNK_SIZE
+from flac_reader import FlacDecoder, FLAC_MAGIC
+from instrumentation import count
+
+try:
+    import soundfile
+except ImportError:  # optional: faster decoding and more formats (OGG/Vorbis, AIFF)
+    soundfile = None
+
+
+# Frames decoded before the start of a read that are kept for the next
+# one, so that overlapping reads (analysis frames, chunk borders) do not
+# restart the decoder
+HISTORY_FRAMES = 1 << 16
+
+# Reading further ahead than this restarts the decoder at a seek point
+# instead of decoding (and dropping) everything in between
+SEEK_DISTANCE = 1 << 20
+
+# Frames per block requested from soundfile
+SOUNDFILE_BLOCK = 1 << 14
+
+
+class SoundFileDecoder:
+    """
+    Streaming decoder for any format libsndfile reads (FLAC, OGG/Vorbis,
+    AIFF, ...), with exact seeking
+    
+    Integer formats come out as left-justified int16/int32 like WAV data,
+    lossy ones (Vorbis) as float32.
+    """
+    
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path (str): Path to the audio file
+        """
+        with soundfile.SoundFile(file_path) as f:
+            self.sample_rate = f.samplerate
+            self.channels = f.channels
+            self.num_frames = f.frames if f.seekable() else None
+            subtype = f.subtype
+        self.file_path = file_path
+        if subtype in ('PCM_S8', 'PCM_U8', 'PCM_16'):
+            self.dtype = np.dtype(np.int16)
+        elif subtype.startswith('PCM'):
+            self.dtype = np.dtype(np.int32)
+        else:
+            self.dtype = np.dtype(np.float32)
+    
+    def blocks(self, start=0):
+        """
+        Args:
+            start (int): First frame wanted
+            
+        Yields:
+            tuple: (position, block) of (frames, channels) native samples
+        """
+        with soundfile.SoundFile(self.file_path) as f:
+            position = f.seek(start) if start and f.seekable() else 0
+            while True:
+                block = f.read(SOUNDFILE_BLOCK, dtype=self.dtype.name, always_2d=True)
+                if not len(block):
+                    return
+                yield position, block
+                position += len(block)
+    
+    def close(self):
+        """Nothing to release: every blocks() iterator opens its own file"""
+
+
+# Decoders by file signature and by extension, preferred first. A decoder
+# is any callable taking a file path and returning an object with
+# sample_rate, channels, num_frames (None if unknown), dtype, blocks(start)
+# and close().
+_DECODERS_BY_MAGIC = {}
+_DECODERS_BY_EXTENSION = {}
+
+
+def register_decoder(decoder, extensions, magic=None):
+    """
+    Make a decoder available to open_audio (and load_audio)
+    
+    Later registrations take precedence over earlier ones.
+    
+    Args:
+        decoder (callable): decoder(file_path) -> decoder object
+        extensions (sequence): File extensions it handles (e.g. ('.flac',))
+        magic (bytes): First bytes of the files it handles, if distinctive
+    """
+    for extension in extensions:
+        _DECODERS_BY_EXTENSION.setdefault(extension.lower(), []).insert(0, decoder)
+    if magic:
+        _DECODERS_BY_MAGIC.setdefault(magic, []).insert(0, decoder)
+
+
+register_decoder(FlacDecoder, ('.flac',), FLAC_MAGIC)
+if soundfile is not None:
+    register_decoder(SoundFileDecoder, ('.flac', '.ogg', '.oga', '.aiff', '.aif'), FLAC_MAGIC)
+    register_decoder(SoundFileDecoder, (), b'OggS')
+    register_decoder(SoundFileDecoder, (), b'FORM')
+
+
+def supported_extensions():
+    """
+    Returns:
+        tuple: File extensions that open_audio can read, '.wav' first
+    """
+    return ('.wav',) + tuple(sorted(_DECODERS_BY_EXTENSION))
+
+
+def _signature(file_path, skip_tags=False):
+    with open(file_path, 'rb') as f:
+        signature = f.read(4)
+        if skip_tags and signature[:3] == b'ID3':
+            # Signature of the stream behind an ID3v2 tag (synchsafe size)
+            tag_header = f.read(6)
+            size = 0
+            for byte in tag_header[2:6]:
+                size = (size << 7) | (byte & 0x7F)
+            f.seek(10 + size)
+            signature = f.read(4)
+        return signature
+
+
+def is_wav(file_path):
+    """
+    Args:
+        file_path (str): Path to an audio file
+        
+    Returns:
+        bool: Whether the file is a RIFF/WAVE file (by content, not by name)
+    """
+    return _signature(file_path) == b'RIFF'
+
+
+def open_decoder(file_path):
+    """
+    Decoder for a compressed audio file
+    
+    Args:
+        file_path (str): Path to the audio file
+        
+    Returns:
+        Decoder object (see register_decoder)
+    """
+    # Tagged FLAC is recognised by the stream behind the tag, so the file
+    # name does not matter (uploads are saved without an extension)
+    signature = _signature(file_path, skip_tags=True)
+    candidates = [decoder for magic, decoders in _DECODERS_BY_MAGIC.items()
+                  if signature.startswith(magic) for decoder in decoders]
+    candidates += _DECODERS_BY_EXTENSION.get(os.path.splitext(file_path)[1].lower(), [])
+    if not candidates:
+        raise ValueError(f"Unsupported audio format: {file_path} "
+                         f"(supported: {', '.join(supported_extensions())})")
+    
+    errors = []
+    for decoder in candidates:
+        try:
+            return decoder(file_path)
+        except Exception as e:
+            errors.append(str(e))
+    raise ValueError(f"Could not decode {file_path}: {'; '.join(errors)}")
+
+
+def open_audio(file_path, mono=True):
+    """
+    Lazy view of any supported audio file
+    
+    Args:
+        file_path (str): Path to the audio file
+        mono (bool): Downmix to mono float32 (False: native
+            (frames, channels) samples)
+            
+    Returns:
+        AudioView for WAV files, StreamView for compressed ones (same interface)
+    """
+    if is_wav(file_path):
+        return AudioView(file_path, mono=mono)
+    return StreamView(open_decoder(file_path), mono=mono)
+
+
+class StreamView:
+    """
+    Lazy view of a decoded stream with the interface of wav_reader.AudioView
+    
+    Reads move forward through the stream, decoding only what is needed
+    and keeping HISTORY_FRAMES behind the last read. Reading before the
+    kept history (or far ahead) restarts the decoder, at a seek point when
+    the format has them.
+    """
+    
+    def __init__(self, decoder, mono=True):
+        """
+        Args:
+            decoder: Decoder object (see register_decoder)
+            mono (bool): Downmix to mono float32 (False: native
+                (frames, channels) samples)
+        """
+        self.decoder = decoder
+        self.file_path = decoder.file_path
+        self.mono = mono
+        self.sample_rate = decoder.sample_rate
+        self.channels = decoder.channels
+        self.dtype = decoder.dtype
+        self.sample_width = decoder.dtype.itemsize
+        self._channel = None
+        self._blocks = None
+        self._buffer = np.zeros((0, self.channels), dtype=self.dtype)
+        self._buffer_start = 0
+        self._num_samples = decoder.num_frames
+    
+    @property
+    def num_samples(self):
+        if self._num_samples is None:
+            # Unknown length: count the frames once, without keeping them
+            self._num_samples = sum(len(block) for _, block in self.decoder.blocks())
+        return self._num_samples
+    
+    def __len__(self):
+        return self.num_samples
+    
+    @property
+    def shape(self):
+        if self.mono:
+            return (self.num_samples,)
+        return (self.num_samples, self.channels)
+    
+    @property
+    def duration(self):
+        return self.num_samples / self.sample_rate
+    
+    def _restart(self, start):
+        if self._blocks is not None:
+            self._blocks.close()
+        self._blocks = self.decoder.blocks(start)
+        self._buffer = self._buffer[:0]
+        self._buffer_start = None
+    
+    def read_native(self, start=0, stop=None):
+        """
+        Read a range of frames in the native dtype with all channels
+        
+        Args:
+            start (int): First frame
+            stop (int): One past the last frame (default: end of stream)
+            
+        Returns:
+            numpy.array: (frames, channels) samples
+        """
+        start, stop, _ = slice(start, stop).indices(self.num_samples)
+        if start >= stop:
+            return np.zeros((0, self.channels), dtype=self.dtype)
+        
+        if self._blocks is None or not (
+                self._buffer_start <= start <= self._buffer_start + len(self._buffer) + SEEK_DISTANCE):
+            self._restart(start)
+        
+        pieces = [self._buffer]
+        end = None if self._buffer_start is None else self._buffer_start + len(self._buffer)
+        while end is None or end < stop:
+            decoded = next(self._blocks, None)
+            if decoded is None:
+                break
+            position, block = decoded
+            count('bytes_decoded', block.nbytes)
+            if end is None:
+                self._buffer_start = end = position
+            end += len(block)
+            if end <= start:
+                # Still before the wanted range: decode and drop
+                pieces = [self._buffer[:0]]
+                self._buffer_start = end
+            else:
+                pieces.append(block)
+        
+        if self._buffer_start is None:
+            return np.zeros((0, self.channels), dtype=self.dtype)
+        
+        buffer = np.concatenate(pieces) if len(pieces) > 1 else pieces[0]
+        out = np.array(buffer[start - self._buffer_start:stop - self._buffer_start])
+        
+        # Keep a short history behind the end of this read
+        keep = max(0, stop - HISTORY_FRAMES - self._buffer_start)
+        self._buffer = buffer[keep:]
+        self._buffer_start += keep
+        return out
+    
+    def read(self, start=0, stop=None):
+        """
+        Read a range of frames as mono float32
+        
+        Args:
+            start (int): First frame
+            stop (int): One past the last frame (default: end of stream)
+            
+        Returns:
+            numpy.array: Mono float32 samples ((frames, channels) native
+                samples if the view was opened with mono=False)
+        """
+        return self._convert(self.read_native(start, stop))
+    
+    def _convert(self, native):
+        if self._channel is not None:
+            return to_float32(native[:, self._channel])
+        if self.mono:
+            return to_mono_float32(native)
+        return native
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.num_samples)
+            return self._convert(self.read_native(start, stop)[::step])
+        if key < 0:
+            key += self.num_samples
+        if not 0 <= key < self.num_samples:
+            raise IndexError("Sample index out of range")
+        return self._convert(self.read_native(key, key + 1))[0]
+    
+    def select_channel(self, index):
+        """
+        View of a single channel of the stream
+        
+        Args:
+            index (int): Channel number
+            
+        Returns:
+            StreamView: Mono view of that channel only (with its own decoder position)
+        """
+        if not -self.channels <= index < self.channels:
+            raise IndexError(f"Channel {index} out of range ({self.channels} channels)")
+        
+        view = copy.copy(self)
+        view._channel = index % self.channels
+        view.mono = True
+        view._blocks = None
+        view._buffer = self._buffer[:0]
+        return view
+    
+    def iter_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE, start=0, stop=None):
+        """
+        Iterate over the stream as consecutive mono float32 chunks
+        
+        Args:
+            chunk_size (int): Frames per chunk
+            start (int): First frame
+            stop (int): One past the last frame (default: end of stream)
+            
+        Yields:
+            numpy.array: Chunk as returned by read() (the last one may be shorter)
+        """
+        stop = self.num_samples if stop is None else min(stop, self.num_samples)
+        for chunk_start in range(start, stop, chunk_size):
+            yield self.read(chunk_start, min(chunk_start + chunk_size, stop))
+    
+    def __array__(self, dtype=None, copy=None):
+        if not self.mono:
+            out = self.read_native()
+            return out if dtype is None else out.astype(dtype, copy=False)
+        
+        out = np.empty(self.num_samples, dtype=np.float32)
+        pos = 0
+        for chunk in self.iter_chunks():
+            out[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+        if dtype is not None:
+            out = out.astype(dtype, copy=False)
+        return out
+    
+    def close(self):
+        """Stop decoding and release the kept samples"""
+        if self._blocks is not None:
+            self._blocks.close()
+        self._blocks = None
+        self._buffer = self._buffer[:0]
+        self._buffer_start = 0
+        self.decoder.close()
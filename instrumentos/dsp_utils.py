@@ -0,0 +1,172 @@
+"""
+DSP Utilities Module
+Shared spectral helpers: cached windows and frequency axes, sub-bin peak
+frequency estimation
+"""
+
+from functools import lru_cache
+import numpy as np
+from instrumentation import lazy_import
+
+
+# Peak frequency estimators accepted by the analysis functions
+INTERPOLATION_METHODS = ('none', 'parabolic', 'phase')
+
+# Avoids log(0) on perfectly silent bins
+_LOG_FLOOR = 1e-12
+
+# Window functions by name ('none' is the rectangular window)
+WINDOW_FUNCTIONS = {
+    'hamming': np.hamming,
+    'hanning': np.hanning,
+    'hann': np.hanning,
+    'blackman': np.blackman,
+    'none': np.ones,
+}
+
+# How many distinct windows / frequency axes are kept around
+CACHE_SIZE = 32
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def get_window(window_type, size):
+    """
+    Window of the given type and length, built once and then reused
+    
+    The returned array is shared between callers and therefore read-only.
+    
+    Args:
+        window_type (str): 'hamming', 'hanning'/'hann', 'blackman' or 'none'
+        size (int): Number of samples
+        
+    Returns:
+        numpy.array: Read-only float64 window
+    """
+    try:
+        window = WINDOW_FUNCTIONS[window_type](size)
+    except KeyError:
+        raise ValueError(f"Unknown window type: {window_type}")
+    window.flags.writeable = False
+    return window
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def get_rfft_frequencies(size, sample_rate):
+    """
+    Frequency axis of an rfft of the given size, built once and then reused
+    
+    Args:
+        size (int): FFT size N
+        sample_rate (int): Sample rate in Hz
+        
+    Returns:
+        numpy.array: Read-only axis of N // 2 + 1 frequencies in Hz
+    """
+    freqs = lazy_import('scipy.fft').rfftfreq(size, 1/sample_rate)
+    freqs.flags.writeable = False
+    return freqs
+
+
+def parabolic_peak_offset(magnitude, peak_idx):
+    """
+    Fractional bin offset of a spectral peak by quadratic interpolation
+    
+    A parabola is fitted through the log magnitude of the peak bin and its
+    two neighbours; its vertex gives the true peak position to a small
+    fraction of a bin. Log magnitude makes the fit exact for a Gaussian
+    window and very close for Hann/Hamming.
+    
+    Args:
+        magnitude (numpy.array): Magnitude spectrum
+        peak_idx (int): Index of the local maximum
+        
+    Returns:
+        float: Offset in bins, within [-0.5, 0.5]
+    """
+    if peak_idx <= 0 or peak_idx >= len(magnitude) - 1:
+        return 0.0
+    
+    alpha, beta, gamma = np.log(np.maximum(magnitude[peak_idx - 1:peak_idx + 2], _LOG_FLOOR))
+    denominator = alpha - 2 * beta + gamma
+    if denominator >= 0:
+        # Not a strict maximum (flat or concave-up): keep the bin centre
+        return 0.0
+    
+    return float(np.clip(0.5 * (alpha - gamma) / denominator, -0.5, 0.5))
+
+
+def parabolic_peak_offsets(magnitude, peak_idx, rows=None):
+    """
+    Vectorized parabolic_peak_offset for peaks of a 2-D spectrum
+    
+    Args:
+        magnitude (numpy.array): (frames, bins) magnitude spectra
+        peak_idx (numpy.array): Peak bin of each frame
+        rows (numpy.array): Frame of each peak (default: one peak per frame,
+            in order), so several peaks of the same frame can be refined
+        
+    Returns:
+        numpy.array: Offset in bins of each peak, within [-0.5, 0.5]
+    """
+    if rows is None:
+        rows = np.arange(len(peak_idx))
+    idx = np.clip(peak_idx, 1, magnitude.shape[1] - 2)
+    
+    alpha = np.log(np.maximum(magnitude[rows, idx - 1], _LOG_FLOOR))
+    beta = np.log(np.maximum(magnitude[rows, idx], _LOG_FLOOR))
+    gamma = np.log(np.maximum(magnitude[rows, idx + 1], _LOG_FLOOR))
+    denominator = alpha - 2 * beta + gamma
+    
+    # Edge bins and non-strict maxima keep the bin centre
+    valid = (peak_idx == idx) & (denominator < 0)
+    offsets = np.zeros(len(peak_idx))
+    np.divide(0.5 * (alpha - gamma), denominator, out=offsets, where=valid)
+    
+    return np.clip(offsets, -0.5, 0.5)
+
+
+def phase_vocoder_frequency(spectrum_a, spectrum_b, peak_idx, hop_size, frame_size, sample_rate):
+    """
+    Instantaneous frequency of a peak from the phase advance between two frames
+    
+    The phase of bin k advances by 2*pi*k*hop/N between frames hop samples
+    apart; any extra advance comes from the true frequency being off the bin
+    centre. The deviation can be resolved unambiguously for offsets up to
+    N / (2 * hop) bins.
+    
+    Args:
+        spectrum_a (numpy.array): Complex rfft of the earlier frame
+        spectrum_b (numpy.array): Complex rfft of the frame hop_size later
+        peak_idx (int): Index of the peak bin
+        hop_size (int): Samples between the two frames
+        frame_size (int): FFT size N
+        sample_rate (int): Sample rate in Hz
+        
+    Returns:
+        float: Frequency in Hz
+    """
+    expected = 2 * np.pi * peak_idx * hop_size / frame_size
+    advance = np.angle(spectrum_b[peak_idx]) - np.angle(spectrum_a[peak_idx])
+    
+    # Wrap the unexpected part of the advance into [-pi, pi)
+    deviation = np.mod(advance - expected + np.pi, 2 * np.pi) - np.pi
+    true_bin = peak_idx + deviation * frame_size / (2 * np.pi * hop_size)
+    
+    return float(true_bin * sample_rate / frame_size)
+
+
+def interpolated_peak_frequency(magnitude, peak_idx, frame_size, sample_rate):
+    """
+    Peak frequency in Hz refined by parabolic interpolation
+    
+    Args:
+        magnitude (numpy.array): Magnitude spectrum from rfft
+        peak_idx (int): Index of the peak bin
+        frame_size (int): FFT size N
+        sample_rate (int): Sample rate in Hz
+        
+    Returns:
+        float: Frequency in Hz
+    """
+    offset = parabolic_peak_offset(magnitude, peak_idx)
+    return (peak_idx + offset) * sample_rate / frame_size
@@ -0,0 +1,472 @@
+"""
+FLAC Reader Module
+Pure NumPy FLAC decoding, one frame at a time
+
+Frames are decoded straight from the file in order, so a recording never
+has to be transcoded to a temporary WAV or held in memory as a whole.
+Header fields are read with plain integer operations; the Rice-coded
+residuals (the bulk of a FLAC file) are located with a binary search
+over the positions of the 1 bits and unpacked as arrays. Fixed
+predictors are undone with an exact integer IIR filter; LPC predictors
+need the sample-by-sample integer recursion of the format.
+"""
+
+import bisect
+import struct
+from operator import mul
+import numpy as np
+from instrumentation import lazy_import
+
+
+FLAC_MAGIC = b'fLaC'
+
+# Metadata block types we use
+METADATA_STREAMINFO = 0
+METADATA_SEEKTABLE = 3
+
+# Seek table placeholder entries
+_PLACEHOLDER = 0xFFFFFFFFFFFFFFFF
+
+# 14-bit pattern that starts every frame header
+FRAME_SYNC = 0x3FFE
+
+# Block sizes, sample rates and sample sizes by frame header code
+# (None: given elsewhere in the header or in STREAMINFO)
+BLOCK_SIZES = {1: 192, 2: 576, 3: 1152, 4: 2304, 5: 4608,
+               **{code: 256 << (code - 8) for code in range(8, 16)}}
+SAMPLE_RATES = (None, 88200, 176400, 192000, 8000, 16000, 22050, 24000,
+                32000, 44100, 48000, 96000)
+SAMPLE_SIZES = {0: None, 1: 8, 2: 12, 4: 16, 5: 20, 6: 24, 7: 32}
+
+# Channel assignments (frame header codes 8-10) for stereo decorrelation
+LEFT_SIDE, SIDE_RIGHT, MID_SIDE = 8, 9, 10
+
+# Coefficients of the fixed predictors, newest sample first
+FIXED_COEFFICIENTS = {0: (), 1: (1,), 2: (2, -1), 3: (3, -3, 1), 4: (4, -6, 4, -1)}
+
+# Bytes read from the file at once
+_READ_SIZE = 1 << 20
+
+
+def read_flac_header(file_path):
+    """
+    Parse the metadata blocks of a FLAC file without decoding any audio
+    
+    Args:
+        file_path (str): Path to FLAC file
+        
+    Returns:
+        dict: Header information containing:
+            - 'sample_rate': Sample rate in Hz
+            - 'channels': Number of channels
+            - 'bits_per_sample': Bits per decoded sample
+            - 'num_samples': Number of frames (samples per channel), or
+              None if the encoder did not know it
+            - 'min_block_size', 'max_block_size': Samples per frame
+            - 'max_frame_size': Bytes per frame (0 if unknown)
+            - 'first_frame_offset': Byte offset of the first audio frame
+            - 'seek_points': (sample, byte offset from the first frame)
+              pairs of the seek table, ascending
+    """
+    with open(file_path, 'rb') as f:
+        magic = f.read(4)
+        if magic[:3] == b'ID3':
+            # An ID3v2 tag in front of the stream: skip it (synchsafe size)
+            tag_header = f.read(6)
+            size = 0
+            for byte in tag_header[2:6]:
+                size = (size << 7) | (byte & 0x7F)
+            f.seek(10 + size)
+            magic = f.read(4)
+        if magic != FLAC_MAGIC:
+            raise ValueError("Not a FLAC file")
+        
+        header = None
+        seek_points = []
+        last = False
+        while not last:
+            block_header = f.read(4)
+            if len(block_header) < 4:
+                raise ValueError("Truncated FLAC metadata")
+            last = bool(block_header[0] & 0x80)
+            block_type = block_header[0] & 0x7F
+            length = int.from_bytes(block_header[1:], 'big')
+            data = f.read(length)
+            
+            if block_type == METADATA_STREAMINFO:
+                min_block, max_block = struct.unpack('>HH', data[:4])
+                max_frame = int.from_bytes(data[7:10], 'big')
+                packed = int.from_bytes(data[10:18], 'big')
+                header = {
+                    'sample_rate': packed >> 44,
+                    'channels': ((packed >> 41) & 0x7) + 1,
+                    'bits_per_sample': ((packed >> 36) & 0x1F) + 1,
+                    'num_samples': (packed & 0xFFFFFFFFF) or None,
+                    'min_block_size': min_block,
+                    'max_block_size': max_block,
+                    'max_frame_size': max_frame,
+                }
+            elif block_type == METADATA_SEEKTABLE:
+                for entry in range(length // 18):
+                    sample, offset, _ = struct.unpack_from('>QQH', data, entry * 18)
+                    if sample != _PLACEHOLDER:
+                        seek_points.append((sample, offset))
+        
+        if header is None:
+            raise ValueError("FLAC file has no STREAMINFO block")
+        header['first_frame_offset'] = f.tell()
+        header['seek_points'] = sorted(seek_points)
+    
+    return header
+
+
+class _NeedMoreData(Exception):
+    """A frame runs past the end of the bytes handed to the bit reader"""
+
+
+class _BitReader:
+    """Big-endian bit reader over the bytes of one frame (and whatever follows)"""
+    
+    def __init__(self, data):
+        self.data = data
+        self.bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        self.num_bits = len(self.bits)
+        self.pos = 0
+        self._ones = None
+    
+    def read(self, n):
+        """Unsigned n-bit integer"""
+        if n == 0:
+            return 0
+        end = self.pos + n
+        if end > self.num_bits:
+            raise _NeedMoreData
+        first, last = self.pos >> 3, (end + 7) >> 3
+        value = int.from_bytes(self.data[first:last], 'big')
+        self.pos = end
+        return (value >> ((last << 3) - end)) & ((1 << n) - 1)
+    
+    def read_signed(self, n):
+        """Two's complement n-bit integer"""
+        value = self.read(n)
+        return value - (1 << n) if n and value >> (n - 1) else value
+    
+    def read_signed_array(self, count, width):
+        """count consecutive two's complement integers of width bits"""
+        end = self.pos + count * width
+        if end > self.num_bits:
+            raise _NeedMoreData
+        if width == 0:
+            return np.zeros(count, dtype=np.int64)
+        
+        bits = self.bits[self.pos:end].reshape(count, width).astype(np.int64)
+        self.pos = end
+        values = bits @ (1 << np.arange(width - 1, -1, -1, dtype=np.int64))
+        return values - (bits[:, 0] << width)
+    
+    def read_unary(self):
+        """Number of 0 bits before the next 1 bit"""
+        ones = self._one_positions()
+        index = bisect.bisect_left(ones, self.pos)
+        if index == len(ones):
+            raise _NeedMoreData
+        count = ones[index] - self.pos
+        self.pos = ones[index] + 1
+        return count
+    
+    def read_rice(self, count, parameter):
+        """
+        count Rice-coded signed integers with the given parameter
+        
+        Each code is a unary quotient, a 1 bit and parameter remainder
+        bits. Only the end of every quotient is found one code at a time
+        (a binary search in the list of 1 bits); the values themselves
+        are assembled as arrays.
+        """
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+        
+        ones = self._one_positions()
+        step = parameter + 1
+        position = self.pos
+        index = 0
+        stops = []
+        try:
+            for _ in range(count):
+                index = bisect.bisect_left(ones, position, index)
+                stops.append(ones[index])
+                position = ones[index] + step
+        except IndexError:
+            raise _NeedMoreData
+        if position > self.num_bits:
+            raise _NeedMoreData
+        
+        stops = np.array(stops, dtype=np.int64)
+        starts = np.empty_like(stops)
+        starts[0] = self.pos
+        starts[1:] = stops[:-1] + step
+        values = (stops - starts) << parameter
+        if parameter:
+            remainder = self.bits[(stops + 1)[:, None] + np.arange(parameter)].astype(np.int64)
+            values |= remainder @ (1 << np.arange(parameter - 1, -1, -1, dtype=np.int64))
+        self.pos = position
+        return (values >> 1) ^ -(values & 1)
+    
+    def align(self):
+        """Skip to the next byte boundary"""
+        self.pos = (self.pos + 7) & ~7
+    
+    def _one_positions(self):
+        if self._ones is None:
+            self._ones = np.flatnonzero(self.bits).tolist()
+        return self._ones
+
+
+def _read_coded_number(reader):
+    """Frame or sample number in FLAC's UTF-8-like variable length code"""
+    first = reader.read(8)
+    length = 0
+    while first & (0x80 >> length):
+        length += 1
+    if length == 0:
+        return first
+    if length == 1 or length > 7:
+        raise ValueError("Invalid coded number in FLAC frame header")
+    
+    value = first & (0x7F >> length)
+    for _ in range(length - 1):
+        value = (value << 6) | (reader.read(8) & 0x3F)
+    return value
+
+
+def _read_residual(reader, block_size, predictor_order):
+    """Rice-coded prediction residual of one subframe"""
+    method = reader.read(2)
+    if method > 1:
+        raise ValueError(f"Reserved FLAC residual coding method: {method}")
+    parameter_bits = 4 if method == 0 else 5
+    escape = (1 << parameter_bits) - 1
+    
+    partition_order = reader.read(4)
+    partition_size = block_size >> partition_order
+    residual = np.empty(block_size - predictor_order, dtype=np.int64)
+    filled = 0
+    for partition in range(1 << partition_order):
+        count = partition_size - (predictor_order if partition == 0 else 0)
+        parameter = reader.read(parameter_bits)
+        if parameter == escape:
+            # Unencoded partition: fixed-width raw samples
+            values = reader.read_signed_array(count, reader.read(5))
+        else:
+            values = reader.read_rice(count, parameter)
+        residual[filled:filled + count] = values
+        filled += count
+    return residual
+
+
+def _restore_fixed(warmup, residual, order):
+    """Undo a fixed predictor (integer coefficients, no rounding)"""
+    if order == 0:
+        return residual
+    signal = lazy_import('scipy.signal')  # slow to import: only loaded for FLAC
+    
+    # Integers well below 2 ** 53 throughout, so float64 filtering is exact
+    a = np.concatenate(([1.0], -np.array(FIXED_COEFFICIENTS[order], dtype=np.float64)))
+    zi = signal.lfiltic([1.0], a, warmup[::-1].astype(np.float64))
+    samples = signal.lfilter([1.0], a, residual.astype(np.float64), zi=zi)[0]
+    return np.concatenate((warmup, np.rint(samples).astype(np.int64)))
+
+
+def _restore_lpc(warmup, coefficients, shift, residual):
+    """Undo an LPC predictor (the shifted prediction must be floored per sample)"""
+    order = len(coefficients)
+    oldest_first = coefficients[::-1]
+    samples = warmup.tolist()
+    for value in residual.tolist():
+        samples.append(value + (sum(map(mul, oldest_first, samples[-order:])) >> shift))
+    return np.array(samples, dtype=np.int64)
+
+
+def _read_subframe(reader, block_size, bits):
+    """Decode one channel of a frame"""
+    if reader.read(1):
+        raise ValueError("Invalid FLAC subframe padding")
+    kind = reader.read(6)
+    wasted = reader.read_unary() + 1 if reader.read(1) else 0
+    bits -= wasted
+    
+    if kind == 0:
+        samples = np.full(block_size, reader.read_signed(bits), dtype=np.int64)
+    elif kind == 1:
+        samples = reader.read_signed_array(block_size, bits)
+    elif 8 <= kind <= 12:
+        order = kind - 8
+        warmup = reader.read_signed_array(order, bits)
+        samples = _restore_fixed(warmup, _read_residual(reader, block_size, order), order)
+    elif kind >= 32:
+        order = kind - 31
+        warmup = reader.read_signed_array(order, bits)
+        precision = reader.read(4) + 1
+        shift = reader.read_signed(5)
+        if precision == 16 or shift < 0:
+            raise ValueError("Invalid FLAC LPC subframe")
+        coefficients = [reader.read_signed(precision) for _ in range(order)]
+        samples = _restore_lpc(warmup, coefficients, shift,
+                               _read_residual(reader, block_size, order))
+    else:
+        raise ValueError(f"Reserved FLAC subframe type: {kind}")
+    
+    return samples << wasted if wasted else samples
+
+
+def _read_frame(reader, header):
+    """
+    Decode one frame
+    
+    Returns:
+        tuple: (position, samples) with the first sample number of the
+            frame and its (block_size, channels) int64 samples
+    """
+    if reader.read(14) != FRAME_SYNC:
+        raise ValueError("Lost FLAC frame sync")
+    reader.read(1)
+    variable_block_size = reader.read(1)
+    block_code = reader.read(4)
+    rate_code = reader.read(4)
+    assignment = reader.read(4)
+    size_code = reader.read(3)
+    reader.read(1)
+    number = _read_coded_number(reader)
+    
+    if block_code == 6:
+        block_size = reader.read(8) + 1
+    elif block_code == 7:
+        block_size = reader.read(16) + 1
+    elif block_code in BLOCK_SIZES:
+        block_size = BLOCK_SIZES[block_code]
+    else:
+        raise ValueError(f"Reserved FLAC block size code: {block_code}")
+    # The rate in the header only matters for streams without STREAMINFO
+    if rate_code == 12:
+        reader.read(8)
+    elif rate_code in (13, 14):
+        reader.read(16)
+    reader.read(8)  # CRC-8 of the header
+    
+    bits = SAMPLE_SIZES.get(size_code) or header['bits_per_sample']
+    if assignment < 8:
+        channels = assignment + 1
+    elif assignment <= MID_SIDE:
+        channels = 2
+    else:
+        raise ValueError(f"Reserved FLAC channel assignment: {assignment}")
+    
+    # The side channel needs one extra bit
+    side = {LEFT_SIDE: 1, SIDE_RIGHT: 0, MID_SIDE: 1}.get(assignment)
+    subframes = [_read_subframe(reader, block_size, bits + (channel == side))
+                 for channel in range(channels)]
+    
+    if assignment == LEFT_SIDE:
+        left, side_channel = subframes
+        subframes = [left, left - side_channel]
+    elif assignment == SIDE_RIGHT:
+        side_channel, right = subframes
+        subframes = [side_channel + right, right]
+    elif assignment == MID_SIDE:
+        mid, side_channel = subframes
+        mid = (mid << 1) | (side_channel & 1)
+        subframes = [(mid + side_channel) >> 1, (mid - side_channel) >> 1]
+    
+    reader.align()
+    reader.read(16)  # CRC-16 of the frame
+    
+    position = number if variable_block_size else number * header['max_block_size']
+    return position, np.column_stack(subframes)
+
+
+class FlacDecoder:
+    """
+    Streaming decoder of a FLAC file into native integer blocks
+    
+    Samples come out left-justified like WAV data: int16 for up to 16
+    bits per sample, int32 otherwise (see wav_reader.to_float32).
+    """
+    
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path (str): Path to FLAC file
+        """
+        self._header = read_flac_header(file_path)
+        self.file_path = file_path
+        self.sample_rate = self._header['sample_rate']
+        self.channels = self._header['channels']
+        self.num_frames = self._header['num_samples']
+        bits = self._header['bits_per_sample']
+        self.dtype = np.dtype(np.int16 if bits <= 16 else np.int32)
+        self._justify = 8 * self.dtype.itemsize - bits
+    
+    def blocks(self, start=0):
+        """
+        Decode frame by frame
+        
+        Decoding starts at the last seek point at or before start (or at
+        the beginning of the file without a seek table).
+        
+        Args:
+            start (int): First sample wanted
+            
+        Yields:
+            tuple: (position, block), position being the number of the
+                first sample of the (frames, channels) native block
+        """
+        header = self._header
+        offset = header['first_frame_offset']
+        for sample, point_offset in header['seek_points']:
+            if sample > start:
+                break
+            offset = header['first_frame_offset'] + point_offset
+        
+        # Enough bytes for any frame; grown if a frame turns out larger
+        window = header['max_frame_size'] or (
+            header['max_block_size'] * self.channels * (header['bits_per_sample'] + 1) // 8 + 64)
+        
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            data = b''
+            used = 0
+            end_of_file = False
+            position_end = 0
+            while True:
+                if len(data) - used < window and not end_of_file:
+                    more = f.read(max(_READ_SIZE, window))
+                    end_of_file = len(more) < max(_READ_SIZE, window)
+                    data = data[used:] + more
+                    used = 0
+                if len(data) - used < 2:
+                    return
+                
+                reader = _BitReader(data[used:used + window])
+                try:
+                    position, samples = _read_frame(reader, header)
+                except _NeedMoreData:
+                    if end_of_file and used + window >= len(data):
+                        if self.num_frames is None:
+                            return
+                        raise ValueError("Truncated FLAC frame")
+                    window *= 2
+                    continue
+                except ValueError:
+                    # Trailing tags (ID3v1) after the last frame are not audio
+                    if self.num_frames is not None and position_end >= self.num_frames:
+                        return
+                    raise
+                
+                used += reader.pos >> 3
+                position_end = position + len(samples)
+                if self._justify:
+                    samples <<= self._justify
+                yield position, samples.astype(self.dtype)
+    
+    def close(self):
+        """Nothing to release: every blocks() iterator opens its own file handle"""
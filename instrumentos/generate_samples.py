@@ -29,6 +29,41 @@ def generate_tone(frequency, duration=2.0, sample_rate=44100, amplitude=0.5):
     return tone_int16
 
 
+def synthesize_note(frequency, duration=1.0, sample_rate=44100, amplitude=0.5,
+                    harmonics=(), noise=0.0, phase=0.0, rng=None):
+    """
+    Synthesize a note with optional harmonics and noise, in memory
+    
+    Harmonics at or above the Nyquist frequency are left out so the
+    signal never aliases.
+    
+    Args:
+        frequency (float): Fundamental frequency in Hz
+        duration (float): Duration in seconds
+        sample_rate (int): Sample rate in Hz
+        amplitude (float): Amplitude of the fundamental
+        harmonics (sequence): Relative amplitudes of harmonics 2, 3, ...
+        noise (float): Standard deviation of white noise, relative to amplitude
+        phase (float): Starting phase in radians
+        rng (numpy.random.Generator): Random source for the noise
+        
+    Returns:
+        numpy.array: float32 audio data
+    """
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    tone = np.sin(2 * np.pi * frequency * t + phase)
+    
+    for order, weight in enumerate(harmonics, start=2):
+        if order * frequency < sample_rate / 2:
+            tone += weight * np.sin(2 * np.pi * order * frequency * t + order * phase)
+    
+    if noise:
+        rng = np.random.default_rng() if rng is None else rng
+        tone += rng.normal(0.0, noise, len(t))
+    
+    return (amplitude * tone).astype(np.float32)
+
+
 def create_sample_files():
     """Create sample audio files for testing"""
     
@@ -0,0 +1,387 @@
+"""
+Instrumentation Module
+Opt-in per-stage timers and counters for the analysis pipeline
+
+The pipeline marks its stages (load, segment, pitch, FFT, note lookup,
+...) with stage() and its work with count() (bytes read, samples
+transformed, FFT sizes). Nothing is measured until a Profiler is enabled:
+while disabled, stage() hands back a shared no-op context manager and
+count() returns at once, so the hooks cost a function call each.
+
+Stages nest: a stage opened inside another is recorded under the outer
+one's path ('pitch/fft'), so the report is a breakdown of where
+the time of every stage went. When profiling stops, the report is passed
+to the sinks: print_report for a table, or LoggingSink, JSONSink and
+PrometheusSink to feed other tools.
+
+Heavy modules are imported on first use through lazy_import(). The first
+import is reported as its own top-level 'import' stage and left out of
+the stages it happened inside, so a single cold run still tells reading
+and transforming apart from loading scipy.
+"""
+
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Prefix of the metric names written by PrometheusSink
+METRIC_PREFIX = 'afinador'
+
+# The profiler being fed, or None when instrumentation is off
+_active = None
+
+
+class Profiler:
+    """
+    Accumulates stage times and counters, from any thread
+    """
+    
+    def __init__(self):
+        self.stages = {}    # path -> [calls, seconds]
+        self.counters = {}  # (name, label) -> total
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    def exclude(self, seconds):
+        """Leave time spent elsewhere out of the stages open in this thread"""
+        for open_stage in self._stack():
+            open_stage.excluded += seconds
+    
+    def add_time(self, path, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(path, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+    
+    def count(self, name, amount=1, label=None):
+        with self._lock:
+            key = (name, label)
+            self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def report(self):
+        """
+        Returns:
+            dict: Snapshot of the measurements:
+                - 'wall_seconds': Time since the profiler was created
+                - 'stages': {path: {'calls', 'seconds'}} in the order the
+                  stages first finished
+                - 'counters': List of {'name', 'label', 'value'}
+        """
+        with self._lock:
+            return {
+                'wall_seconds': time.perf_counter() - self.started,
+                'stages': {path: {'calls': calls, 'seconds': seconds}
+                           for path, (calls, seconds) in self.stages.items()},
+                'counters': [{'name': name, 'label': label, 'value': value}
+                             for (name, label), value in sorted(
+                                 self.counters.items(), key=lambda item: str(item[0]))]
+            }
+
+
+class _Stage:
+    """Times one run of a stage on the active profiler"""
+    
+    __slots__ = ('profiler', 'name', 'path', 'start', 'excluded')
+    
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.excluded = 0.0
+    
+    def __enter__(self):
+        stack = self.profiler._stack()
+        stack.append(self)
+        self.path = '/'.join(open_stage.name for open_stage in stack)
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start - self.excluded
+        self.profiler._stack().pop()
+        self.profiler.add_time(self.path, elapsed)
+        return False
+
+
+class _NoStage:
+    """Stage used while instrumentation is off"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    """
+    Time a stage of the pipeline
+    
+    Usage: with stage('fft'): ...
+    
+    Args:
+        name (str): Stage name, recorded under the stages it runs inside
+        
+    Returns:
+        Context manager (a shared no-op one when instrumentation is off)
+    """
+    profiler = _active
+    if profiler is None:
+        return _NO_STAGE
+    return _Stage(profiler, name)
+
+
+def count(name, amount=1, label=None):
+    """
+    Add to a counter (e.g. count('samples_transformed', n))
+    
+    Args:
+        name (str): Counter name
+        amount (int): Amount to add
+        label (str): Optional sub-key, such as the FFT size of an 'fft' count
+    """
+    profiler = _active
+    if profiler is not None:
+        profiler.count(name, amount, label)
+
+
+def lazy_import(name):
+    """
+    Import a module on first use (e.g. rfft = lazy_import('scipy.fft').rfft)
+    
+    While profiling, a first import is timed as 'import/<name>' and its
+    time is not charged to the stages it happens inside.
+    
+    Args:
+        name (str): Full module name
+        
+    Returns:
+        module: The module
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    
+    profiler = _active
+    if profiler is None:
+        return importlib.import_module(name)
+    
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    profiler.exclude(elapsed)
+    profiler.add_time('import', elapsed)
+    profiler.add_time(f'import/{name}', elapsed)
+    return module
+
+
+def enabled():
+    """
+    Returns:
+        bool: Whether a profiler is collecting (to skip costly measurements)
+    """
+    return _active is not None
+
+
+def enable():
+    """
+    Start collecting into a new profiler
+    
+    Returns:
+        Profiler: The profiler now being fed
+    """
+    global _active
+    _active = Profiler()
+    return _active
+
+
+def disable(sinks=()):
+    """
+    Stop collecting and hand the report to the sinks
+    
+    Args:
+        sinks (sequence): Callables taking the report dict (see Profiler.report)
+        
+    Returns:
+        dict: The report, or None if nothing was being collected
+    """
+    global _active
+    profiler, _active = _active, None
+    if profiler is None:
+        return None
+    
+    report = profiler.report()
+    for sink in sinks:
+        sink(report)
+    return report
+
+
+@contextmanager
+def profiling(*sinks):
+    """
+    Profile a block of code: with profiling(print_report): analyze_audio(...)
+    
+    Args:
+        *sinks: Callables taking the report when the block ends
+        
+    Yields:
+        Profiler: The profiler being fed
+    """
+    profiler = enable()
+    try:
+        yield profiler
+    finally:
+        disable(sinks)
+
+
+def format_report(report):
+    """
+    Args:
+        report (dict): Output of Profiler.report
+        
+    Returns:
+        str: Table of stages (indented by nesting, with their share of the
+            wall time) followed by the counters
+    """
+    wall = report['wall_seconds'] or 1e-12
+    lines = [f"{'Stage':<32} {'Calls':>7} {'Time (ms)':>11} {'%':>6}"]
+    # Stages in pipeline order, each followed by the stages inside it
+    order = {path: index for index, path in enumerate(report['stages'])}
+    def position(path):
+        parts = path.split('/')
+        return tuple(order.get('/'.join(parts[:depth]), -1) for depth in range(1, len(parts) + 1))
+    
+    for path in sorted(report['stages'], key=position):
+        entry = report['stages'][path]
+        depth = path.count('/')
+        name = '  ' * depth + path.rsplit('/', 1)[-1]
+        lines.append(f"{name:<32} {entry['calls']:>7} {entry['seconds'] * 1000:>11.3f} "
+                     f"{100 * entry['seconds'] / wall:>6.1f}")
+    lines.append(f"{'(wall)':<32} {'':>7} {wall * 1000:>11.3f} {100.0:>6.1f}")
+    
+    if report['counters']:
+        lines.append("")
+        lines.append(f"{'Counter':<32} {'Value':>19}")
+        for counter in report['counters']:
+            name = counter['name'] if counter['label'] is None else \
+                f"{counter['name']} [{counter['label']}]"
+            lines.append(f"{name:<32} {counter['value']:>19,}")
+    return "\n".join(lines)
+
+
+def print_report(report):
+    """Sink that prints the stage breakdown (used by --profile)"""
+    print(format_report(report))
+
+
+class LoggingSink:
+    """
+    Sink that logs one line per stage and counter
+    """
+    
+    def __init__(self, logger=None, level=logging.INFO):
+        """
+        Args:
+            logger (logging.Logger): Destination (default: this module's logger)
+            level (int): Logging level of the lines
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+    
+    def __call__(self, report):
+        for path, entry in report['stages'].items():
+            self.logger.log(self.level, "stage %s: %d calls, %.3f ms",
+                            path, entry['calls'], entry['seconds'] * 1000)
+        for counter in report['counters']:
+            self.logger.log(self.level, "counter %s%s: %s", counter['name'],
+                            '' if counter['label'] is None else f"[{counter['label']}]",
+                            counter['value'])
+
+
+class JSONSink:
+    """
+    Sink that appends every report as one JSON line to a file
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path (str): File the reports are appended to
+        """
+        self.path = path
+    
+    def __call__(self, report):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(report, time=time.time())) + "\n")
+
+
+class PrometheusSink:
+    """
+    Sink that writes the report as a Prometheus text file
+    
+    The file is replaced atomically, as the node exporter's textfile
+    collector expects. Stage times and calls are labelled with the stage
+    path; counters with their label, if any.
+    """
+    
+    def __init__(self, path, prefix=METRIC_PREFIX):
+        """
+        Args:
+            path (str): Destination file (conventionally *.prom)
+            prefix (str): Prefix of every metric name
+        """
+        self.path = path
+        self.prefix = prefix
+    
+    def __call__(self, report):
+        seconds = f"{self.prefix}_stage_seconds_total"
+        calls = f"{self.prefix}_stage_calls_total"
+        lines = [f"# TYPE {seconds} counter", f"# TYPE {calls} counter"]
+        for path, entry in report['stages'].items():
+            lines.append(f'{seconds}{{stage="{path}"}} {entry["seconds"]:.9f}')
+            lines.append(f'{calls}{{stage="{path}"}} {entry["calls"]}')
+        
+        typed = set()
+        for counter in report['counters']:
+            metric = f"{self.prefix}_{counter['name']}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            label = '' if counter['label'] is None else f'{{label="{counter["label"]}"}}'
+            lines.append(f"{metric}{label} {counter['value']}")
+        
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.path)
+
+
+def sink_for_path(path):
+    """
+    Args:
+        path (str): Output file: *.prom gets Prometheus text, anything
+            else JSON lines
+            
+    Returns:
+        callable: Sink writing to that file
+    """
+    if path.endswith('.prom'):
+        return PrometheusSink(path)
+    return JSONSink(path)
@@ -0,0 +1,218 @@
+"""
+Instrument Profiles Module
+Search bands and string targets for instrument-aware pitch detection
+
+Knowing the instrument narrows the fundamental search from 20-5000 Hz to
+the notes the instrument can actually play. The signal is low-pass
+filtered and decimated to the lowest sample rate that still covers that
+band, so the FFT (or YIN) runs on a fraction of the samples and cannot
+lock onto noise or a harmonic far above the highest note. Profiles with
+strings report the deviation from the nearest open string, like the
+string mode of a hardware tuner.
+"""
+
+import numpy as np
+from instrumentation import lazy_import
+from note_frequencies import get_instrument_range, get_note_from_frequency, DEFAULT_TUNING
+
+
+# Analysis sample rate as a multiple of the highest searched frequency;
+# the margin above 2x leaves room for the anti-aliasing filter's transition band
+RATE_MARGIN = 2.5
+
+# How far below its lowest string (and, for custom string sets, above its
+# highest) an instrument may be tuned and still be analysed, in cents
+STRING_MARGIN_CENTS = 300
+
+# Room left beyond both ends of a range-only profile (piano), so its
+# lowest and highest notes are still found when slightly out of tune
+RANGE_MARGIN_CENTS = 100
+
+# Open strings in standard tuning, lowest first
+STANDARD_STRINGS = {
+    'guitar': ('E2', 'A2', 'D3', 'G3', 'B3', 'E4'),
+    'bass': ('E1', 'A1', 'D2', 'G2'),
+    'violin': ('G3', 'D4', 'A4', 'E5'),
+    'piano': (),
+}
+
+
+class InstrumentProfile:
+    """
+    Frequency range and open strings of an instrument
+    
+    Like TuningSystem, profiles are small immutable objects that can be
+    passed to worker processes and described in cache keys.
+    """
+    
+    def __init__(self, name, min_freq, max_freq, strings=()):
+        """
+        Args:
+            name (str): Instrument name
+            min_freq (float): Lowest fundamental searched, in Hz
+            max_freq (float): Highest fundamental searched, in Hz
+            strings (sequence): Open string notes (e.g., ('E2', 'A2', ...));
+                empty for instruments without strings to tune
+        """
+        if not 0 < min_freq < max_freq:
+            raise ValueError("Instrument range needs 0 < min_freq < max_freq")
+        self.name = name
+        self.min_freq = float(min_freq)
+        self.max_freq = float(max_freq)
+        self.strings = tuple(strings)
+    
+    @classmethod
+    def from_strings(cls, strings, name='custom', tuning=None):
+        """
+        Profile for a custom set of open strings (alternate tunings, other
+        instruments)
+        
+        The search band spans the strings plus STRING_MARGIN_CENTS on both
+        sides, which is what tuning them needs.
+        
+        Args:
+            strings (sequence): Open string notes, e.g. ('D2', 'A2', 'D3',
+                'G3', 'B3', 'E4') for drop D
+            name (str): Instrument name
+            tuning (TuningSystem): Tuning the string notes are taken from
+            
+        Returns:
+            InstrumentProfile: The profile
+        """
+        tuning = tuning or DEFAULT_TUNING
+        frequencies = sorted(tuning.note_frequency(note) for note in strings)
+        if not frequencies:
+            raise ValueError("A custom instrument needs at least one string")
+        margin = 2 ** (STRING_MARGIN_CENTS / 1200)
+        return cls(name, frequencies[0] / margin, frequencies[-1] * margin, strings)
+    
+    def __repr__(self):
+        return (f"InstrumentProfile({self.name!r}, {self.min_freq:.1f}-{self.max_freq:.1f} Hz, "
+                f"strings={self.strings})")
+    
+    def params(self):
+        """
+        Returns:
+            dict: JSON-serializable description of the profile (for cache keys)
+        """
+        return {'name': self.name, 'min_freq': self.min_freq, 'max_freq': self.max_freq,
+                'strings': list(self.strings)}
+    
+    def decimation_factor(self, sample_rate):
+        """
+        Args:
+            sample_rate (int): Original sample rate in Hz
+            
+        Returns:
+            int: Largest integer factor that keeps the band below Nyquist
+                with RATE_MARGIN to spare (1 means no decimation)
+        """
+        return max(1, int(sample_rate // (RATE_MARGIN * self.max_freq)))
+    
+    def band_limit(self, audio_data, sample_rate):
+        """
+        Low-pass filter and decimate a signal to the profile's band
+        
+        resample_poly applies a polyphase anti-aliasing FIR at the output
+        rate, so only the kept samples are ever computed.
+        
+        Args:
+            audio_data (numpy.array): Mono audio signal (array or AudioView)
+            sample_rate (int): Sample rate in Hz
+            
+        Returns:
+            tuple: (audio_data, sample_rate) at the reduced rate; the input
+                is returned unchanged when no decimation is possible
+        """
+        factor = self.decimation_factor(sample_rate)
+        if factor == 1:
+            return audio_data, sample_rate
+        
+        resample_poly = lazy_import('scipy.signal').resample_poly  # slow to import
+        decimated = resample_poly(np.asarray(audio_data, dtype=np.float32), 1, factor)
+        return decimated.astype(np.float32, copy=False), sample_rate / factor
+    
+    def identify_note(self, frequency, tuning=None):
+        """
+        Target note for a detected frequency
+        
+        Profiles with strings snap to the nearest open string (in cents)
+        when it is within STRING_MARGIN_CENTS; farther frequencies (a
+        fretted note above the top string) and profiles without strings
+        fall back to the nearest note of the tuning.
+        
+        Args:
+            frequency (float or numpy.array): Frequency in Hz
+            tuning (TuningSystem): Reference pitch and temperament
+            
+        Returns:
+            tuple: (note_name, exact_frequency, cents_deviation), like
+                get_note_from_frequency
+        """
+        if not self.strings:
+            return get_note_from_frequency(frequency, tuning)
+        
+        tuning = tuning or DEFAULT_TUNING
+        order = sorted(self.strings, key=tuning.note_frequency)
+        names = np.array(order, dtype=object)
+        exact_freqs = np.array([tuning.note_frequency(note) for note in order])
+        targets = np.log2(exact_freqs)
+        boundaries = (targets[:-1] + targets[1:]) / 2
+        
+        frequency_array = np.asarray(frequency, dtype=np.float64)
+        valid = np.isfinite(frequency_array) & (frequency_array > 0)
+        log2_freqs = np.log2(frequency_array, out=np.full(frequency_array.shape, np.nan),
+                             where=valid)
+        idx = np.searchsorted(boundaries, np.where(valid, log2_freqs, 0.0))
+        cents = 1200 * (log2_freqs - targets[idx])
+        captured = valid & (np.abs(np.nan_to_num(cents, nan=np.inf)) <= STRING_MARGIN_CENTS)
+        
+        if np.ndim(frequency) > 0:
+            notes, exact, note_cents = get_note_from_frequency(frequency_array, tuning)
+            return (np.where(captured, names[idx], notes),
+                    np.where(captured, exact_freqs[idx], exact),
+                    np.where(captured, cents, note_cents))
+        if not captured:
+            return get_note_from_frequency(float(frequency_array), tuning)
+        return names[idx], float(exact_freqs[idx]), float(cents)
+
+
+def _standard_profile(name):
+    min_freq, max_freq = get_instrument_range(name)
+    strings = STANDARD_STRINGS[name]
+    if strings:
+        # Leave room for instruments tuned down (drop tunings, slack strings)
+        min_freq = min(min_freq, DEFAULT_TUNING.note_frequency(strings[0]))
+        min_freq /= 2 ** (STRING_MARGIN_CENTS / 1200)
+    else:
+        margin = 2 ** (RANGE_MARGIN_CENTS / 1200)
+        min_freq, max_freq = min_freq / margin, max_freq * margin
+    return InstrumentProfile(name, min_freq, max_freq, strings)
+
+
+# Built-in profiles by name
+PROFILES = {name: _standard_profile(name) for name in STANDARD_STRINGS}
+
+
+def get_instrument(instrument):
+    """
+    Instrument profile from a name, a list of strings or a profile
+    
+    Args:
+        instrument: InstrumentProfile, a name from PROFILES, or
+            comma-separated open strings (e.g., 'D2,A2,D3,G3,B3,E4')
+            
+    Returns:
+        InstrumentProfile: The profile
+    """
+    if isinstance(instrument, InstrumentProfile):
+        return instrument
+    
+    name = instrument.strip().lower()
+    if name in PROFILES:
+        return PROFILES[name]
+    if ',' in instrument or instrument[:1].isupper():
+        return InstrumentProfile.from_strings(
+            [note.strip() for note in instrument.split(',') if note.strip()])
+    raise ValueError(f"Unknown instrument: {instrument} "
+                     f"(choose from {', '.join(PROFILES)} or list the strings, e.g. D2,A2,D3)")
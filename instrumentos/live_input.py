@@ -0,0 +1,409 @@
+"""
+Live Input Module
+Real-time audio capture into a ring buffer and continuous pitch tracking
+"""
+
+import threading
+import time
+import numpy as np
+from audio_analyzer import detect_pitch, get_tuning_status
+from note_frequencies import get_note_from_frequency, format_note_name
+from instruments import get_instrument
+from decoders import open_audio
+
+
+def analyze_frame(frame, sample_rate, method='fft', interpolation='parabolic',
+                  silence_threshold=1e-3, tuning=None, instrument=None):
+    """
+    Estimate the pitch of one short frame of live audio
+    
+    A plain function of picklable arguments, so it can also run in a worker
+    process (see tuner_server).
+    
+    Args:
+        frame (numpy.array): Mono float32 samples
+        sample_rate (int): Sample rate in Hz
+        method (str): Pitch engine (see audio_analyzer.PITCH_METHODS)
+        interpolation (str): Peak estimator (see get_fundamental_frequency)
+        silence_threshold (float): Frames with a lower RMS report no note
+        tuning (TuningSystem): Reference pitch and temperament
+        instrument: Instrument profile or name; limits the search band and
+            snaps to the nearest open string
+        
+    Returns:
+        dict: 'frequency', 'note', 'note_formatted', 'exact_frequency',
+            'cents' and 'tuning_status' (note fields are None on silence)
+    """
+    rms = np.sqrt(np.mean(np.square(frame)))
+    if rms < silence_threshold:
+        return {'frequency': 0.0, 'note': None, 'note_formatted': None,
+                'exact_frequency': None, 'cents': None, 'tuning_status': None}
+    
+    if instrument is None:
+        frequency = detect_pitch(frame, sample_rate, method, interpolation=interpolation)
+        note, exact_freq, cents = get_note_from_frequency(frequency, tuning)
+    else:
+        profile = get_instrument(instrument)
+        frequency = detect_pitch(frame, sample_rate, method, interpolation=interpolation,
+                                 min_freq=profile.min_freq, max_freq=profile.max_freq)
+        note, exact_freq, cents = profile.identify_note(frequency, tuning)
+    
+    return {
+        'frequency': frequency,
+        'note': note,
+        'note_formatted': format_note_name(note),
+        'exact_frequency': exact_freq,
+        'cents': cents,
+        'tuning_status': get_tuning_status(cents) if note else None
+    }
+
+
+class RingBuffer:
+    """
+    Fixed-size, thread-safe ring buffer of float32 samples
+    
+    One thread writes captured blocks while another reads the most recent
+    samples; memory never grows past the capacity.
+    """
+    
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity (int): Number of samples kept
+        """
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._capacity = capacity
+        self._write_pos = 0
+        self.total_written = 0
+        self.last_write_time = None
+        self._cond = threading.Condition()
+    
+    def write(self, block):
+        """
+        Append a block of samples, overwriting the oldest ones
+        
+        Args:
+            block (numpy.array): Mono samples
+        """
+        block = np.asarray(block, dtype=np.float32)[-self._capacity:]
+        n = len(block)
+        with self._cond:
+            end = self._write_pos + n
+            if end <= self._capacity:
+                self._data[self._write_pos:end] = block
+            else:
+                split = self._capacity - self._write_pos
+                self._data[self._write_pos:] = block[:split]
+                self._data[:n - split] = block[split:]
+            self._write_pos = end % self._capacity
+            self.total_written += n
+            self.last_write_time = time.perf_counter()
+            self._cond.notify_all()
+    
+    def latest(self, n):
+        """
+        Copy of the n most recent samples, oldest first
+        
+        Args:
+            n (int): Number of samples (at most the capacity)
+            
+        Returns:
+            numpy.array: float32 samples, zero-padded at the front if fewer
+                than n samples have been written
+        """
+        with self._cond:
+            n = min(n, self._capacity)
+            start = self._write_pos - n
+            if start >= 0:
+                return self._data[start:self._write_pos].copy()
+            return np.concatenate((self._data[start:], self._data[:self._write_pos]))
+    
+    def wait_for(self, total, timeout=None):
+        """
+        Block until at least `total` samples have been written overall
+        
+        Args:
+            total (int): Target value of total_written
+            timeout (float): Maximum wait in seconds
+            
+        Returns:
+            bool: True if the target was reached
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self.total_written >= total, timeout)
+
+
+class AudioSource:
+    """
+    Base class for live audio backends
+    
+    A source delivers mono float32 blocks to a callback from its own
+    thread between start() and stop().
+    """
+    
+    def __init__(self, sample_rate=44100, block_size=256):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+    
+    def start(self, callback):
+        """
+        Begin delivering blocks
+        
+        Args:
+            callback (callable): Called as callback(block) for every block
+        """
+        raise NotImplementedError
+    
+    def stop(self):
+        """Stop delivering blocks"""
+        raise NotImplementedError
+
+
+class _ThreadedSource(AudioSource):
+    """Source that produces blocks on a background thread, paced in real time"""
+    
+    def __init__(self, sample_rate=44100, block_size=256, realtime=True):
+        super().__init__(sample_rate, block_size)
+        self.realtime = realtime
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self, callback):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(callback,), daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _next_block(self):
+        """Return the next block, or None when the source is exhausted"""
+        raise NotImplementedError
+    
+    def _run(self, callback):
+        block_duration = self.block_size / self.sample_rate
+        next_time = time.perf_counter()
+        while not self._stop_event.is_set():
+            block = self._next_block()
+            if block is None:
+                break
+            callback(block)
+            if self.realtime:
+                next_time += block_duration
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+
+
+class SyntheticSource(_ThreadedSource):
+    """
+    Generates a tone with optional harmonics and noise
+    
+    Stand-in for a microphone in headless tests and demos.
+    """
+    
+    def __init__(self, frequency=440.0, sample_rate=44100, block_size=256,
+                 amplitude=0.5, harmonics=(), noise=0.0, realtime=True):
+        """
+        Args:
+            frequency (float): Fundamental frequency in Hz
+            sample_rate (int): Sample rate in Hz
+            block_size (int): Samples per delivered block
+            amplitude (float): Amplitude of the fundamental
+            harmonics (sequence): Relative amplitudes of harmonics 2, 3, ...
+            noise (float): Standard deviation of added white noise
+            realtime (bool): Pace blocks at the sample rate
+        """
+        super().__init__(sample_rate, block_size, realtime)
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.harmonics = tuple(harmonics)
+        self.noise = noise
+        self._position = 0
+        self._rng = np.random.default_rng()
+    
+    def _next_block(self):
+        t = (self._position + np.arange(self.block_size)) / self.sample_rate
+        self._position += self.block_size
+        
+        block = np.sin(2 * np.pi * self.frequency * t)
+        for order, weight in enumerate(self.harmonics, start=2):
+            block += weight * np.sin(2 * np.pi * order * self.frequency * t)
+        block *= self.amplitude
+        if self.noise:
+            block += self._rng.normal(0.0, self.noise, self.block_size)
+        
+        return block.astype(np.float32)
+
+
+class WavPlaybackSource(_ThreadedSource):
+    """
+    Plays an audio file (WAV, FLAC, ...) block by block as if it were
+    being captured live
+    """
+    
+    def __init__(self, file_path, block_size=256, loop=False, realtime=True):
+        """
+        Args:
+            file_path (str): Path to audio file
+            block_size (int): Samples per delivered block
+            loop (bool): Restart from the beginning at the end of the file
+            realtime (bool): Pace blocks at the file's sample rate
+        """
+        self._audio = open_audio(file_path)
+        super().__init__(self._audio.sample_rate, block_size, realtime)
+        self.loop = loop
+        self._position = 0
+    
+    def _next_block(self):
+        if self._position >= len(self._audio):
+            if not self.loop or len(self._audio) == 0:
+                return None
+            self._position = 0
+        
+        block = self._audio.read(self._position, self._position + self.block_size)
+        self._position += self.block_size
+        return block
+
+
+class SoundDeviceSource(AudioSource):
+    """
+    Microphone capture through the optional `sounddevice` package
+    """
+    
+    def __init__(self, sample_rate=44100, block_size=256, device=None):
+        """
+        Args:
+            sample_rate (int): Sample rate in Hz
+            block_size (int): Samples per delivered block (small = low latency)
+            device: Input device name or index (default: system default)
+        """
+        super().__init__(sample_rate, block_size)
+        self.device = device
+        self._stream = None
+    
+    @staticmethod
+    def is_available():
+        """Whether the sounddevice package can be imported"""
+        try:
+            import sounddevice  # noqa: F401
+        except (ImportError, OSError):
+            return False
+        return True
+    
+    def start(self, callback):
+        try:
+            import sounddevice
+        except (ImportError, OSError) as e:
+            raise ImportError("Live microphone input requires the 'sounddevice' package "
+                              "(pip install sounddevice)") from e
+        
+        def _callback(indata, frames, time_info, status):
+            callback(indata.mean(axis=1, dtype=np.float32))
+        
+        self._stream = sounddevice.InputStream(
+            samplerate=self.sample_rate, blocksize=self.block_size,
+            device=self.device, channels=1, dtype='float32',
+            latency='low', callback=_callback)
+        self._stream.start()
+    
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class LiveTuner:
+    """
+    Continuous pitch tracking of a live AudioSource
+    
+    Captured blocks go into a ring buffer from the source's thread. An
+    analysis thread wakes up every hop_size samples, estimates the pitch
+    of the latest frame_size samples and passes the result to on_result
+    (from the analysis thread, so GUI code should hand it over to its own
+    thread, e.g. through a queue polled with Tk's after()).
+    
+    With the defaults at 44.1 kHz a result is produced every 11.6 ms from
+    a 46 ms frame, so a new note reaches the result well under 50 ms after
+    it starts.
+    """
+    
+    def __init__(self, source, on_result, frame_size=2048, hop_size=512,
+                 silence_threshold=1e-3, interpolation='parabolic', method='fft'):
+        """
+        Args:
+            source (AudioSource): Live audio backend
+            on_result (callable): Called with each result dict
+            frame_size (int): Samples per analysis frame
+            hop_size (int): Samples between analyses
+            silence_threshold (float): Frames with a lower RMS report no note
+            interpolation (str): Peak estimator (see get_fundamental_frequency)
+            method (str): Pitch engine (see audio_analyzer.PITCH_METHODS)
+        """
+        self.source = source
+        self.on_result = on_result
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.silence_threshold = silence_threshold
+        self.interpolation = interpolation
+        self.method = method
+        self.buffer = RingBuffer(frame_size * 4)
+        self._running = threading.Event()
+        self._thread = None
+    
+    @property
+    def running(self):
+        return self._running.is_set()
+    
+    def start(self):
+        """Start capturing and analysing"""
+        if self.running:
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self._analysis_loop, daemon=True)
+        self._thread.start()
+        self.source.start(self.buffer.write)
+    
+    def stop(self):
+        """Stop capturing and wait for the analysis thread to finish"""
+        if not self.running:
+            return
+        self._running.clear()
+        self.source.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def analyze_frame(self, frame):
+        """
+        Estimate the pitch of one frame
+        
+        Args:
+            frame (numpy.array): Mono float32 samples
+            
+        Returns:
+            dict: See analyze_frame()
+        """
+        return analyze_frame(frame, self.source.sample_rate, self.method, self.interpolation,
+                             self.silence_threshold)
+    
+    def _analysis_loop(self):
+        next_total = self.frame_size
+        while self.running:
+            if not self.buffer.wait_for(next_total, timeout=0.1):
+                continue
+            
+            captured_at = self.buffer.last_write_time
+            total = self.buffer.total_written
+            result = self.analyze_frame(self.buffer.latest(self.frame_size))
+            result['time'] = total / self.source.sample_rate
+            # Time from the newest captured block to the finished estimate
+            result['latency'] = time.perf_counter() - captured_at
+            self.on_result(result)
+            
+            # Skip ahead rather than fall behind if analysis was slow
+            next_total = max(next_total + self.hop_size, total + 1)
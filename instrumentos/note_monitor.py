@@ -0,0 +1,324 @@
+"""
+Note Monitor Module
+Continuous cents readings for a few known target notes with a resonator bank
+
+When the notes to tune are known in advance (the open strings of an
+instrument), a full FFT per hop mostly computes bins nobody looks at.
+Here each target gets a handful of complex one-pole resonators, tuned to
+the note and to neighbours a fraction of a semitone either side. A
+resonator is a recursive, exponentially windowed DFT bin (a Goertzel
+filter that never resets): y[n] = r e^(jw) y[n-1] + x[n], updated in
+O(1) per sample. Blocks are applied as a single matrix product, so a
+bank of a few dozen resonators follows many channels on one core. The
+frequency comes from the phase advance of the strongest resonator of
+each target, which is exact for a steady tone whatever the bandwidth.
+"""
+
+from collections import deque
+import numpy as np
+from note_frequencies import DEFAULT_TUNING
+from instruments import get_instrument
+from wav_reader import to_float32
+from decoders import open_audio
+
+
+# Spacing of the resonators around each target, and how many there are
+# on each side: 2 x 50 cents covers a string up to a semitone out of tune
+SPACING_CENTS = 50
+NEIGHBOURS = 2
+
+# The phase advance of each target is measured over about this many of
+# its periods. Longer spans average out the ripple of the tone's negative
+# frequency image; the span must stay well below half the period of the
+# beat between the tone and the strongest resonator (at most
+# SPACING_CENTS / 2 away), i.e. below about 30 periods.
+PHASE_CYCLES = 8
+
+
+class ResonatorBank:
+    """
+    Complex one-pole resonators with their state carried between blocks
+    
+    The state after a block of n samples is p^n * state + W @ block, where
+    row k of W holds p_k^(n-1) ... p_k^0; the weights are built once for
+    the longest block seen and sliced for shorter ones.
+    """
+    
+    def __init__(self, frequencies, sample_rate, bandwidths, channels=1):
+        """
+        Args:
+            frequencies (sequence): Centre frequency of each resonator in Hz
+            sample_rate (int): Sample rate in Hz
+            bandwidths (float or sequence): -3 dB bandwidth of each
+                resonator in Hz (narrower is steadier but slower to respond)
+            channels (int): Number of independent input channels
+        """
+        frequencies = np.asarray(frequencies, dtype=np.float64)
+        bandwidths = np.broadcast_to(np.asarray(bandwidths, dtype=np.float64),
+                                     frequencies.shape)
+        self.sample_rate = sample_rate
+        self.frequencies = frequencies
+        self.omega = 2 * np.pi * frequencies / sample_rate
+        self.radius = np.exp(-np.pi * bandwidths / sample_rate)
+        self._log_poles = np.log(self.radius) + 1j * self.omega
+        # A sine of amplitude A at the centre settles at |y| = A / (2 (1 - r))
+        self.gain = 2 * (1 - self.radius)
+        self.channels = channels
+        self._weights = np.zeros((len(frequencies), 0), dtype=np.complex128)
+        self.reset()
+    
+    def reset(self):
+        """Forget all input (zero state)"""
+        self.state = np.zeros((len(self.frequencies), self.channels), dtype=np.complex128)
+    
+    def _block_weights(self, n):
+        if self._weights.shape[1] < n:
+            self._weights = np.exp(np.outer(self._log_poles, np.arange(n - 1, -1, -1)))
+        return self._weights[:, self._weights.shape[1] - n:]
+    
+    def process(self, block):
+        """
+        Run a block of samples through every resonator
+        
+        Args:
+            block (numpy.array): (frames,) or (frames, channels) samples
+            
+        Returns:
+            numpy.array: New complex state, (resonators, channels)
+        """
+        block = np.asarray(block, dtype=np.float64).reshape(len(block), self.channels)
+        n = len(block)
+        if n:
+            decay = np.exp(self._log_poles * n)[:, None]
+            self.state = decay * self.state + self._block_weights(n) @ block
+        return self.state
+    
+    def amplitudes(self):
+        """
+        Returns:
+            numpy.array: Amplitude of the tone each resonator currently
+                holds, (resonators, channels)
+        """
+        return self.gain[:, None] * np.abs(self.state)
+
+
+class NoteMonitor:
+    """
+    Cents readings for a fixed set of target notes, block by block
+    
+    Blocks can come straight from an AudioSource callback or from a file;
+    process() returns a reading for every target after each block.
+    """
+    
+    def __init__(self, notes, sample_rate, tuning=None, channels=1,
+                 spacing_cents=SPACING_CENTS, neighbours=NEIGHBOURS, silence_threshold=1e-3):
+        """
+        Args:
+            notes (sequence): Target note names (e.g., ('E2', 'A2', ...))
+            sample_rate (int): Sample rate in Hz
+            tuning (TuningSystem): Reference pitch and temperament of the
+                targets (default: equal temperament, A4 = 440 Hz)
+            channels (int): Number of independent input channels
+            spacing_cents (float): Distance between a target's resonators
+            neighbours (int): Resonators on each side of every target
+            silence_threshold (float): Targets whose strongest resonator
+                holds a smaller amplitude report no reading
+        """
+        tuning = tuning or DEFAULT_TUNING
+        self.notes = tuple(notes)
+        if not self.notes:
+            raise ValueError("A note monitor needs at least one target note")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.silence_threshold = silence_threshold
+        self.targets = np.array([tuning.note_frequency(note) for note in self.notes])
+        
+        # (targets, resonators per target) grid of centre frequencies; each
+        # resonator is as wide as the spacing, so the band has no gaps
+        offsets = spacing_cents * np.arange(-neighbours, neighbours + 1)
+        ratios = 2 ** (offsets / 1200)
+        self._grid = self.targets[:, None] * ratios
+        bandwidths = self._grid * (2 ** (spacing_cents / 1200) - 1)
+        self.bank = ResonatorBank(self._grid.ravel(), sample_rate, bandwidths.ravel(), channels)
+        
+        # Bank states are kept at every multiple of _step samples, whatever
+        # the block sizes, so that for every target there is one between 1
+        # and 1.5 phase spans old
+        self._spans = np.round(PHASE_CYCLES * sample_rate / self.targets).astype(int)
+        self._step = max(1, int(self._spans.min()) // 2)
+        self._history = deque(maxlen=int(self._spans.max()) // self._step + 2)
+        self._total = 0
+        self._since_kept = 0
+        self._history.append((0, self.bank.state))
+    
+    @classmethod
+    def from_instrument(cls, instrument, sample_rate, tuning=None, **options):
+        """
+        Monitor for the open strings of an instrument
+        
+        Args:
+            instrument: Instrument profile or name (see instruments.get_instrument)
+            sample_rate (int): Sample rate in Hz
+            tuning (TuningSystem): Reference pitch and temperament
+            **options: Other NoteMonitor arguments
+            
+        Returns:
+            NoteMonitor: The monitor
+        """
+        profile = get_instrument(instrument)
+        if not profile.strings:
+            raise ValueError(f"Instrument {profile.name} has no strings to monitor")
+        return cls(profile.strings, sample_rate, tuning, **options)
+    
+    def reset(self):
+        """Forget all input"""
+        self.bank.reset()
+        self._history.clear()
+        self._total = 0
+        self._since_kept = 0
+        self._history.append((0, self.bank.state))
+    
+    def process(self, block):
+        """
+        Feed a block and read every target
+        
+        Args:
+            block (numpy.array): (frames,) or (frames, channels) float samples
+            
+        Returns:
+            dict: 'notes' (target names) and, with one entry per target
+                (or a (targets, channels) array for several channels):
+                - 'frequency': Measured frequency in Hz (NaN when silent,
+                  and during the first PHASE_CYCLES periods of input)
+                - 'cents': Deviation from the target (NaN likewise)
+                - 'level': Amplitude at the target's strongest resonator
+        """
+        block = np.asarray(block)
+        start = 0
+        while start < len(block):
+            # Stop at the next _step boundary; short blocks carry over
+            chunk = block[start:start + self._step - self._since_kept]
+            start += len(chunk)
+            state = self.bank.process(chunk)
+            self._total += len(chunk)
+            self._since_kept += len(chunk)
+            if self._since_kept == self._step:
+                # process() returns a new array every time, so no copy is needed
+                self._history.append((self._total, state))
+                self._since_kept = 0
+        
+        shape = self._grid.shape + (self.channels,)
+        state = self.bank.state.reshape(shape)
+        levels = self.bank.amplitudes().reshape(shape)
+        strongest = np.argmax(levels, axis=1)
+        level = np.take_along_axis(levels, strongest[:, None], axis=1)[:, 0]
+        omega = self.bank.omega.reshape(self._grid.shape)
+        
+        totals = np.array([total for total, _ in self._history])
+        frequency = np.empty(level.shape)
+        for target, span in enumerate(self._spans):
+            # Newest state at least one span old; no reading until there is one
+            index = np.searchsorted(totals, self._total - span, side='right') - 1
+            if index < 0:
+                frequency[target] = np.nan
+                continue
+            elapsed = self._total - totals[index]
+            before = self._history[index][1].reshape(shape)[target]
+            rows = strongest[target]
+            channels = np.arange(self.channels)
+            
+            # Phase advance beyond what the resonator's own centre would give
+            advance = state[target, rows, channels] * np.conj(before[rows, channels])
+            deviation = np.angle(advance * np.exp(-1j * omega[target, rows] * elapsed))
+            frequency[target] = ((omega[target, rows] + deviation / elapsed)
+                                 * self.sample_rate / (2 * np.pi))
+        
+        audible = (level >= self.silence_threshold) & np.isfinite(frequency)
+        frequency = np.where(audible, frequency, np.nan)
+        cents = 1200 * np.log2(frequency / self.targets[:, None], where=audible,
+                               out=np.full(frequency.shape, np.nan))
+        
+        if self.channels == 1:
+            frequency, cents, level = frequency[:, 0], cents[:, 0], level[:, 0]
+        return {'notes': self.notes, 'frequency': frequency, 'cents': cents, 'level': level}
+
+
+def monitor_file(file_path, instrument='guitar', hop_size=512, tuning=None, channels=False):
+    """
+    Play a WAV file through a NoteMonitor, hop by hop
+    
+    Args:
+        file_path (str): Path to WAV file
+        instrument: Instrument whose open strings are the targets
+        hop_size (int): Samples per block
+        tuning (TuningSystem): Reference pitch and temperament
+        channels (bool): Monitor every channel of the file separately
+            instead of the mono mix
+            
+    Yields:
+        tuple: (time, reading) after every block, time being the end of
+            the block in seconds and reading the dict of NoteMonitor.process
+    """
+    audio = open_audio(file_path, mono=not channels)
+    try:
+        monitor = NoteMonitor.from_instrument(
+            instrument, audio.sample_rate, tuning,
+            channels=audio.shape[1] if channels and len(audio.shape) > 1 else 1)
+        for start in range(0, len(audio), hop_size):
+            stop = min(start + hop_size, len(audio))
+            if channels:
+                block = to_float32(audio.read_native(start, stop))
+            else:
+                block = audio.read(start, stop)
+            yield stop / audio.sample_rate, monitor.process(block)
+    finally:
+        audio.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from tuning import TEMPERAMENTS, NOTE_NAMES, get_tuning
+    
+    parser = argparse.ArgumentParser(
+        description="Follow the open strings of an instrument with a resonator bank")
+    parser.add_argument('file', help="Path to the WAV file to monitor")
+    parser.add_argument('--instrument', default='guitar',
+                        help="guitar, bass, violin, or custom strings such as D2,A2,D3,G3,B3,E4 "
+                             "(default: guitar)")
+    parser.add_argument('--hop-size', type=int, default=512,
+                        help="Samples between readings (default: 512)")
+    parser.add_argument('--channels', action='store_true',
+                        help="Monitor every channel separately instead of the mono mix")
+    parser.add_argument('--every', type=int, default=10,
+                        help="Print one reading out of this many (default: 10)")
+    parser.add_argument('--reference', type=float, default=440.0, metavar='HZ',
+                        help="Frequency of A4 (default: 440)")
+    parser.add_argument('--temperament', default='equal',
+                        help=f"{', '.join(TEMPERAMENTS)} or a Scala .scl file (default: equal)")
+    parser.add_argument('--key', choices=NOTE_NAMES, default='C',
+                        help="Note the temperament is built on (default: C)")
+    args = parser.parse_args()
+    tuning = get_tuning(args.temperament, args.reference, args.key)
+    
+    started = time.perf_counter()
+    end_time = 0.0
+    for index, (end_time, reading) in enumerate(monitor_file(
+            args.file, args.instrument, args.hop_size, tuning, args.channels)):
+        if index % args.every:
+            continue
+        levels = np.atleast_2d(reading['level'].T)
+        cents = np.atleast_2d(reading['cents'].T)
+        columns = []
+        for channel in range(len(levels)):
+            # Report the loudest string of each channel
+            target = int(np.argmax(levels[channel]))
+            if np.isnan(cents[channel, target]):
+                columns.append(f"{'--':<4} {'--':>7}")
+            else:
+                columns.append(f"{reading['notes'][target]:<4} {cents[channel, target]:+7.1f}")
+        print(f"{end_time:9.3f}  " + "   ".join(columns))
+    
+    elapsed = time.perf_counter() - started
+    print(f"\n{end_time:.2f} s of audio in {elapsed:.3f} s "
+          f"({end_time / max(elapsed, 1e-9):.0f}x real time)")
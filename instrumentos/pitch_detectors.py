@@ -0,0 +1,202 @@
+"""
+Pitch Detectors Module
+Time-domain fundamental frequency estimators (YIN, normalized autocorrelation)
+
+Unlike picking the tallest FFT peak, these look for the period of the
+waveform, so a strong 2nd harmonic does not turn a low E2 into E3, and a
+frame only needs to span a few periods of the lowest note instead of
+many FFT bins.
+"""
+
+import numpy as np
+from dsp_utils import INTERPOLATION_METHODS
+from instrumentation import lazy_import
+
+
+# Default search range in Hz (covers bass E1 up to the top of most melodies)
+DEFAULT_MIN_FREQ = 40.0
+DEFAULT_MAX_FREQ = 2000.0
+
+
+def _analysis_frame(audio_data, window_size, max_lag):
+    """
+    Take the middle frame of the signal used by the time-domain detectors
+    
+    Args:
+        audio_data (numpy.array): Audio signal data
+        window_size (int): Frame length (default: three periods of the
+            lowest searched frequency)
+        max_lag (int): Longest lag that will be searched
+        
+    Returns:
+        numpy.array: float64 frame
+    """
+    if window_size is None:
+        window_size = 3 * max_lag
+    window_size = min(window_size, len(audio_data))
+    
+    start_idx = max(0, len(audio_data) // 2 - window_size // 2)
+    return np.asarray(audio_data[start_idx:start_idx + window_size], dtype=np.float64)
+
+
+def _lag_terms(frame, max_lag):
+    """
+    Autocorrelation and energy terms for lags 0..max_lag, computed via FFT
+    
+    With an integration window of W = len(frame) - max_lag samples:
+        r(tau)  = sum_{j<W} x[j] * x[j + tau]
+        e0      = sum_{j<W} x[j]^2
+        e(tau)  = sum_{j<W} x[j + tau]^2
+        
+    Args:
+        frame (numpy.array): Signal frame, longer than max_lag
+        max_lag (int): Longest lag
+        
+    Returns:
+        tuple: (r, e0, e) with r and e of length max_lag + 1
+    """
+    fft = lazy_import('scipy.fft')
+    rfft, irfft, next_fast_len = fft.rfft, fft.irfft, fft.next_fast_len
+    
+    width = len(frame) - max_lag
+    n_fft = next_fast_len(len(frame) + width)
+    
+    # Cross-correlation of the first W samples with the whole frame
+    spectrum = rfft(frame, n_fft) * np.conj(rfft(frame[:width], n_fft))
+    r = irfft(spectrum, n_fft)[:max_lag + 1]
+    
+    cumulative = np.concatenate(([0.0], np.cumsum(frame ** 2)))
+    lags = np.arange(max_lag + 1)
+    e = cumulative[lags + width] - cumulative[lags]
+    
+    return r, cumulative[width], e
+
+
+def _lag_range(sample_rate, min_freq, max_freq, length):
+    """Shortest and longest lags (in samples) for a frequency range"""
+    min_lag = max(2, int(np.floor(sample_rate / max_freq)))
+    max_lag = int(np.ceil(sample_rate / min_freq))
+    # Keep at least half the frame as integration window
+    max_lag = min(max_lag, length // 2)
+    return min_lag, max_lag
+
+
+def _refine_lag(values, lag, interpolation):
+    """Sub-sample lag of an extremum by parabolic interpolation"""
+    if interpolation == 'none' or lag <= 0 or lag >= len(values) - 1:
+        return float(lag)
+    
+    alpha, beta, gamma = values[lag - 1:lag + 2]
+    denominator = alpha - 2 * beta + gamma
+    if denominator == 0:
+        return float(lag)
+    
+    return lag + float(np.clip(0.5 * (alpha - gamma) / denominator, -0.5, 0.5))
+
+
+def yin_pitch(audio_data, sample_rate, window_size=None, interpolation='parabolic',
+              min_freq=DEFAULT_MIN_FREQ, max_freq=DEFAULT_MAX_FREQ, threshold=0.15):
+    """
+    Estimate the fundamental frequency with the YIN algorithm
+    
+    The difference function d(tau) is built from FFT autocorrelation and
+    cumulative energy sums (O(N log N) instead of O(N^2)), normalized by
+    its cumulative mean, and the first dip below `threshold` gives the
+    period.
+    
+    Args:
+        audio_data (numpy.array): Audio signal data
+        sample_rate (int): Sample rate in Hz
+        window_size (int): Frame length (default: three periods of min_freq)
+        interpolation (str): 'parabolic' refines the period to a fraction of
+            a sample; 'none' uses the integer lag ('phase' is treated as
+            'parabolic')
+        min_freq (float): Lowest frequency searched
+        max_freq (float): Highest frequency searched
+        threshold (float): Absolute threshold on the normalized difference
+        
+    Returns:
+        float: Fundamental frequency in Hz (0.0 for silence or too little data)
+    """
+    if interpolation not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {interpolation}")
+    
+    frame = _analysis_frame(audio_data, window_size, int(np.ceil(sample_rate / min_freq)))
+    min_lag, max_lag = _lag_range(sample_rate, min_freq, max_freq, len(frame))
+    if max_lag <= min_lag:
+        return 0.0
+    
+    r, e0, e = _lag_terms(frame, max_lag)
+    if e0 <= 0:
+        return 0.0
+    
+    # Difference function and its cumulative mean normalized form
+    difference = np.maximum(e0 + e - 2 * r, 0.0)
+    cmnd = np.ones_like(difference)
+    running = np.cumsum(difference[1:])
+    np.divide(difference[1:] * np.arange(1, max_lag + 1), running,
+              out=cmnd[1:], where=running > 0)
+    
+    search = cmnd[min_lag:max_lag + 1]
+    below = np.nonzero(search < threshold)[0]
+    if len(below):
+        # First dip under the threshold, followed down to its local minimum
+        lag = min_lag + below[0]
+        while lag + 1 <= max_lag and cmnd[lag + 1] < cmnd[lag]:
+            lag += 1
+    else:
+        lag = min_lag + int(np.argmin(search))
+    
+    period = _refine_lag(cmnd, lag, interpolation)
+    return sample_rate / period
+
+
+def autocorrelation_pitch(audio_data, sample_rate, window_size=None, interpolation='parabolic',
+                          min_freq=DEFAULT_MIN_FREQ, max_freq=DEFAULT_MAX_FREQ, cutoff=0.9):
+    """
+    Estimate the fundamental frequency with the normalized square difference function
+    
+    n(tau) = 2 r(tau) / (e0 + e(tau)) lies in [-1, 1] regardless of
+    amplitude. The period is the first local maximum that reaches
+    `cutoff` times the highest one, which avoids picking multiples of the
+    period (octave-down errors).
+    
+    Args:
+        audio_data (numpy.array): Audio signal data
+        sample_rate (int): Sample rate in Hz
+        window_size (int): Frame length (default: three periods of min_freq)
+        interpolation (str): 'parabolic' or 'none' ('phase' is treated as
+            'parabolic')
+        min_freq (float): Lowest frequency searched
+        max_freq (float): Highest frequency searched
+        cutoff (float): Fraction of the highest peak a candidate must reach
+        
+    Returns:
+        float: Fundamental frequency in Hz (0.0 for silence or too little data)
+    """
+    if interpolation not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {interpolation}")
+    
+    frame = _analysis_frame(audio_data, window_size, int(np.ceil(sample_rate / min_freq)))
+    min_lag, max_lag = _lag_range(sample_rate, min_freq, max_freq, len(frame))
+    if max_lag <= min_lag:
+        return 0.0
+    
+    r, e0, e = _lag_terms(frame, max_lag)
+    denominator = e0 + e
+    if e0 <= 0:
+        return 0.0
+    
+    nsdf = np.zeros_like(r)
+    np.divide(2 * r, denominator, out=nsdf, where=denominator > 0)
+    
+    # Local maxima inside the lag range
+    inner = nsdf[min_lag:max_lag]
+    is_peak = (inner > nsdf[min_lag - 1:max_lag - 1]) & (inner >= nsdf[min_lag + 1:max_lag + 1])
+    peaks = min_lag + np.nonzero(is_peak & (inner > 0))[0]
+    if len(peaks) == 0:
+        return 0.0
+    
+    lag = peaks[np.argmax(nsdf[peaks] >= cutoff * nsdf[peaks].max())]
+    period = _refine_lag(nsdf, lag, interpolation)
+    return sample_rate / period
@@ -0,0 +1,376 @@
+"""
+Polyphonic Pitch Module
+Multi-pitch estimation for chords, e.g. tuning every string from one strum
+
+Every candidate fundamental on a log-frequency grid gets a salience: the
+weighted sum of the spectral peaks found at its first harmonics. The most
+salient candidate is taken as a note, its partials are cancelled from the
+peaks and the search repeats, so the harmonics of a low string are not
+reported as extra notes. All frames of an STFT are processed together:
+every step is a numpy operation over a (frames, candidates, harmonics)
+table, with no loop over frames or candidates.
+"""
+
+from functools import lru_cache
+import numpy as np
+from audio_analyzer import load_audio, get_tuning_status
+from dsp_utils import parabolic_peak_offsets
+from note_frequencies import get_note_from_frequency, format_note_name
+from spectral_analysis import SpectralAnalyzer
+
+
+# Search range in Hz (bass E1 up to the top strings of most instruments)
+DEFAULT_MIN_FREQ = 40.0
+DEFAULT_MAX_FREQ = 1400.0
+
+# Spacing of the candidate fundamentals in cents
+GRID_RESOLUTION_CENTS = 10.0
+
+# A spectral peak counts as partial h of f0 within this distance of h * f0
+PARTIAL_TOLERANCE_CENTS = 20.0
+
+# Candidates whose fundamental is weaker than this fraction of their strongest
+# partial are ignored
+MIN_FUNDAMENTAL_RATIO = 0.1
+
+# Candidates closer than this to an accepted note are not searched again
+MIN_NOTE_DISTANCE_CENTS = 60.0
+
+# Peaks weaker than this fraction of the frame's strongest bin are ignored
+PEAK_FLOOR = 1e-3
+
+
+@lru_cache(maxsize=8)
+def _candidate_grid(min_freq, max_freq, resolution_cents):
+    """Candidate fundamentals spaced resolution_cents apart"""
+    num = int(np.floor(1200 * np.log2(max_freq / min_freq) / resolution_cents)) + 1
+    grid = min_freq * 2 ** (np.arange(num) * resolution_cents / 1200)
+    grid.flags.writeable = False
+    return grid
+
+
+def find_spectral_peaks(magnitude, bin_width, floor=PEAK_FLOOR):
+    """
+    Local maxima of every frame, refined to a fraction of a bin
+    
+    Args:
+        magnitude (numpy.array): (frames, bins) magnitude spectra
+        bin_width (float): Hz per bin (sample_rate / frame_size)
+        floor (float): Ignore peaks below this fraction of the frame maximum
+        
+    Returns:
+        tuple: (frames, frequencies, amplitudes) flat arrays, one entry per peak
+    """
+    inner = magnitude[:, 1:-1]
+    is_peak = ((inner > magnitude[:, :-2]) & (inner >= magnitude[:, 2:])
+               & (inner >= floor * magnitude.max(axis=1, keepdims=True)))
+    frames, peak_idx = np.nonzero(is_peak)
+    peak_idx += 1
+    
+    offsets = parabolic_peak_offsets(magnitude, peak_idx, rows=frames)
+    return frames, (peak_idx + offsets) * bin_width, magnitude[frames, peak_idx]
+
+
+def _partial_amplitudes(frames, frequencies, amplitudes, num_frames, candidates,
+                        num_harmonics, tolerance_cents):
+    """
+    Amplitude of harmonics 1..num_harmonics of every candidate in every frame
+    
+    Each peak is divided by every harmonic number and lands on all grid
+    cells within tolerance_cents of the quotient, so the whole table is
+    filled with a few scatter operations instead of a search per candidate.
+    
+    Returns:
+        numpy.array: (frames, candidates, harmonics) amplitudes
+    """
+    resolution = 1200 * np.log2(candidates[1] / candidates[0]) if len(candidates) > 1 else 1.0
+    harmonics = np.arange(1, num_harmonics + 1)
+    # Position of every (peak, harmonic) quotient on the grid, in cells
+    position = 1200 * np.log2(np.divide.outer(frequencies, harmonics) / candidates[0]) / resolution
+    
+    partials = np.zeros((num_frames, len(candidates), num_harmonics))
+    span = int(np.ceil(tolerance_cents / resolution))
+    nearest = np.rint(position).astype(np.intp)
+    peak_frames = np.broadcast_to(frames[:, None], position.shape)
+    harmonic_idx = np.broadcast_to(harmonics - 1, position.shape)
+    peak_amplitudes = np.broadcast_to(amplitudes[:, None], position.shape)
+    
+    for shift in range(-span, span + 1):
+        cells = nearest + shift
+        hit = ((np.abs(cells - position) * resolution <= tolerance_cents)
+               & (cells >= 0) & (cells < len(candidates)))
+        np.maximum.at(partials, (peak_frames[hit], cells[hit], harmonic_idx[hit]),
+                      peak_amplitudes[hit])
+    return partials
+
+
+def _smooth_partials(amplitude):
+    """
+    Limit each partial to the mean of itself and its neighbouring partials
+    
+    A real note has a smooth harmonic envelope. Sub-harmonic candidates
+    (e.g. D2 below a chord whose notes are all multiples of it) collect
+    isolated partials separated by empty ones, and lose most of them here.
+    """
+    padded = np.concatenate((amplitude[..., :1], amplitude, amplitude[..., -1:]), axis=-1)
+    mean = (padded[..., :-2] + padded[..., 1:-1] + padded[..., 2:]) / 3
+    return np.minimum(amplitude, mean)
+
+
+def _partial_envelope(amplitude):
+    """
+    Part of each partial attributed to the note when it is cancelled
+    
+    Each partial is limited to the smaller of its two neighbours, so a
+    partial shared with another note (the 3rd harmonic of E2 and the
+    fundamental of B3) keeps the part that belongs to that note.
+    """
+    padded = np.concatenate((amplitude[..., 1:2], amplitude, amplitude[..., -2:-1]), axis=-1)
+    return np.minimum(amplitude, np.minimum(padded[..., :-2], padded[..., 2:]))
+
+
+def _strongest_per_frame(frames, amplitudes, mask, num_frames):
+    """Index of the strongest masked peak of every frame (-1 if none)"""
+    strongest = np.full(num_frames, -1)
+    idx = np.flatnonzero(mask)
+    if len(idx) == 0:
+        return strongest
+    
+    # Sorted by frame, then amplitude: the last entry of each frame wins
+    idx = idx[np.lexsort((amplitudes[idx], frames[idx]))]
+    last = idx[np.append(frames[idx][1:] != frames[idx][:-1], True)]
+    strongest[frames[last]] = last
+    return strongest
+
+
+def estimate_pitches(magnitude, sample_rate, frame_size, max_notes=6,
+                     min_freq=DEFAULT_MIN_FREQ, max_freq=DEFAULT_MAX_FREQ,
+                     num_harmonics=8, threshold=0.1, resolution_cents=GRID_RESOLUTION_CENTS,
+                     tolerance_cents=PARTIAL_TOLERANCE_CENTS):
+    """
+    Estimate up to max_notes simultaneous fundamentals in every frame
+    
+    The salience of each candidate f0 is sum_h |X(h * f0)| / h over the
+    spectral peaks, with every partial limited by its neighbours (spectral
+    smoothness). After the most salient candidate of a frame is accepted,
+    the envelope of its partials is subtracted from the peaks and the
+    salience recomputed, so the harmonics of a low string are not reported
+    as extra notes.
+    
+    Args:
+        magnitude (numpy.array): (frames, bins) magnitude spectra of an rfft
+            of size frame_size (a 1-D spectrum is treated as one frame)
+        sample_rate (int): Sample rate in Hz
+        frame_size (int): FFT size N
+        max_notes (int): Maximum number of notes per frame
+        min_freq (float): Lowest fundamental searched
+        max_freq (float): Highest fundamental searched
+        num_harmonics (int): Partials per note used for salience and cancellation
+        threshold (float): A note is accepted only while its salience is at
+            least this fraction of the first note's salience in the frame
+        resolution_cents (float): Spacing of the candidate grid
+        tolerance_cents (float): Distance of a peak from h * f0 that still
+            counts as partial h
+            
+    Returns:
+        tuple: (frequencies, saliences), each of shape (frames, max_notes),
+            in order of detection; unused slots are NaN / 0
+    """
+    magnitude = np.atleast_2d(magnitude)
+    num_frames = len(magnitude)
+    candidates = _candidate_grid(float(min_freq), float(max_freq), float(resolution_cents))
+    log_candidates = 1200 * np.log2(candidates)
+    weights = 1.0 / np.arange(1, num_harmonics + 1)
+    rows = np.arange(num_frames)
+    
+    frames, peak_freqs, amplitudes = find_spectral_peaks(magnitude, sample_rate / frame_size)
+    amplitudes = amplitudes.astype(np.float64)
+    
+    frequencies = np.full((num_frames, max_notes), np.nan)
+    saliences = np.zeros((num_frames, max_notes))
+    excluded = np.zeros((num_frames, len(candidates)), dtype=bool)
+    active = np.ones(num_frames, dtype=bool)
+    
+    for slot in range(max_notes):
+        partials = _partial_amplitudes(frames, peak_freqs, amplitudes, num_frames,
+                                       candidates, num_harmonics, tolerance_cents)
+        salience = _smooth_partials(partials) @ weights
+        # A string always sounds its fundamental; without it the candidate
+        # is a sub-harmonic collecting partials of other notes
+        salience[partials[..., 0] < MIN_FUNDAMENTAL_RATIO * partials.max(axis=-1)] = 0.0
+        salience[excluded] = 0.0
+        best = np.argmax(salience, axis=1)
+        best_salience = salience[rows, best]
+        
+        if slot == 0:
+            reference = best_salience
+        active &= (best_salience > 0) & (best_salience >= threshold * reference)
+        if not active.any():
+            break
+        
+        # Peaks that are partials of the accepted candidate of their frame
+        f0 = candidates[best][frames]
+        harmonic = np.rint(peak_freqs / f0).astype(np.intp)
+        matched = (active[frames] & (harmonic >= 1) & (harmonic <= num_harmonics)
+                   & (np.abs(1200 * np.log2(peak_freqs / (np.maximum(harmonic, 1) * f0)))
+                      <= tolerance_cents))
+        
+        # Sub-bin frequency from the strongest peak at the fundamental
+        fundamental = _strongest_per_frame(frames, amplitudes, matched & (harmonic == 1),
+                                           num_frames)
+        refined = np.where(fundamental >= 0, peak_freqs[fundamental], candidates[best])
+        frequencies[active, slot] = refined[active]
+        saliences[active, slot] = best_salience[active]
+        
+        removed = _partial_envelope(partials[rows, best])
+        amplitudes[matched] = np.maximum(
+            amplitudes[matched] - removed[frames[matched], harmonic[matched] - 1], 0.0)
+        excluded |= np.abs(log_candidates - log_candidates[best][:, None]) < MIN_NOTE_DISTANCE_CENTS
+    
+    return frequencies, saliences
+
+
+def _describe_notes(frequencies, saliences):
+    """Note dicts sorted from low to high for one frame"""
+    found = np.isfinite(frequencies)
+    frequencies, saliences = frequencies[found], saliences[found]
+    order = np.argsort(frequencies)
+    notes, exact_freqs, cents = get_note_from_frequency(frequencies[order])
+    
+    return [{
+        'frequency': float(frequencies[i]),
+        'note': note,
+        'note_formatted': format_note_name(note),
+        'exact_frequency': float(exact_freq),
+        'cents': float(cent),
+        'tuning_status': get_tuning_status(cent),
+        'salience': float(saliences[i]),
+    } for i, note, exact_freq, cent in zip(order, notes, exact_freqs, cents)]
+
+
+def detect_notes(audio_data, sample_rate, max_notes=6, frame_size=16384, hop_size=4096,
+                 **estimate_kwargs):
+    """
+    Notes sounding together in a recording (e.g. one strum of all strings)
+    
+    The magnitude spectra of all frames are averaged, which keeps every
+    string that rings during the recording even as the louder ones decay,
+    and the average is analysed as a single frame.
+    
+    Args:
+        audio_data (numpy.array): Audio signal data
+        sample_rate (int): Sample rate in Hz
+        max_notes (int): Maximum number of notes
+        frame_size (int): Samples per STFT frame (16384 at 44.1 kHz gives
+            2.7 Hz bins, enough to separate the low strings of a bass)
+        hop_size (int): Samples between frames
+        **estimate_kwargs: Options passed to estimate_pitches
+        
+    Returns:
+        list: One dict per note, low to high, with 'frequency', 'note',
+            'note_formatted', 'exact_frequency', 'cents', 'tuning_status'
+            and 'salience'
+    """
+    analyzer = SpectralAnalyzer.from_array(audio_data, sample_rate)
+    total = np.zeros(frame_size // 2 + 1)
+    frames = 0
+    for times, magnitude, _ in analyzer.iter_stft(frame_size, hop_size):
+        total += magnitude.sum(axis=0)
+        frames += len(times)
+    
+    frequencies, saliences = estimate_pitches(total / frames, sample_rate, frame_size,
+                                              max_notes, **estimate_kwargs)
+    return _describe_notes(frequencies[0], saliences[0])
+
+
+def track_notes(audio_data, sample_rate, max_notes=6, frame_size=8192, hop_size=2048,
+                **estimate_kwargs):
+    """
+    Simultaneous notes of every STFT frame
+    
+    Args:
+        audio_data (numpy.array): Audio signal data
+        sample_rate (int): Sample rate in Hz
+        max_notes (int): Maximum number of notes per frame
+        frame_size (int): Samples per frame
+        hop_size (int): Samples between frames
+        **estimate_kwargs: Options passed to estimate_pitches
+        
+    Returns:
+        tuple: (times, frequencies, saliences) with frequencies and
+            saliences of shape (frames, max_notes), see estimate_pitches
+    """
+    analyzer = SpectralAnalyzer.from_array(audio_data, sample_rate)
+    all_times, all_freqs, all_saliences = [], [], []
+    for times, magnitude, _ in analyzer.iter_stft(frame_size, hop_size):
+        frequencies, saliences = estimate_pitches(magnitude, sample_rate, frame_size,
+                                                  max_notes, **estimate_kwargs)
+        all_times.append(times)
+        all_freqs.append(frequencies)
+        all_saliences.append(saliences)
+    
+    return np.concatenate(all_times), np.concatenate(all_freqs), np.concatenate(all_saliences)
+
+
+def analyze_chord(file_path, max_notes=6, mmap=False, **detect_kwargs):
+    """
+    Complete polyphonic analysis: load file and identify every note
+    
+    Args:
+        file_path (str): Path to audio file
+        max_notes (int): Maximum number of notes
+        mmap (bool): Memory-map the file instead of decoding it into RAM
+        **detect_kwargs: Options passed to detect_notes
+        
+    Returns:
+        dict: 'notes' (see detect_notes), 'sample_rate', 'duration',
+            'success' and 'error'
+    """
+    try:
+        audio_data, sample_rate = load_audio(file_path, mmap=mmap)
+        notes = detect_notes(audio_data, sample_rate, max_notes, **detect_kwargs)
+        return {
+            'notes': notes,
+            'sample_rate': sample_rate,
+            'duration': len(audio_data) / sample_rate,
+            'success': True,
+            'error': None
+        }
+    
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Detect every note of a chord or strum")
+    parser.add_argument('file', help="Path to the WAV file to analyze")
+    parser.add_argument('-n', '--max-notes', type=int, default=6,
+                        help="Maximum number of notes (default: 6)")
+    parser.add_argument('--min-freq', type=float, default=DEFAULT_MIN_FREQ,
+                        help=f"Lowest fundamental in Hz (default: {DEFAULT_MIN_FREQ:g})")
+    parser.add_argument('--max-freq', type=float, default=DEFAULT_MAX_FREQ,
+                        help=f"Highest fundamental in Hz (default: {DEFAULT_MAX_FREQ:g})")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Relative salience needed to accept a note (default: 0.1)")
+    args = parser.parse_args()
+    
+    print(f"Analyzing: {args.file}")
+    print("-" * 60)
+    result = analyze_chord(args.file, args.max_notes, min_freq=args.min_freq,
+                           max_freq=args.max_freq, threshold=args.threshold)
+    
+    if result['success']:
+        print(f"{'Note':<6} {'Frequency':>11} {'Target':>11} {'Cents':>7}  Status")
+        for note in result['notes']:
+            print(f"{note['note_formatted']:<6} {note['frequency']:8.2f} Hz "
+                  f"{note['exact_frequency']:8.2f} Hz {note['cents']:+7.1f}  "
+                  f"{note['tuning_status']}")
+        if not result['notes']:
+            print("No notes detected")
+    else:
+        print(f"Error: {result['error']}")
@@ -0,0 +1,210 @@
+"""
+Result Cache Module
+Persistent, content-addressed cache of analyze_audio results in SQLite
+
+Entries are keyed by the SHA-256 of the file contents together with the
+analysis parameters and the engine version, so renamed or copied files
+still hit and edited files never return stale results. A second table
+remembers the digest of every path by size and modification time, so an
+unchanged file is not even re-read to be hashed.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'instrumentos', 'results.sqlite')
+
+# Default size limit of the stored results (least recently used are evicted)
+DEFAULT_MAX_BYTES = 64 * 2 ** 20
+
+# Read size when hashing file contents
+_HASH_BLOCK = 2 ** 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+CREATE TABLE IF NOT EXISTS digests (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def file_digest(file_path):
+    """
+    SHA-256 of a file's contents
+    
+    Args:
+        file_path (str): Path to the file
+        
+    Returns:
+        str: Hex digest
+    """
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _to_builtin(value):
+    """json.dumps fallback for numpy scalars"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+class ResultCache:
+    """
+    On-disk LRU cache of analysis results
+    
+    Safe to share between threads, and between processes through the
+    SQLite file. Instances pickle as their path and size limit only, so
+    they can be handed to worker processes, which open their own
+    connection on first use.
+    """
+    
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            path (str): SQLite database file (created if missing)
+            max_bytes (int): Size limit of the stored results
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        return {'path': self.path, 'max_bytes': self.max_bytes}
+    
+    def __setstate__(self, state):
+        self.__init__(**state)
+    
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+    
+    def _digest(self, file_path):
+        """Content digest of a file, recomputed only when its size or mtime change"""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        row = self._connect().execute(
+            "SELECT digest FROM digests WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row:
+            return row[0]
+        
+        digest = file_digest(path)
+        self._connect().execute("INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)",
+                                (path, stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+    
+    def key(self, file_path, params):
+        """
+        Cache key of a file analysed with the given parameters
+        
+        Args:
+            file_path (str): Path to audio file
+            params (dict): Everything that affects the result, including
+                the engine version
+                
+        Returns:
+            str: Hex key
+        """
+        with self._lock:
+            digest = self._digest(file_path)
+        params = json.dumps(params, sort_keys=True, default=_to_builtin)
+        return hashlib.sha256(f"{digest}:{params}".encode()).hexdigest()
+    
+    def get(self, key):
+        """
+        Stored result for a key, marking it as recently used
+        
+        Args:
+            key (str): Key from key()
+            
+        Returns:
+            dict: The stored result, or None on a miss
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+    
+    def put(self, key, result):
+        """
+        Store a result, evicting least recently used entries over max_bytes
+        
+        Args:
+            key (str): Key from key()
+            result (dict): JSON-serializable result fields
+        """
+        value = json.dumps(result, ensure_ascii=False, default=_to_builtin)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                         (key, value, len(value), time.time()))
+            self._evict(conn)
+    
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+            stale.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM results WHERE key = ?", stale)
+    
+    def stats(self):
+        """
+        Returns:
+            dict: 'entries' and 'bytes' currently stored
+        """
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {'entries': entries, 'bytes': size}
+    
+    def clear(self):
+        """Remove every stored result and file digest"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM results")
+            conn.execute("DELETE FROM digests")
+    
+    def close(self):
+        """Close the database connection (it is reopened on next use)"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
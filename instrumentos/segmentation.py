@@ -0,0 +1,316 @@
+"""
+Segmentation Module
+Note onsets, silence and sustain regions from frame energy and spectral flux
+
+A recording is cut into short overlapping frames. The RMS energy of every
+frame comes from a running sum of squares (no per-frame loop); frames
+below a silence gate are never transformed, so only the audible part of
+a sparse recording costs FFT work. Spectral flux (how much the log
+spectrum grows from one frame to the next) peaks at note attacks, which
+splits continuous playing into notes. Each note's sustain window skips
+the attack transient and the decay tail, leaving the stable part that
+pitch detection should look at.
+"""
+
+import numpy as np
+from dsp_utils import get_window
+import instrumentation
+
+
+# Frame length in seconds, rounded to a power of two of samples
+# (2048 at 44.1 kHz); frames advance by a quarter of their length
+FRAME_SECONDS = 0.046
+HOP_DIVISOR = 4
+
+# Frames quieter than this, relative to the loudest frame, are silence
+SILENCE_DB = -40.0
+
+# Absolute RMS below which a frame is silence whatever the recording's
+# level (same as track_pitch's silence_threshold)
+SILENCE_FLOOR = 1e-3
+
+# A flux peak is an onset when it exceeds the local median by this
+# fraction of the largest flux in the recording
+ONSET_THRESHOLD = 0.1
+
+# Width of the local median and maximum used to pick flux peaks, in seconds
+ONSET_MEDIAN_SECONDS = 0.25
+ONSET_PEAK_SECONDS = 0.03
+
+# Notes shorter than this are merged into the previous one (or dropped)
+MIN_NOTE_SECONDS = 0.08
+
+# Time skipped after an onset before the sustain may start, in addition
+# to the frames that still overlap the attack
+ATTACK_SECONDS = 0.03
+
+# Where the loudest point of the attack is searched, after the onset
+ATTACK_MAX_SECONDS = 0.25
+
+# The sustain ends when the energy falls this far below the note's peak
+SUSTAIN_DB = -20.0
+
+# Magnitude compression before the flux: log(1 + COMPRESSION * |X|)
+COMPRESSION = 100.0
+
+# Frames processed per block (bounds memory for long recordings)
+_BLOCK_FRAMES = 512
+
+
+def frame_parameters(sample_rate):
+    """
+    Args:
+        sample_rate (int): Sample rate in Hz
+        
+    Returns:
+        tuple: (frame_size, hop_size) in samples for the sample rate
+    """
+    frame_size = int(2 ** round(np.log2(FRAME_SECONDS * sample_rate)))
+    return frame_size, frame_size // HOP_DIVISOR
+
+
+def frame_features(audio_data, frame_size, hop_size, floor=SILENCE_FLOOR):
+    """
+    RMS energy and spectral flux of every frame
+    
+    The signal is read in blocks, so an AudioView of any length can be
+    passed. Only frames with an RMS of at least floor (and the frame just
+    before each of them, the flux reference) are transformed.
+    
+    Args:
+        audio_data (numpy.array): Mono audio signal (array or AudioView)
+        frame_size (int): Samples per frame
+        hop_size (int): Samples between the starts of consecutive frames
+        floor (float): RMS below which the flux is not computed (left at 0)
+        
+    Returns:
+        tuple: (rms, flux) arrays with one entry per frame; frame t covers
+            samples [t * hop_size, t * hop_size + frame_size)
+    """
+    rfft = instrumentation.lazy_import('scipy.fft').rfft
+    
+    total = len(audio_data)
+    num_frames = 1 + max(0, total - frame_size) // hop_size if total else 0
+    rms = np.zeros(num_frames)
+    flux = np.zeros(num_frames)
+    
+    window = get_window('hanning', frame_size).astype(np.float32)
+    # Scale so that a full-scale sine peaks at about 1 before compression
+    scale = np.float32(2 * COMPRESSION / window.sum())
+    
+    for first in range(0, num_frames, _BLOCK_FRAMES):
+        last = min(first + _BLOCK_FRAMES, num_frames)
+        # One extra frame in front supplies the flux reference of the first
+        start = max(first - 1, 0)
+        count = last - start
+        length = (count - 1) * hop_size + frame_size
+        
+        samples = np.zeros(length, dtype=np.float32)
+        block = np.asarray(audio_data[start * hop_size:start * hop_size + length],
+                           dtype=np.float32)
+        samples[:len(block)] = block
+        
+        # Energy of every frame from a running sum of squares
+        squares = np.concatenate(([0.0], np.cumsum(np.square(samples, dtype=np.float64))))
+        offsets = np.arange(count) * hop_size
+        energy = (squares[offsets + frame_size] - squares[offsets]) / frame_size
+        block_rms = np.sqrt(np.maximum(energy, 0.0))
+        rms[start:last] = block_rms
+        
+        # Transform only frames above the floor and their predecessors
+        loud = block_rms >= floor
+        needed = loud.copy()
+        needed[:-1] |= loud[1:]
+        indices = np.flatnonzero(needed)
+        
+        frames = np.lib.stride_tricks.sliding_window_view(samples, frame_size)[::hop_size]
+        spectra = np.zeros((count + 1, frame_size // 2 + 1), dtype=np.float32)
+        if len(indices):
+            magnitude = np.abs(rfft(frames[indices] * window, axis=1))
+            instrumentation.count('samples_transformed', len(indices) * frame_size)
+            instrumentation.count('fft', len(indices), label=frame_size)
+            spectra[indices + 1] = np.log1p(scale * magnitude)
+        
+        # Flux of the loud frames; row 0 is the silence before the file
+        loud[:first - start] = False
+        rows = np.flatnonzero(loud)
+        flux[start + rows] = np.maximum(spectra[rows + 1] - spectra[rows], 0).mean(axis=1)
+    
+    return rms, flux
+
+
+def pick_onsets(flux, active, hop_seconds):
+    """
+    Frames where the spectral flux has a clear local peak
+    
+    Args:
+        flux (numpy.array): Spectral flux per frame
+        active (numpy.array): Boolean mask of non-silent frames
+        hop_seconds (float): Time between frames
+        
+    Returns:
+        numpy.array: Indices of onset frames, ascending
+    """
+    if not active.any():
+        return np.zeros(0, dtype=int)
+    ndimage = instrumentation.lazy_import('scipy.ndimage')
+    
+    median_size = 2 * max(1, int(ONSET_MEDIAN_SECONDS / hop_seconds / 2)) + 1
+    peak_size = 2 * max(1, int(round(ONSET_PEAK_SECONDS / hop_seconds))) + 1
+    
+    threshold = ndimage.median_filter(flux, size=median_size, mode='nearest')
+    threshold += ONSET_THRESHOLD * flux[active].max()
+    is_peak = (flux == ndimage.maximum_filter1d(flux, peak_size, mode='nearest')) & (flux > threshold)
+    return np.flatnonzero(is_peak & active)
+
+
+def _sustain(rms, start, stop, overlap, frames_per_second, followed):
+    """
+    First and last frame of the stable part of the note in frames [start, stop)
+    
+    overlap is the number of frames whose window still reaches back to
+    the onset; when another note follows, frames reaching into it are
+    excluded the same way.
+    """
+    search = max(1, int(np.ceil(ATTACK_MAX_SECONDS * frames_per_second)))
+    peak = start + np.argmax(rms[start:min(stop, start + search)])
+    first = max(start + overlap + int(round(ATTACK_SECONDS * frames_per_second)), peak)
+    last = stop - 1 - (overlap if followed else 0)
+    if last < first:
+        return None
+    
+    level = rms[peak] * 10 ** (SUSTAIN_DB / 20)
+    sustained = np.flatnonzero(rms[first:last + 1] >= level)
+    if not len(sustained):
+        return None
+    return first, first + sustained[-1]
+
+
+def segment_notes(audio_data, sample_rate, frame_size=None, hop_size=None,
+                  silence_db=SILENCE_DB):
+    """
+    Split a recording into notes and locate the sustain of each
+    
+    Args:
+        audio_data (numpy.array): Mono audio signal (array or AudioView)
+        sample_rate (int): Sample rate in Hz
+        frame_size (int): Samples per frame (default: from FRAME_SECONDS)
+        hop_size (int): Samples between frames (default: frame_size / 4)
+        silence_db (float): Silence gate relative to the loudest frame
+        
+    Returns:
+        list: One dict per note, in order, with sample positions:
+            - 'start', 'end': The note, from its onset to the next onset
+              or to the silence after it
+            - 'sustain_start', 'sustain_end': The stable part, without the
+              attack and the decay tail (the whole note if it is too short
+              to have one)
+            - 'level': Peak RMS of the note
+    """
+    if frame_size is None:
+        frame_size = frame_parameters(sample_rate)[0]
+    hop_size = hop_size or frame_size // HOP_DIVISOR
+    total = len(audio_data)
+    
+    rms, flux = frame_features(audio_data, frame_size, hop_size)
+    if not len(rms) or rms.max() < SILENCE_FLOOR:
+        return []
+    
+    gate = max(SILENCE_FLOOR, rms.max() * 10 ** (silence_db / 20))
+    active = rms >= gate
+    hop_seconds = hop_size / sample_rate
+    min_frames = max(1, int(round(MIN_NOTE_SECONDS / hop_seconds)))
+    overlap = -(-frame_size // hop_size)
+    onsets = pick_onsets(flux, active, hop_seconds)
+    
+    # Runs of consecutive active frames
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_stops = np.flatnonzero(edges == -1)
+    
+    segments = []
+    for run_start, run_stop in zip(run_starts, run_stops):
+        if run_stop - run_start < min_frames:
+            continue
+        
+        # The start of a run is an onset; later flux peaks split the run
+        # into notes of at least min_frames
+        bounds = [run_start]
+        inside = onsets[(onsets >= run_start + min_frames) & (onsets <= run_stop - min_frames)]
+        for onset in inside:
+            if onset - bounds[-1] >= min_frames:
+                bounds.append(int(onset))
+        bounds.append(run_stop)
+        
+        for note_start, note_stop in zip(bounds[:-1], bounds[1:]):
+            followed = note_stop != run_stop
+            start = note_start * hop_size
+            end = note_stop * hop_size if followed else min(
+                total, (note_stop - 1) * hop_size + frame_size)
+            
+            sustain = _sustain(rms, note_start, note_stop, overlap, 1 / hop_seconds, followed)
+            if sustain is not None:
+                sustain_start = sustain[0] * hop_size
+                sustain_end = min(end, sustain[1] * hop_size + frame_size)
+            if sustain is None or sustain_end - sustain_start < frame_size:
+                sustain_start, sustain_end = start, end
+            
+            segments.append({
+                'start': int(start),
+                'end': int(end),
+                'sustain_start': int(sustain_start),
+                'sustain_end': int(sustain_end),
+                'level': float(rms[note_start:note_stop].max())
+            })
+    
+    return segments
+
+
+def main_segment(segments):
+    """
+    The note to analyse when a recording should hold a single one
+    
+    Args:
+        segments (list): Output of segment_notes
+        
+    Returns:
+        dict: Segment with the longest sustain (None if there are none)
+    """
+    if not segments:
+        return None
+    return max(segments, key=lambda s: s['sustain_end'] - s['sustain_start'])
+
+
+def sustain_region(audio_data, sample_rate, **options):
+    """
+    Sample range of the sustain of the main note
+    
+    Args:
+        audio_data (numpy.array): Mono audio signal (array or AudioView)
+        sample_rate (int): Sample rate in Hz
+        **options: Passed on to segment_notes
+        
+    Returns:
+        tuple: (start, end) in samples, or None for a silent recording
+    """
+    segment = main_segment(segment_notes(audio_data, sample_rate, **options))
+    if segment is None:
+        return None
+    return segment['sustain_start'], segment['sustain_end']
+
+
+if __name__ == "__main__":
+    import sys
+    from audio_analyzer import load_audio
+    
+    if len(sys.argv) < 2:
+        print("Usage: python segmentation.py <file.wav>")
+        sys.exit(1)
+    
+    audio_data, sample_rate = load_audio(sys.argv[1], mmap=True)
+    print(f"{'Note':>4}  {'Start (s)':>9}  {'End (s)':>9}  {'Sustain (s)':>17}  {'Level':>6}")
+    for index, segment in enumerate(segment_notes(audio_data, sample_rate), 1):
+        print(f"{index:>4}  {segment['start'] / sample_rate:9.3f}  "
+              f"{segment['end'] / sample_rate:9.3f}  "
+              f"{segment['sustain_start'] / sample_rate:8.3f}-"
+              f"{segment['sustain_end'] / sample_rate:<8.3f}  {segment['level']:6.3f}")
@@ -4,10 +4,15 @@ Demuestra conceptos de DSP: Serie de Fourier, FFT, Espectro de Frecuencias
 """
 
 import numpy as np
-from scipy.io import wavfile
-from scipy.fft import fft, fftfreq, rfft, rfftfreq
-import matplotlib.pyplot as plt
 from note_frequencies import get_note_from_frequency, format_note_name
+from audio_analyzer import load_audio
+from wav_reader import to_float32
+from dsp_utils import (WINDOW_FUNCTIONS, get_window, get_rfft_frequencies,
+                       interpolated_peak_frequency, parabolic_peak_offsets,
+                       phase_vocoder_frequency)
+from waveform_lod import EnvelopePyramid, LODLine
+from segmentation import sustain_region
+from instrumentation import stage, count, lazy_import
 
 
 class SpectralAnalyzer:
@@ -18,28 +23,61 @@ class SpectralAnalyzer:
     - Detección de armónicos
     """
     
-    def __init__(self, audio_file):
+    def __init__(self, audio_file, mmap=False, channel=None, sustain=False):
         """
         Inicializa el analizador con un archivo de audio
         
         Args:
             audio_file (str): Ruta al archivo WAV
+            mmap (bool): Mapear el archivo en memoria en lugar de leerlo
+                completo; la conversión a mono y a flotante se hace por
+                bloques sólo cuando se necesitan las muestras
+            channel (int): Analizar sólo este canal en lugar de la mezcla
+                mono de todos (p. ej. un micrófono de una grabación multicanal)
+            sustain (bool): Quedarse sólo con el sostenido de la nota
+                principal: el silencio, el ataque y la cola de la nota no
+                se transforman (ver segmentation)
         """
-        self.sample_rate, audio_data = wavfile.read(audio_file)
-        
-        # Convertir a mono si es estéreo
-        if len(audio_data.shape) > 1:
-            audio_data = np.mean(audio_data, axis=1)
-        
-        # Normalizar
-        if audio_data.dtype == np.int16:
-            audio_data = audio_data.astype(np.float32) / 32768.0
-        elif audio_data.dtype == np.int32:
-            audio_data = audio_data.astype(np.float32) / 2147483648.0
+        if channel is None:
+            # Convierte a mono y normaliza a float32 (ver audio_analyzer.load_audio)
+            audio_data, sample_rate = load_audio(audio_file, mmap=mmap)
+        elif mmap:
+            audio_data, sample_rate = load_audio(audio_file, mmap=True)
+            audio_data = audio_data.select_channel(channel)
+        else:
+            # Sólo la columna elegida pasa a float32, sin promover el resto
+            audio_data, sample_rate = load_audio(audio_file, mono=False)
+            audio_data = to_float32(audio_data[:, channel])
+        self._set_signal(audio_data, sample_rate, sustain)
+    
+    @classmethod
+    def from_array(cls, audio_data, sample_rate, sustain=False):
+        """
+        Crea un analizador a partir de muestras ya cargadas en memoria
         
+        Args:
+            audio_data (numpy.array): Señal mono
+            sample_rate (int): Frecuencia de muestreo en Hz
+            sustain (bool): Quedarse sólo con el sostenido de la nota principal
+            
+        Returns:
+            SpectralAnalyzer: Analizador de la señal
+        """
+        analyzer = cls.__new__(cls)
+        analyzer._set_signal(audio_data, sample_rate, sustain)
+        return analyzer
+    
+    def _set_signal(self, audio_data, sample_rate, sustain=False):
+        """Guarda la señal (o su sostenido) y sus parámetros básicos"""
+        if sustain:
+            region = sustain_region(audio_data, sample_rate)
+            if region is not None:
+                audio_data = np.asarray(audio_data[region[0]:region[1]])
+        self.sample_rate = sample_rate
         self.audio_data = audio_data
         self.duration = len(audio_data) / self.sample_rate
         self.N = len(audio_data)  # Número de muestras
+        self._spectra = {}  # Espectros ya calculados, por tipo de ventana
         
     def compute_fft(self, window='hamming'):
         """
@@ -54,42 +92,214 @@ class SpectralAnalyzer:
             window (str): Tipo de ventana ('hamming', 'hanning', 'blackman', 'none')
             
         Returns:
-            tuple: (frequencies, magnitude, phase)
+            tuple: (frequencies, magnitude, phase), arreglos de sólo lectura
+                compartidos por todas las llamadas con la misma ventana
         """
-        # Aplicar ventana para reducir "spectral leakage"
-        if window == 'hamming':
-            w = np.hamming(self.N)
-        elif window == 'hanning':
-            w = np.hanning(self.N)
-        elif window == 'blackman':
-            w = np.blackman(self.N)
-        else:
-            w = np.ones(self.N)
+        # El espectro sólo depende de la ventana: se calcula una vez por tipo
+        if window in self._spectra:
+            return self._spectra[window]
+        rfft = lazy_import('scipy.fft').rfft
         
-        windowed_signal = self.audio_data * w
+        # Aplicar ventana para reducir "spectral leakage"
+        # (las ventanas y el eje de frecuencias se reutilizan entre llamadas)
+        with stage('window'):
+            w = get_window(window if window in WINDOW_FUNCTIONS else 'none', self.N)
+            
+            # np.asarray materializa una vista mapeada en memoria (mmap=True)
+            windowed_signal = np.asarray(self.audio_data) * w
         
         # Calcular FFT (solo frecuencias positivas con rfft)
-        fft_values = rfft(windowed_signal)
-        frequencies = rfftfreq(self.N, 1/self.sample_rate)
+        with stage('fft'):
+            fft_values = rfft(windowed_signal)
+            frequencies = get_rfft_frequencies(self.N, self.sample_rate)
+            
+            # Magnitud y fase
+            magnitude = np.abs(fft_values)
+            phase = np.angle(fft_values)
+        count('samples_transformed', self.N)
+        count('fft', label=self.N)
         
-        # Magnitud y fase
-        magnitude = np.abs(fft_values)
-        phase = np.angle(fft_values)
+        # Los resultados se comparten entre llamadas: sólo lectura
+        magnitude.flags.writeable = False
+        phase.flags.writeable = False
+        self._spectra[window] = (frequencies, magnitude, phase)
         
         return frequencies, magnitude, phase
     
-    def find_fundamental_and_harmonics(self, num_harmonics=5):
+    def iter_stft(self, frame_size=4096, hop_size=1024, window='hanning',
+                  dtype=np.float32, chunk_frames=256):
+        """
+        Transformada de Fourier de tiempo corto (STFT) por bloques de tramas
+        
+        Cada bloque de tramas se forma con sliding_window_view sobre la señal
+        (sin copiar trama por trama), se multiplica por la ventana y se
+        transforma con una sola llamada a rfft sobre el eje de las tramas.
+        Sólo se lee la porción de señal de cada bloque, así que con mmap=True
+        sirve para archivos más grandes que la memoria.
+        
+        Args:
+            frame_size (int): Muestras por trama (tamaño de la FFT)
+            hop_size (int): Muestras entre el inicio de tramas consecutivas
+            window (str): Tipo de ventana ('hamming', 'hanning', 'blackman', 'none')
+            dtype: np.float32 (la mitad de memoria) o np.float64
+            chunk_frames (int): Tramas por bloque
+            
+        Yields:
+            tuple: (times, magnitude, phase) del bloque; times son los centros
+                de las tramas en segundos y magnitude/phase tienen forma
+                (tramas, frame_size // 2 + 1)
+        """
+        if frame_size <= 0 or hop_size <= 0 or chunk_frames <= 0:
+            raise ValueError("frame_size, hop_size y chunk_frames deben ser positivos")
+        rfft = lazy_import('scipy.fft').rfft
+        
+        w = get_window(window if window in WINDOW_FUNCTIONS else 'none', frame_size).astype(dtype)
+        num_frames = self.num_stft_frames(frame_size, hop_size)
+        
+        for first in range(0, num_frames, chunk_frames):
+            last = min(first + chunk_frames, num_frames)
+            start = first * hop_size
+            stop = (last - 1) * hop_size + frame_size
+            
+            block = np.asarray(self.audio_data[start:stop], dtype=dtype)
+            if len(block) < frame_size:
+                # Señal más corta que una trama: se completa con ceros
+                block = np.pad(block, (0, frame_size - len(block)))
+            
+            # Vista (tramas, frame_size) sobre el bloque, sin copias
+            frames = np.lib.stride_tricks.sliding_window_view(block, frame_size)[::hop_size]
+            spectrum = rfft(frames * w, axis=-1)
+            
+            times = (np.arange(first, last) * hop_size + frame_size / 2) / self.sample_rate
+            yield times, np.abs(spectrum).astype(dtype, copy=False), \
+                np.angle(spectrum).astype(dtype, copy=False)
+    
+    def num_stft_frames(self, frame_size, hop_size):
+        """Número de tramas completas de la STFT (al menos una)"""
+        if self.N <= frame_size:
+            return 1
+        return 1 + (self.N - frame_size) // hop_size
+    
+    def compute_stft(self, frame_size=4096, hop_size=1024, window='hanning', dtype=np.float32):
+        """
+        Calcula la STFT completa (espectrograma) de la señal
+        
+        Args:
+            frame_size (int): Muestras por trama (tamaño de la FFT)
+            hop_size (int): Muestras entre el inicio de tramas consecutivas
+            window (str): Tipo de ventana ('hamming', 'hanning', 'blackman', 'none')
+            dtype: np.float32 (la mitad de memoria) o np.float64
+            
+        Returns:
+            tuple: (times, frequencies, magnitude, phase) con magnitude y phase
+                de forma (tramas, frame_size // 2 + 1)
+        """
+        num_frames = self.num_stft_frames(frame_size, hop_size)
+        num_bins = frame_size // 2 + 1
+        
+        # Se reservan las matrices una vez y se llenan bloque por bloque
+        times = np.empty(num_frames)
+        magnitude = np.empty((num_frames, num_bins), dtype=dtype)
+        phase = np.empty((num_frames, num_bins), dtype=dtype)
+        
+        row = 0
+        for chunk_times, chunk_magnitude, chunk_phase in self.iter_stft(
+                frame_size, hop_size, window, dtype):
+            rows = slice(row, row + len(chunk_times))
+            times[rows] = chunk_times
+            magnitude[rows] = chunk_magnitude
+            phase[rows] = chunk_phase
+            row += len(chunk_times)
+        
+        return times, get_rfft_frequencies(frame_size, self.sample_rate), magnitude, phase
+    
+    def compute_pitch_track(self, frame_size=4096, hop_size=1024, window='hanning',
+                            min_freq=20, max_freq=5000):
+        """
+        Frecuencia dominante de cada trama de la STFT, sin bucles por trama
+        
+        Args:
+            frame_size (int): Muestras por trama
+            hop_size (int): Muestras entre tramas
+            window (str): Tipo de ventana
+            min_freq (float): Frecuencia mínima buscada
+            max_freq (float): Frecuencia máxima buscada
+            
+        Returns:
+            tuple: (times, frequencies) con una frecuencia por trama,
+                refinada con interpolación parabólica
+        """
+        freqs = get_rfft_frequencies(frame_size, self.sample_rate)
+        min_idx = np.argmax(freqs > min_freq)
+        max_idx = np.argmax(freqs > max_freq) or len(freqs)
+        bin_width = self.sample_rate / frame_size
+        
+        all_times, all_freqs = [], []
+        for times, magnitude, _ in self.iter_stft(frame_size, hop_size, window):
+            peaks = min_idx + np.argmax(magnitude[:, min_idx:max_idx], axis=1)
+            offsets = parabolic_peak_offsets(magnitude, peaks)
+            all_times.append(times)
+            all_freqs.append((peaks + offsets) * bin_width)
+        
+        return np.concatenate(all_times), np.concatenate(all_freqs)
+    
+    def plot_spectrogram(self, frame_size=4096, hop_size=1024, max_freq=2000, save_path=None):
+        """
+        Grafica el espectrograma (magnitud de la STFT en dB)
+        
+        Args:
+            frame_size (int): Muestras por trama
+            hop_size (int): Muestras entre tramas
+            max_freq (float): Frecuencia máxima a mostrar
+            save_path (str): Ruta para guardar la imagen (opcional)
+        """
+        # matplotlib sólo se carga al graficar: el análisis en texto no lo necesita
+        import matplotlib.pyplot as plt
+        
+        times, freqs, magnitude, _ = self.compute_stft(frame_size, hop_size)
+        idx_max = np.argmax(freqs > max_freq) or len(freqs)
+        
+        magnitude_db = 20 * np.log10(np.maximum(magnitude[:, :idx_max], 1e-10))
+        
+        plt.figure(figsize=(12, 6))
+        plt.imshow(magnitude_db.T, origin='lower', aspect='auto', cmap='magma',
+                   extent=(0, self.duration, 0, freqs[idx_max - 1]),
+                   vmin=magnitude_db.max() - 80)
+        plt.colorbar(label='Magnitud (dB)')
+        plt.xlabel('Tiempo (s)')
+        plt.ylabel('Frecuencia (Hz)')
+        plt.title('Espectrograma (STFT)')
+        plt.tight_layout()
+        
+        if save_path:
+            plt.savefig(save_path, dpi=150, bbox_inches='tight')
+            print(f"Espectrograma guardado en: {save_path}")
+        else:
+            plt.show()
+    
+    def find_fundamental_and_harmonics(self, num_harmonics=5, interpolation='parabolic',
+                                       tolerance_cents=50):
         """
         Encuentra la frecuencia fundamental y sus armónicos
         
         En teoría musical, los armónicos son múltiplos enteros de la frecuencia fundamental:
         f_n = n * f_0, donde n = 1, 2, 3, ...
         
+        La resolución de la FFT es fs/N; la interpolación estima la posición real
+        del pico entre dos bins, lo que da precisión de cents con ventanas cortas.
+        
         Args:
             num_harmonics (int): Número de armónicos a detectar
+            interpolation (str): Estimador del pico fundamental: 'parabolic'
+                (parábola sobre la magnitud logarítmica), 'phase' (vocoder de
+                fase entre dos tramas solapadas) o 'none' (centro del bin)
+            tolerance_cents (float): Distancia máxima, en cents, entre un
+                armónico y su múltiplo esperado n * f_0
             
         Returns:
-            dict: Información sobre fundamental y armónicos
+            dict: Información sobre fundamental y armónicos. Cada armónico
+                incluye 'cents', su desviación respecto a n * f_0
+                (inarmonicidad)
         """
         freqs, magnitude, _ = self.compute_fft()
         
@@ -106,26 +316,18 @@ class SpectralAnalyzer:
         fundamental_idx = np.argmax(search_magnitude)
         fundamental_freq = search_freqs[fundamental_idx]
         
+        # Refinar el pico por debajo de la resolución de un bin
+        if interpolation == 'parabolic':
+            fundamental_freq = interpolated_peak_frequency(
+                magnitude, min_idx + fundamental_idx, self.N, self.sample_rate)
+        elif interpolation == 'phase':
+            fundamental_freq = self._phase_peak_frequency(fundamental_freq)
+        elif interpolation != 'none':
+            raise ValueError(f"Método de interpolación desconocido: {interpolation}")
+        
         # Buscar armónicos (múltiplos de la fundamental)
-        harmonics = []
-        for n in range(2, num_harmonics + 1):
-            harmonic_freq = n * fundamental_freq
-            
-            # Buscar el pico más cercano a la frecuencia armónica esperada
-            tolerance = 50  # Hz
-            harmonic_range = np.where(
-                (freqs >= harmonic_freq - tolerance) & 
-                (freqs <= harmonic_freq + tolerance)
-            )[0]
-            
-            if len(harmonic_range) > 0:
-                harmonic_idx = harmonic_range[np.argmax(magnitude[harmonic_range])]
-                harmonics.append({
-                    'order': n,
-                    'frequency': freqs[harmonic_idx],
-                    'magnitude': magnitude[harmonic_idx],
-                    'expected': harmonic_freq
-                })
+        harmonics = self._find_harmonics(freqs, magnitude, fundamental_freq, num_harmonics,
+                                         tolerance_cents, interpolation != 'none')
         
         # Identificar nota musical
         note, exact_freq, cents = get_note_from_frequency(fundamental_freq)
@@ -144,6 +346,97 @@ class SpectralAnalyzer:
             'num_samples': self.N
         }
     
+    def _phase_peak_frequency(self, frequency):
+        """
+        Refina un pico con el vocoder de fase entre dos tramas de la señal
+        
+        Las tramas ocupan tres cuartos de la señal y empiezan N / 4 muestras
+        una de otra, de modo que ambas salen de un solo bloque de iter_stft.
+        
+        Args:
+            frequency (float): Frecuencia del pico en el espectro completo
+            
+        Returns:
+            float: Frecuencia refinada en Hz
+        """
+        hop_size = self.N // 4
+        if hop_size == 0:
+            return frequency
+        frame_size = self.N - hop_size
+        
+        _, magnitude, phase = next(self.iter_stft(frame_size, hop_size, window='hamming',
+                                                  dtype=np.float64, chunk_frames=2))
+        
+        # El bin del pico en las tramas, más cortas: el máximo junto a la frecuencia dada
+        center = int(round(frequency * frame_size / self.sample_rate))
+        low, high = max(center - 1, 0), min(center + 2, magnitude.shape[1])
+        peak_idx = low + int(np.argmax(magnitude[0, low:high]))
+        
+        spectra = np.exp(1j * phase)  # phase_vocoder_frequency sólo usa la fase
+        return phase_vocoder_frequency(spectra[0], spectra[1], peak_idx, hop_size, frame_size,
+                                       self.sample_rate)
+    
+    def _find_harmonics(self, freqs, magnitude, fundamental_freq, num_harmonics,
+                        tolerance_cents, interpolate):
+        """
+        Busca todos los armónicos a la vez con ventanas de índices
+        
+        La ventana de búsqueda de cada armónico se calcula directamente en
+        bins (n * f_0 / resolución ± tolerancia en cents), y todas se evalúan
+        con una sola lectura indexada del espectro, sin recorrer el arreglo
+        de frecuencias completo una vez por armónico.
+        
+        Returns:
+            list: Un diccionario por armónico encontrado
+        """
+        if num_harmonics < 2 or fundamental_freq <= 0:
+            return []
+        
+        orders = np.arange(2, num_harmonics + 1)
+        expected = orders * fundamental_freq
+        
+        # Sólo armónicos por debajo de la frecuencia de Nyquist
+        in_range = expected < freqs[-1]
+        orders, expected = orders[in_range], expected[in_range]
+        if len(orders) == 0:
+            return []
+        
+        # Ventana [f / r, f * r] en bins, con al menos el bin más cercano
+        bin_width = self.sample_rate / self.N
+        ratio = 2 ** (tolerance_cents / 1200)
+        centers = np.rint(expected / bin_width).astype(np.int64)
+        lows = np.minimum(np.ceil(expected / ratio / bin_width).astype(np.int64), centers)
+        highs = np.maximum(np.floor(expected * ratio / bin_width).astype(np.int64), centers)
+        highs = np.minimum(highs, len(magnitude) - 1)
+        
+        # Matriz (armónicos, ancho máximo) de índices; lo que sobra se enmascara
+        offsets = np.arange((highs - lows).max() + 1)
+        indices = lows[:, np.newaxis] + offsets
+        outside = indices > highs[:, np.newaxis]
+        indices = np.minimum(indices, len(magnitude) - 1)
+        
+        window_magnitudes = np.where(outside, -np.inf, magnitude[indices])
+        peaks = indices[np.arange(len(orders)), np.argmax(window_magnitudes, axis=1)]
+        
+        found = freqs[peaks]
+        if interpolate:
+            # broadcast_to repite el espectro por fila sin copiarlo
+            spectra = np.broadcast_to(magnitude, (len(peaks), len(magnitude)))
+            found = (peaks + parabolic_peak_offsets(spectra, peaks)) * bin_width
+        deviation = 1200 * np.log2(found / expected)
+        
+        return [
+            {
+                'order': int(order),
+                'frequency': float(frequency),
+                'magnitude': float(magnitude[peak]),
+                'expected': float(expected_freq),
+                'cents': float(cents)
+            }
+            for order, frequency, peak, expected_freq, cents
+            in zip(orders, found, peaks, expected, deviation)
+        ]
+    
     def plot_spectrum(self, max_freq=2000, save_path=None):
         """
         Grafica el espectro de frecuencias
@@ -152,6 +445,8 @@ class SpectralAnalyzer:
             max_freq (float): Frecuencia máxima a mostrar
             save_path (str): Ruta para guardar la imagen (opcional)
         """
+        import matplotlib.pyplot as plt
+        
         freqs, magnitude, _ = self.compute_fft()
         
         # Limitar a frecuencias de interés
@@ -159,33 +454,32 @@ class SpectralAnalyzer:
         if idx_max == 0:
             idx_max = len(freqs)
         
-        plt.figure(figsize=(12, 6))
+        fig, (ax_freq, ax_time) = plt.subplots(2, 1, figsize=(12, 6))
         
-        # Subplot 1: Espectro completo
-        plt.subplot(2, 1, 1)
-        plt.plot(freqs[:idx_max], magnitude[:idx_max], color='#00d4ff', linewidth=1)
-        plt.xlabel('Frecuencia (Hz)')
-        plt.ylabel('Magnitud')
-        plt.title('Espectro de Frecuencias (FFT)')
-        plt.grid(True, alpha=0.3)
-        
-        # Subplot 2: Señal en el tiempo
-        plt.subplot(2, 1, 2)
-        time = np.linspace(0, self.duration, self.N)
-        # Mostrar solo una porción si es muy largo
-        max_samples = 10000
-        if self.N > max_samples:
-            step = self.N // max_samples
-            time = time[::step]
-            audio_plot = self.audio_data[::step]
-        else:
-            audio_plot = self.audio_data
+        # Las curvas se dibujan con pirámides min/max: solo se trazan unos
+        # pocos puntos por píxel y se recalculan al hacer zoom, sin perder picos
         
-        plt.plot(time, audio_plot, color='#16c79a', linewidth=0.5)
-        plt.xlabel('Tiempo (s)')
-        plt.ylabel('Amplitud')
-        plt.title('Señal en el Dominio del Tiempo')
-        plt.grid(True, alpha=0.3)
+        # Subplot 1: Espectro completo
+        spectrum = LODLine(ax_freq, color='#00d4ff', linewidth=1)
+        spectrum.set_pyramid(EnvelopePyramid(magnitude, x_step=freqs[1]), reset_view=False)
+        ax_freq.set_xlim(0, freqs[idx_max - 1])
+        ax_freq.set_ylim(0, 1.05 * max(magnitude[:idx_max].max(), 1e-12))
+        ax_freq.set_xlabel('Frecuencia (Hz)')
+        ax_freq.set_ylabel('Magnitud')
+        ax_freq.set_title('Espectro de Frecuencias (FFT)')
+        ax_freq.grid(True, alpha=0.3)
+        
+        # Subplot 2: Señal en el tiempo (completa)
+        signal = LODLine(ax_time, color='#16c79a', linewidth=0.5)
+        signal_pyramid = EnvelopePyramid(self.audio_data, x_step=1 / self.sample_rate)
+        signal.set_pyramid(signal_pyramid)
+        low, high = signal_pyramid.limits()
+        peak = max(abs(low), abs(high), 1e-3)
+        ax_time.set_ylim(-1.1 * peak, 1.1 * peak)
+        ax_time.set_xlabel('Tiempo (s)')
+        ax_time.set_ylabel('Amplitud')
+        ax_time.set_title('Señal en el Dominio del Tiempo')
+        ax_time.grid(True, alpha=0.3)
         
         plt.tight_layout()
         
@@ -218,11 +512,11 @@ class SpectralAnalyzer:
         
         if result['harmonics']:
             print(f"\n🎼 Armónicos detectados:")
-            print(f"   {'Orden':<8} {'Frecuencia':<15} {'Esperada':<15} {'Magnitud':<12}")
-            print(f"   {'-'*8} {'-'*15} {'-'*15} {'-'*12}")
+            print(f"   {'Orden':<8} {'Frecuencia':<15} {'Esperada':<15} {'Magnitud':<12} {'Cents':<8}")
+            print(f"   {'-'*8} {'-'*15} {'-'*15} {'-'*12} {'-'*8}")
             for h in result['harmonics']:
                 print(f"   {h['order']:<8} {h['frequency']:<15.2f} "
-                      f"{h['expected']:<15.2f} {h['magnitude']:<12.2f}")
+                      f"{h['expected']:<15.2f} {h['magnitude']:<12.2f} {h['cents']:<+8.1f}")
         
         print("\n" + "=" * 70)
         print("CONCEPTOS DE DSP APLICADOS:")
@@ -239,23 +533,34 @@ class SpectralAnalyzer:
 def main():
     """Función principal para demostración"""
     import sys
+    import instrumentation
     
     if len(sys.argv) < 2:
-        print("Uso: python spectral_analysis.py <archivo.wav>")
+        print("Uso: python spectral_analysis.py <archivo.wav> [--sostenido] [--profile]")
         print("\nEjemplo:")
         print("  python spectral_analysis.py samples/A4_440Hz.wav")
+        print("\n  --sostenido  Analizar sólo el sostenido de la nota principal")
+        print("  --profile    Mostrar el tiempo de cada etapa (carga, FFT, ...)")
         return
     
     audio_file = sys.argv[1]
+    profile = '--profile' in sys.argv[2:]
     
     print(f"\n🎵 Analizando: {audio_file}\n")
     
+    if profile:
+        instrumentation.enable()
+    
     # Crear analizador
-    analyzer = SpectralAnalyzer(audio_file)
+    analyzer = SpectralAnalyzer(audio_file, sustain='--sostenido' in sys.argv[2:])
     
     # Imprimir análisis completo
     analyzer.print_analysis()
     
+    if profile:
+        instrumentation.disable([instrumentation.print_report])
+        print()
+    
     # Preguntar si quiere ver el gráfico
     response = input("¿Deseas ver el gráfico del espectro? (s/n): ")
     if response.lower() == 's':
@@ -0,0 +1,32 @@
+"""
+Tests for note_monitor: readings must not depend on the block size
+"""
+
+import unittest
+import numpy as np
+from note_monitor import NoteMonitor
+
+
+class BlockSizeTest(unittest.TestCase):
+    
+    def test_low_string_read_with_small_blocks(self):
+        # A steady E2 fed in blocks shorter than the history step (as an
+        # AudioSource delivers them) must still get readings after warm-up
+        sample_rate = 44100
+        tone = 0.5 * np.sin(2 * np.pi * 82.41 * np.arange(2 * sample_rate) / sample_rate)
+        
+        for block_size in (64, 128, 256, 1000, 2048):
+            with self.subTest(block_size=block_size):
+                monitor = NoteMonitor.from_instrument('guitar', sample_rate)
+                cents = []
+                for start in range(0, len(tone), block_size):
+                    reading = monitor.process(tone[start:start + block_size])
+                    if start >= sample_rate:
+                        cents.append(reading['cents'][0])
+                cents = np.array(cents)
+                self.assertTrue(np.all(np.isfinite(cents)))
+                self.assertLess(np.max(np.abs(cents)), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,10 +8,32 @@ from tkinter import filedialog, messagebox
 from tkinter import ttk
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from matplotlib.figure import Figure
 import os
+import queue
+from analysis_worker import BackgroundAnalyzer
 from audio_analyzer import analyze_audio
+from decoders import supported_extensions
+from live_input import LiveTuner, SoundDeviceSource, WavPlaybackSource
+from waveform_lod import LODLine
+
+# Interval between checks for new live results (ms)
+LIVE_POLL_INTERVAL = 10
+
+# Interval between checks for callbacks from the analysis worker (ms)
+WORKER_POLL_INTERVAL = 30
+
+# Zoom factor of one mouse wheel step on the waveform
+SCROLL_ZOOM = 0.8
+
+
+def analyze_for_display(file_path, **analyze_kwargs):
+    """Analyze a file and build its waveform pyramid, off the Tk thread"""
+    result = analyze_audio(file_path, **analyze_kwargs)
+    if result['success']:
+        result.waveform_lod()
+    return result
 
 
 class TunerGUI:
@@ -24,8 +46,20 @@ class TunerGUI:
         # Current analysis result
         self.current_result = None
         
+        # Live input: results arrive from the analysis thread through a queue
+        self.live_tuner = None
+        self.live_results = queue.Queue()
+        
+        # File analysis runs on a worker thread; its callbacks are queued and
+        # run on the Tk thread by process_worker_calls
+        self.worker_calls = queue.Queue()
+        self.worker = BackgroundAnalyzer(self.worker_calls.put, analyze=analyze_for_display,
+                                         mmap=True)
+        
         # Setup UI
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(WORKER_POLL_INTERVAL, self.process_worker_calls)
     
     def setup_ui(self):
         """Create the user interface"""
@@ -99,6 +133,21 @@ class TunerGUI:
         )
         self.analyze_button.pack(side=tk.LEFT, padx=5)
         
+        self.live_button = tk.Button(
+            button_frame,
+            text="🎤 En Vivo",
+            command=self.toggle_live,
+            font=('Arial', 12, 'bold'),
+            bg='#ffaa00',
+            fg='#1a1a2e',
+            activebackground='#cc8800',
+            padx=20,
+            pady=10,
+            cursor='hand2',
+            relief=tk.FLAT
+        )
+        self.live_button.pack(side=tk.LEFT, padx=5)
+        
         # Results frame
         results_frame = tk.Frame(self.root, bg='#16213e', relief=tk.RAISED, borderwidth=2)
         results_frame.pack(pady=20, padx=40, fill=tk.BOTH)
@@ -167,7 +216,26 @@ class TunerGUI:
         self.ax.tick_params(colors='#a0a0a0')
         self.ax.grid(True, alpha=0.2, color='#00d4ff')
         
+        # The line and the label are created once; zooming, panning and new
+        # files only update their data
+        self.waveform = LODLine(self.ax, color='#00d4ff', linewidth=1.0)
+        self.view_text = self.ax.text(
+            0.98, 0.95, '',
+            transform=self.ax.transAxes,
+            ha='right', va='top',
+            color='#a0a0a0',
+            fontsize=8,
+            bbox=dict(boxstyle='round', facecolor='#16213e', alpha=0.8, edgecolor='none'),
+            visible=False
+        )
+        self.ax.callbacks.connect('xlim_changed', self.on_view_changed)
+        
         self.canvas = FigureCanvasTkAgg(self.figure, viz_frame)
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        
+        # Matplotlib toolbar for zoom and pan
+        self.toolbar = NavigationToolbar2Tk(self.canvas, viz_frame, pack_toolbar=False)
+        self.toolbar.pack(side=tk.BOTTOM, fill=tk.X)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         # Footer
@@ -185,12 +253,15 @@ class TunerGUI:
         file_path = filedialog.askopenfilename(
             title="Seleccionar archivo de audio",
             filetypes=[
+                ("Archivos de audio", " ".join(f"*{ext}" for ext in supported_extensions())),
                 ("Archivos WAV", "*.wav"),
                 ("Todos los archivos", "*.*")
             ]
         )
         
         if file_path:
+            # A new file makes any analysis in flight obsolete
+            self.worker.cancel()
             self.current_file = file_path
             filename = os.path.basename(file_path)
             self.file_label.config(text=f"Archivo: {filename}")
@@ -205,27 +276,138 @@ class TunerGUI:
             messagebox.showerror("Error", "Por favor selecciona un archivo primero")
             return
         
-        # Show processing message
+        # Show processing message; the analysis itself runs in the background
         self.note_label.config(text="⏳", fg='#ffaa00')
-        self.root.update()
+        self.status_label.config(text="Analizando... 0%", fg='#ffaa00')
         
+        self.worker.submit(
+            self.current_file,
+            on_done=self.on_analysis_done,
+            on_progress=self.on_analysis_progress,
+            on_error=self.on_analysis_error
+        )
+    
+    def on_analysis_progress(self, fraction, stage):
+        """Show the progress of the background analysis"""
+        self.status_label.config(text=f"Analizando... {fraction * 100:.0f}%", fg='#ffaa00')
+    
+    def on_analysis_done(self, result):
+        """Show the result of a finished background analysis"""
+        if result['success']:
+            self.current_result = result
+            self.display_results(result)
+        else:
+            messagebox.showerror("Error de Análisis", f"Error: {result['error']}")
+            self.clear_results()
+    
+    def on_analysis_error(self, error):
+        """Report an unexpected failure of the background analysis"""
+        messagebox.showerror("Error", f"Error al analizar el archivo: {str(error)}")
+        self.clear_results()
+    
+    def process_worker_calls(self):
+        """Run callbacks queued by the analysis worker on the Tk thread"""
+        while True:
+            try:
+                call = self.worker_calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                call()
+            except Exception as e:
+                messagebox.showerror("Error", f"Error al mostrar los resultados: {str(e)}")
+        
+        self.root.after(WORKER_POLL_INTERVAL, self.process_worker_calls)
+    
+    def toggle_live(self):
+        """Start or stop live tuning from the microphone"""
+        if self.live_tuner is not None:
+            self.stop_live()
+            return
+        
+        self.worker.cancel()
+        
+        # Without a microphone backend, play back the selected file as if live
+        if SoundDeviceSource.is_available():
+            source = SoundDeviceSource()
+            source_name = "micrófono"
+        elif hasattr(self, 'current_file'):
+            source = WavPlaybackSource(self.current_file, loop=True)
+            source_name = os.path.basename(self.current_file)
+        else:
+            messagebox.showerror(
+                "Error",
+                "No hay micrófono disponible (instala 'sounddevice') "
+                "ni un archivo seleccionado para reproducir")
+            return
+        
+        self.live_tuner = LiveTuner(source, self.live_results.put)
         try:
-            # Analyze audio
-            result = analyze_audio(self.current_file)
-            
-            if result['success']:
-                self.current_result = result
-                self.display_results(result)
+            self.live_tuner.start()
+        except Exception as e:
+            self.live_tuner = None
+            messagebox.showerror("Error", f"No se pudo iniciar la entrada en vivo: {str(e)}")
+            return
+        
+        self.file_label.config(text=f"En vivo: {source_name}")
+        self.live_button.config(text="⏹ Detener")
+        self.upload_button.config(state=tk.DISABLED)
+        self.analyze_button.config(state=tk.DISABLED)
+        self.clear_results()
+        self.root.after(LIVE_POLL_INTERVAL, self.poll_live_results)
+    
+    def stop_live(self):
+        """Stop live tuning and restore the file controls"""
+        if self.live_tuner is None:
+            return
+        
+        self.live_tuner.stop()
+        self.live_tuner = None
+        
+        self.live_button.config(text="🎤 En Vivo")
+        self.upload_button.config(state=tk.NORMAL)
+        if hasattr(self, 'current_file'):
+            self.file_label.config(text=f"Archivo: {os.path.basename(self.current_file)}")
+            self.analyze_button.config(state=tk.NORMAL)
+        else:
+            self.file_label.config(text="Ningún archivo seleccionado")
+    
+    def poll_live_results(self):
+        """Show the newest live result and schedule the next check"""
+        if self.live_tuner is None:
+            return
+        
+        # Only the most recent estimate matters; drop any backlog
+        latest = None
+        while True:
+            try:
+                latest = self.live_results.get_nowait()
+            except queue.Empty:
+                break
+        
+        if latest is not None:
+            if latest['note'] is None:
+                self.note_label.config(text="--", fg='#ffffff')
             else:
-                messagebox.showerror("Error de Análisis", f"Error: {result['error']}")
-                self.clear_results()
+                self.display_note(latest)
         
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al analizar el archivo: {str(e)}")
-            self.clear_results()
+        self.root.after(LIVE_POLL_INTERVAL, self.poll_live_results)
+    
+    def on_close(self):
+        """Stop background capture and analysis before closing the window"""
+        self.stop_live()
+        self.worker.shutdown()
+        self.root.destroy()
     
     def display_results(self, result):
         """Display analysis results"""
+        self.display_note(result)
+        
+        # Plot waveform
+        self.plot_waveform(result)
+    
+    def display_note(self, result):
+        """Display the detected note, frequency, deviation and tuning status"""
         
         # Display note
         self.note_label.config(text=result['note_formatted'], fg='#00d4ff')
@@ -258,44 +440,46 @@ class TunerGUI:
             self.status_label.config(fg='#ffaa00')
         else:
             self.status_label.config(fg='#ff4757')
-        
-        # Plot waveform
-        self.plot_waveform(result['audio_data'], result['sample_rate'])
     
-    def plot_waveform(self, audio_data, sample_rate):
-        """Plot audio waveform"""
-        self.ax.clear()
-        
-        # Create time axis
-        duration = len(audio_data) / sample_rate
-        
-        # Show only first 0.05 seconds to see actual wave oscillations
-        # This makes the sine waves visible instead of a solid block
-        display_duration = min(0.05, duration)  # 50 milliseconds
-        num_samples_to_show = int(display_duration * sample_rate)
-        
-        audio_to_plot = audio_data[:num_samples_to_show]
-        time = np.linspace(0, display_duration, num_samples_to_show)
-        
-        # Plot waveform
-        self.ax.plot(time, audio_to_plot, color='#00d4ff', linewidth=1.5)
-        self.ax.set_facecolor('#1a1a2e')
-        self.ax.set_title('Forma de Onda del Audio (primeros 50ms)', color='#00d4ff', fontsize=12)
-        self.ax.set_xlabel('Tiempo (s)', color='#a0a0a0')
-        self.ax.set_ylabel('Amplitud', color='#a0a0a0')
-        self.ax.tick_params(colors='#a0a0a0')
-        self.ax.grid(True, alpha=0.2, color='#00d4ff')
+    def plot_waveform(self, result):
+        """Plot the whole audio waveform, zoomable down to single samples"""
+        pyramid = result.waveform_lod()
+        low, high = pyramid.limits()
+        peak = max(abs(low), abs(high), 1e-3)
+        
+        self.ax.set_ylim(-1.1 * peak, 1.1 * peak)
+        self.view_text.set_visible(True)
+        self.waveform.set_pyramid(pyramid)
+        
+        # Make the toolbar's home button return to the whole file
+        self.toolbar.update()
+        self.canvas.draw_idle()
+    
+    def on_view_changed(self, ax):
+        """Describe the visible part of the waveform"""
+        pyramid = self.waveform.pyramid
+        if pyramid is None:
+            return
         
-        # Add note about what we're showing
-        self.ax.text(0.98, 0.95, f'Mostrando {display_duration*1000:.0f}ms de {duration:.2f}s totales',
-                    transform=self.ax.transAxes,
-                    ha='right', va='top',
-                    color='#a0a0a0',
-                    fontsize=8,
-                    bbox=dict(boxstyle='round', facecolor='#16213e', alpha=0.8, edgecolor='none'))
+        start, end = ax.get_xlim()
+        span = max(0.0, min(end, pyramid.x_range[1]) - max(start, 0.0))
+        shown = f'{span * 1000:.0f}ms' if span < 1 else f'{span:.2f}s'
+        self.view_text.set_text(f'Mostrando {shown} de {pyramid.x_range[1]:.2f}s totales')
+    
+    def on_scroll(self, event):
+        """Zoom the waveform around the mouse with the wheel"""
+        pyramid = self.waveform.pyramid
+        if event.inaxes is not self.ax or pyramid is None:
+            return
         
-        # Update canvas
-        self.canvas.draw()
+        factor = SCROLL_ZOOM if event.button == 'up' else 1 / SCROLL_ZOOM
+        start, end = self.ax.get_xlim()
+        first, last = pyramid.x_range
+        start = max(first, event.xdata - (event.xdata - start) * factor)
+        end = min(last, event.xdata + (end - event.xdata) * factor)
+        if end - start > 2 * pyramid.x_step:
+            self.ax.set_xlim(start, end)
+            self.canvas.draw_idle()
     
     def clear_results(self):
         """Clear all results"""
@@ -305,14 +489,9 @@ class TunerGUI:
         self.status_label.config(text="")
         
         # Clear plot
-        self.ax.clear()
-        self.ax.set_facecolor('#1a1a2e')
-        self.ax.set_title('Forma de Onda del Audio', color='#00d4ff', fontsize=12)
-        self.ax.set_xlabel('Tiempo (s)', color='#a0a0a0')
-        self.ax.set_ylabel('Amplitud', color='#a0a0a0')
-        self.ax.tick_params(colors='#a0a0a0')
-        self.ax.grid(True, alpha=0.2, color='#00d4ff')
-        self.canvas.draw()
+        self.waveform.set_pyramid(None)
+        self.view_text.set_visible(False)
+        self.canvas.draw_idle()
 
 
 def main():
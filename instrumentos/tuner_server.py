@@ -0,0 +1,785 @@
+"""
+Tuner Server Module
+Local HTTP and WebSocket service around the analyzer, on asyncio
+
+Endpoints:
+    GET  /health   Liveness check
+    POST /analyze  Body: a WAV file. Returns the analyze_audio result as JSON.
+    GET  /stream   WebSocket. The client sends binary messages of mono
+                   little-endian PCM; the server pushes a JSON pitch update
+                   every hop_size samples.
+
+Query parameters (both endpoints): method, interpolation, reference,
+temperament, key and instrument, as in the audio_analyzer CLI. /stream
+also takes sample_rate, format ('s16' or 'f32'), frame_size and hop_size.
+
+The event loop only moves bytes. FFT work runs in a process pool, and a
+shared limit on in-flight jobs provides backpressure: uploads beyond it
+are refused with 503, and stream frames that arrive while their
+connection's previous frame is still being analysed are skipped, newest
+first, the same way LiveTuner skips ahead. Each connection keeps only a
+ring buffer of its latest samples, so memory stays bounded no matter how
+fast clients send.
+
+Only the standard library is used (no web framework), and the server
+binds to localhost by default.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import numpy as np
+from audio_analyzer import analyze_audio, PITCH_METHODS
+from dsp_utils import INTERPOLATION_METHODS
+from live_input import RingBuffer, analyze_frame
+from tuning import get_tuning
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Largest accepted upload and WebSocket message
+MAX_UPLOAD_BYTES = 64 * 2 ** 20
+MAX_MESSAGE_BYTES = 2 ** 20
+
+# Longest wait, in seconds, for the body of a refused upload to be discarded
+DISCARD_TIMEOUT = 5.0
+
+# RMS below which a stream frame reports no note
+SILENCE_THRESHOLD = 1e-3
+
+# Sample formats accepted on /stream
+SAMPLE_FORMATS = {'s16': np.dtype('<i2'), 'f32': np.dtype('<f4')}
+
+# RFC 6455 opcodes
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# RFC 6455 close codes
+CLOSE_NORMAL = 1000
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_TOO_BIG = 1009
+
+_WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+class ProtocolError(Exception):
+    """Malformed HTTP request or WebSocket frame"""
+    
+    def __init__(self, message, close_code=CLOSE_PROTOCOL_ERROR):
+        super().__init__(message)
+        self.close_code = close_code
+
+
+def _to_builtin(value):
+    """json.dumps fallback for numpy scalars"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_bytes(payload):
+    return json.dumps(payload, ensure_ascii=False, default=_to_builtin).encode('utf-8')
+
+
+# ---------------------------------------------------------------------------
+# WebSocket framing (RFC 6455)
+# ---------------------------------------------------------------------------
+
+def _apply_mask(payload, mask):
+    """XOR a payload with a 4-byte masking key (masking and unmasking are the same)"""
+    data = np.frombuffer(payload, dtype=np.uint8)
+    return (data ^ np.resize(np.frombuffer(mask, dtype=np.uint8), len(data))).tobytes()
+
+
+def encode_frame(opcode, payload=b'', mask=False):
+    """
+    Encode one unfragmented WebSocket frame
+    
+    Args:
+        opcode (int): OP_TEXT, OP_BINARY, OP_CLOSE, ...
+        payload (bytes): Frame payload
+        mask (bool): Mask the payload (required for client-to-server frames)
+        
+    Returns:
+        bytes: The frame
+    """
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 2 ** 16:
+        header.append(mask_bit | 126)
+        header += struct.pack('>H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('>Q', length)
+    
+    if mask:
+        key = os.urandom(4)
+        return bytes(header) + key + _apply_mask(payload, key)
+    return bytes(header) + payload
+
+
+async def read_frame(reader, max_size=MAX_MESSAGE_BYTES, require_mask=False):
+    """
+    Read one WebSocket frame
+    
+    Args:
+        reader (asyncio.StreamReader): Connection
+        max_size (int): Largest payload accepted
+        require_mask (bool): Reject unmasked frames (servers must)
+        
+    Returns:
+        tuple: (fin, opcode, payload), the payload already unmasked
+    """
+    first, second = await reader.readexactly(2)
+    if require_mask and not second & 0x80:
+        raise ProtocolError("Client frames must be masked")
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('>H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('>Q', await reader.readexactly(8))
+    if length > max_size:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {max_size}", CLOSE_TOO_BIG)
+    
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask is not None:
+        payload = _apply_mask(payload, mask)
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+async def read_message(reader, writer, max_size=MAX_MESSAGE_BYTES, require_mask=False):
+    """
+    Read one complete WebSocket message, answering pings on the way
+    
+    Args:
+        reader (asyncio.StreamReader): Connection
+        writer (asyncio.StreamWriter): Same connection, for pongs
+        max_size (int): Largest message accepted
+        require_mask (bool): Reject unmasked frames (servers must)
+        
+    Returns:
+        tuple: (opcode, payload); OP_CLOSE carries the close payload
+    """
+    opcode, parts, size = None, [], 0
+    while True:
+        fin, frame_opcode, payload = await read_frame(reader, max_size, require_mask)
+        
+        if frame_opcode == OP_PING:
+            writer.write(encode_frame(OP_PONG, payload, mask=not require_mask))
+            continue
+        if frame_opcode == OP_PONG:
+            continue
+        if frame_opcode == OP_CLOSE:
+            return OP_CLOSE, payload
+        
+        if frame_opcode != OP_CONTINUATION:
+            opcode = frame_opcode
+        elif opcode is None:
+            raise ProtocolError("Continuation frame without a message")
+        parts.append(payload)
+        size += len(payload)
+        if size > max_size:
+            raise ProtocolError(f"Message exceeds {max_size} bytes", CLOSE_TOO_BIG)
+        if fin:
+            return opcode, b''.join(parts)
+
+
+def _accept_key(key):
+    digest = hashlib.sha1((key + _WEBSOCKET_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+class Request:
+    """Parsed HTTP request line and headers"""
+    
+    def __init__(self, method, path, query, headers):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.upgraded = False  # Switched to WebSocket: no more HTTP responses
+
+
+async def read_request(reader):
+    """
+    Read an HTTP request line and headers (the body is left in the reader)
+    
+    Args:
+        reader (asyncio.StreamReader): Connection
+        
+    Returns:
+        Request: The request
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.LimitOverrunError:
+        raise ProtocolError("Request headers too large")
+    
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise ProtocolError(f"Malformed request line: {lines[0]!r}")
+    
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    
+    url = urlsplit(target)
+    return Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers)
+
+
+async def send_json(writer, status, payload, extra_headers=()):
+    """
+    Send a JSON response and flush it
+    
+    Args:
+        writer (asyncio.StreamWriter): Connection
+        status (int): HTTP status code
+        payload (dict): Response body
+        extra_headers (sequence): Additional 'Name: value' header lines
+    """
+    body = _json_bytes(payload)
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+             "Content-Type: application/json; charset=utf-8",
+             f"Content-Length: {len(body)}",
+             "Connection: close",
+             *extra_headers]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+
+async def discard_body(reader, writer, length=None):
+    """
+    Drop the unread body of a refused request before the connection closes
+    
+    Closing a socket with unread data makes the kernel reset the
+    connection, and the reset can destroy the response before the client
+    reads it. The response is ended with a half-close, then up to
+    MAX_UPLOAD_BYTES of the body are read and dropped.
+    
+    Args:
+        reader (asyncio.StreamReader): Connection
+        writer (asyncio.StreamWriter): Connection (the response already sent)
+        length (int): Body size from Content-Length (None: read until the
+            client closes)
+    """
+    remaining = MAX_UPLOAD_BYTES if length is None else min(length, MAX_UPLOAD_BYTES)
+    
+    async def drop(remaining):
+        while remaining > 0:
+            chunk = await reader.read(min(remaining, 1 << 16))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+    
+    try:
+        if writer.can_write_eof():
+            writer.write_eof()
+        await asyncio.wait_for(drop(remaining), DISCARD_TIMEOUT)
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+
+
+def analysis_options(query):
+    """
+    analyze_audio keyword arguments from request query parameters
+    
+    Args:
+        query (dict): Query parameters
+        
+    Returns:
+        dict: 'method', 'interpolation', 'tuning' and 'instrument'
+    """
+    method = query.get('method', 'fft')
+    if method not in PITCH_METHODS:
+        raise ValueError(f"Unknown pitch detection method: {method}")
+    interpolation = query.get('interpolation', 'parabolic')
+    if interpolation not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {interpolation}")
+    
+    tuning = get_tuning(query.get('temperament', 'equal'),
+                        float(query.get('reference', 440.0)), query.get('key', 'C'))
+    return {'method': method, 'interpolation': interpolation, 'tuning': tuning,
+            'instrument': query.get('instrument')}
+
+
+def _analyze_upload(file_path, options):
+    """Worker-process side of POST /analyze"""
+    return analyze_audio(file_path, **options).to_dict()
+
+
+def _warm_up():
+    """No-op job that makes the pool start its worker processes"""
+
+
+def _worker_context():
+    """
+    Start method for the worker processes
+    
+    Forked workers would inherit the sockets open at the time (the pool
+    starts them lazily, while a request is being served), and a socket
+    held open by a child never sends FIN when the server closes it.
+    forkserver and spawn start workers from a clean process instead.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class _Stream:
+    """State of one /stream connection"""
+    
+    def __init__(self, sample_rate, sample_format, frame_size, hop_size, options):
+        self.sample_rate = sample_rate
+        self.dtype = SAMPLE_FORMATS[sample_format]
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.options = options
+        self.buffer = RingBuffer(frame_size * 4)
+        self.partial = b''
+        self.received = 0
+        self.next_frame = frame_size
+        self.pending = None
+    
+    def feed(self, payload):
+        """Append raw PCM bytes, carrying any incomplete sample to the next message"""
+        data = self.partial + payload
+        usable = len(data) - len(data) % self.dtype.itemsize
+        self.partial = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype)
+        if self.dtype.kind == 'i':
+            samples = samples.astype(np.float32) / 32768.0
+        self.buffer.write(samples)
+        self.received += len(samples)
+
+
+class TunerServer:
+    """
+    asyncio HTTP/WebSocket front end for analyze_audio and live tuning
+    
+    Use as an async context manager, or call start() / close():
+        
+        async with TunerServer(port=0) as server:
+            print(server.port)
+            await server.serve_forever()
+    
+    The worker processes are started with forkserver (spawn on Windows),
+    so a script that creates a server must guard its entry point with
+    if __name__ == "__main__".
+    """
+    
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, max_pending=None,
+                 cache=None, executor=None):
+        """
+        Args:
+            host (str): Interface to bind (localhost by default)
+            port (int): TCP port (0 picks a free one, see the port attribute)
+            workers (int): Analysis processes (default: CPU count)
+            max_pending (int): Analyses queued or running at once, across all
+                connections (default: twice the number of workers)
+            cache (ResultCache): Optional result cache for uploads
+            executor (concurrent.futures.Executor): Use this pool instead of
+                creating a ProcessPoolExecutor (it is not shut down on close)
+        """
+        self.host = host
+        self.port = port
+        self.cache = cache
+        self._own_executor = executor is None
+        self._executor = executor or ProcessPoolExecutor(max_workers=workers,
+                                                         mp_context=_worker_context())
+        workers = getattr(self._executor, '_max_workers', None) or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * workers
+        self._pending = 0
+        self._slot_freed = asyncio.Event()
+        self._server = None
+    
+    async def __aenter__(self):
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def start(self):
+        """Start the worker processes, then start listening"""
+        if self._own_executor:
+            # Pay the worker start-up here rather than on the first request
+            await self._run(_warm_up)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=2 * MAX_MESSAGE_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def serve_forever(self):
+        await self._server.serve_forever()
+    
+    async def close(self):
+        """Stop listening and shut the worker pool down"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._own_executor:
+            self._executor.shutdown(cancel_futures=True)
+    
+    def _try_reserve(self):
+        """Take one in-flight slot, or return False when the pool is saturated"""
+        if self._pending >= self.max_pending:
+            return False
+        self._pending += 1
+        return True
+    
+    def _release(self):
+        self._pending -= 1
+        self._slot_freed.set()
+    
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+    
+    async def _handle(self, reader, writer):
+        request = None
+        try:
+            request = await read_request(reader)
+            if request.path == '/health' and request.method == 'GET':
+                await send_json(writer, 200, {'status': 'ok', 'pending': self._pending,
+                                              'max_pending': self.max_pending})
+            elif request.path == '/analyze' and request.method == 'POST':
+                await self._analyze(request, reader, writer)
+            elif request.path == '/stream' and request.method == 'GET':
+                await self._stream(request, reader, writer)
+            elif request.path in ('/health', '/analyze', '/stream'):
+                await send_json(writer, 405, {'success': False, 'error': "Method not allowed"})
+            else:
+                await send_json(writer, 404, {'success': False, 'error': "Not found"})
+        except ProtocolError as e:
+            await send_json(writer, 400, {'success': False, 'error': str(e)})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            # Failures in the pool or the analysis itself still get an answer
+            if (request is None or not request.upgraded) and not writer.is_closing():
+                status = 503 if isinstance(e, BrokenProcessPool) else 500
+                try:
+                    await send_json(writer, status, {'success': False, 'error': str(e) or repr(e)})
+                except ConnectionError:
+                    pass
+        finally:
+            writer.close()
+    
+    async def _analyze(self, request, reader, writer):
+        """POST /analyze: analyze an uploaded WAV file"""
+        try:
+            length = int(request.headers['content-length'])
+        except (KeyError, ValueError):
+            await send_json(writer, 411, {'success': False, 'error': "Content-Length required"})
+            await discard_body(reader, writer)
+            return
+        if length > MAX_UPLOAD_BYTES:
+            await send_json(writer, 413, {'success': False,
+                                          'error': f"Upload exceeds {MAX_UPLOAD_BYTES} bytes"})
+            await discard_body(reader, writer, length)
+            return
+        try:
+            options = analysis_options(request.query)
+        except ValueError as e:
+            await send_json(writer, 400, {'success': False, 'error': str(e)})
+            await discard_body(reader, writer, length)
+            return
+        
+        # Refuse before reading the body, so a saturated server sheds load cheaply
+        # (the body is still drained, or the refusal would be lost to a reset)
+        if not self._try_reserve():
+            await send_json(writer, 503, {'success': False, 'error': "Server busy"},
+                            ["Retry-After: 1"])
+            await discard_body(reader, writer, length)
+            return
+        
+        path = None
+        try:
+            if request.headers.get('expect', '').lower() == '100-continue':
+                # The client holds the body back until it is accepted
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                await writer.drain()
+            body = await reader.readexactly(length)
+            # No suffix: the decoders tell the format from the content
+            fd, path = tempfile.mkstemp(prefix='upload-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            del body
+            result = await self._run(_analyze_upload, path, dict(options, cache=self.cache))
+        finally:
+            self._release()
+            if path is not None:
+                os.unlink(path)
+        
+        await send_json(writer, 200 if result['success'] else 422, result)
+    
+    async def _stream(self, request, reader, writer):
+        """GET /stream: WebSocket live tuning"""
+        key = request.headers.get('sec-websocket-key')
+        if request.headers.get('upgrade', '').lower() != 'websocket' or not key:
+            await send_json(writer, 426, {'success': False, 'error': "WebSocket upgrade required"},
+                            ["Upgrade: websocket"])
+            return
+        
+        query = request.query
+        try:
+            stream = _Stream(int(query.get('sample_rate', 44100)),
+                             query.get('format', 's16'),
+                             int(query.get('frame_size', 2048)),
+                             int(query.get('hop_size', 512)),
+                             analysis_options(query))
+            if stream.sample_rate <= 0 or stream.hop_size <= 0 or stream.frame_size <= 0:
+                raise ValueError("sample_rate, frame_size and hop_size must be positive")
+        except (KeyError, ValueError) as e:
+            await send_json(writer, 400, {'success': False, 'error': f"Bad stream options: {e}"})
+            return
+        
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\n"
+                      "Connection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {_accept_key(key)}\r\n\r\n").encode('latin-1'))
+        request.upgraded = True
+        send_lock = asyncio.Lock()
+        
+        async def send(payload):
+            async with send_lock:
+                writer.write(encode_frame(OP_TEXT, _json_bytes(payload)))
+                # Waiting here slows a connection whose client stops reading
+                await writer.drain()
+        
+        await send({'type': 'ready', 'sample_rate': stream.sample_rate,
+                    'frame_size': stream.frame_size, 'hop_size': stream.hop_size})
+        
+        close_code = CLOSE_NORMAL
+        try:
+            while True:
+                try:
+                    opcode, payload = await read_message(reader, writer, require_mask=True)
+                except ProtocolError as e:
+                    close_code = e.close_code
+                    await send({'type': 'error', 'error': str(e)})
+                    break
+                
+                if opcode == OP_CLOSE:
+                    break
+                if opcode != OP_BINARY:
+                    await send({'type': 'error', 'error': "Expected binary PCM messages"})
+                    continue
+                
+                stream.feed(payload)
+                self._schedule(stream, send)
+            
+            # Deliver the update for the last samples before closing
+            await self._flush(stream, send)
+        finally:
+            if stream.pending is not None:
+                stream.pending.cancel()
+        
+        async with send_lock:
+            writer.write(encode_frame(OP_CLOSE, struct.pack('>H', close_code)))
+            await writer.drain()
+    
+    def _schedule(self, stream, send):
+        """
+        Start analysing the newest frame of a stream if one is due
+        
+        Returns:
+            bool: False if a frame is due but the pool is saturated (it is
+                retried when the next message arrives)
+        """
+        if stream.pending is not None or stream.received < stream.next_frame:
+            return True
+        if not self._try_reserve():
+            return False
+        
+        frame = stream.buffer.latest(stream.frame_size)
+        frame_end = stream.received
+        # Hops that fell due while the connection or the pool was busy are
+        # skipped: the newest samples are analysed instead of falling behind
+        skipped = (frame_end - stream.next_frame) // stream.hop_size
+        stream.next_frame = frame_end + stream.hop_size
+        options = stream.options
+        
+        async def analyse():
+            try:
+                result = await self._run(analyze_frame, frame, stream.sample_rate,
+                                         options['method'], options['interpolation'],
+                                         SILENCE_THRESHOLD, options['tuning'],
+                                         options['instrument'])
+                result.update(type='pitch', time=frame_end / stream.sample_rate,
+                              skipped=skipped)
+            except Exception as e:
+                result = {'type': 'error', 'error': str(e)}
+            finally:
+                self._release()
+            stream.pending = None
+            await send(result)
+            self._schedule(stream, send)
+        
+        stream.pending = asyncio.ensure_future(analyse())
+        return True
+    
+    async def _flush(self, stream, send):
+        """Wait until the newest samples of a stream have been analysed and sent"""
+        while True:
+            if stream.pending is not None:
+                await stream.pending
+            elif stream.received < stream.next_frame:
+                return
+            elif not self._schedule(stream, send):
+                self._slot_freed.clear()
+                await self._slot_freed.wait()
+
+
+# ---------------------------------------------------------------------------
+# Client helpers (for tools embedding the tuner, and for local testing)
+# ---------------------------------------------------------------------------
+
+async def stream_samples(samples, sample_rate, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                         chunk_size=1024, realtime=False, **params):
+    """
+    Stream mono samples to a TunerServer and collect its pitch updates
+    
+    Args:
+        samples (numpy.array): Mono float samples
+        sample_rate (int): Sample rate in Hz
+        host (str): Server host
+        port (int): Server port
+        chunk_size (int): Samples per WebSocket message
+        realtime (bool): Pace the messages at the audio rate
+        **params: Extra query parameters (frame_size, hop_size, method, ...)
+        
+    Returns:
+        list: Update dicts received, in order ('pitch' and 'error' types)
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=2 * MAX_MESSAGE_BYTES)
+    key = base64.b64encode(os.urandom(16)).decode('ascii')
+    query = urlencode(dict(params, sample_rate=sample_rate, format='f32'))
+    writer.write((f"GET /stream?{query} HTTP/1.1\r\n"
+                  f"Host: {host}:{port}\r\n"
+                  "Upgrade: websocket\r\n"
+                  "Connection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\n"
+                  "Sec-WebSocket-Version: 13\r\n\r\n").encode('latin-1'))
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    if not head.startswith('HTTP/1.1 101'):
+        body = await reader.read()
+        writer.close()
+        raise ConnectionError(f"Upgrade refused: {head.splitlines()[0]} {body.decode()}")
+    
+    samples = np.asarray(samples, dtype='<f4')
+    
+    async def send_all():
+        for start in range(0, len(samples), chunk_size):
+            writer.write(encode_frame(OP_BINARY, samples[start:start + chunk_size].tobytes(),
+                                      mask=True))
+            await writer.drain()
+            if realtime:
+                await asyncio.sleep(chunk_size / sample_rate)
+        writer.write(encode_frame(OP_CLOSE, struct.pack('>H', CLOSE_NORMAL), mask=True))
+        await writer.drain()
+    
+    sender = asyncio.ensure_future(send_all())
+    updates = []
+    try:
+        while True:
+            opcode, payload = await read_message(reader, writer)
+            if opcode == OP_CLOSE:
+                break
+            update = json.loads(payload)
+            if update.get('type') != 'ready':
+                updates.append(update)
+        await sender
+    finally:
+        sender.cancel()
+        writer.close()
+    return updates
+
+
+def main(argv=None):
+    """Command line entry point: run the server, or stream a file to one"""
+    import argparse
+    from result_cache import ResultCache, DEFAULT_CACHE_PATH
+    from decoders import open_audio
+    
+    parser = argparse.ArgumentParser(description="Local HTTP/WebSocket tuning service")
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f"Interface to bind or connect to (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Analysis processes (default: CPU count)")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="Analyses in flight before new work is refused or skipped "
+                             "(default: twice the workers)")
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH, metavar='PATH',
+                        help=f"Cache upload results (default path: {DEFAULT_CACHE_PATH})")
+    parser.add_argument('--stream', metavar='FILE',
+                        help="Instead of serving, stream an audio file to a running server "
+                             "in real time and print its updates")
+    args = parser.parse_args(argv)
+    
+    if args.stream:
+        audio = open_audio(args.stream)
+        try:
+            samples = audio.read(0, audio.num_samples)
+        finally:
+            audio.close()
+        updates = asyncio.run(stream_samples(samples, audio.sample_rate, args.host, args.port,
+                                             realtime=True))
+        for update in updates:
+            if update['type'] == 'error':
+                print(f"Error: {update['error']}")
+            elif update['note'] is None:
+                print(f"{update['time']:8.3f}s  --")
+            else:
+                print(f"{update['time']:8.3f}s  {update['frequency']:8.2f} Hz  "
+                      f"{update['note_formatted']:<4} {update['cents']:+6.1f} cents")
+        return
+    
+    async def serve():
+        cache = ResultCache(args.cache) if args.cache else None
+        async with TunerServer(args.host, args.port, args.workers, args.max_pending,
+                               cache) as server:
+            print(f"Listening on http://{server.host}:{server.port} "
+                  f"(POST /analyze, WebSocket /stream)", file=sys.stderr)
+            await server.serve_forever()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Tuning Systems Module
+Note tables for any reference pitch and temperament
+
+A TuningSystem places the twelve notes of each octave according to a
+temperament (cents above the key note), anchors the whole table so that
+the reference note (A4) sounds at the reference pitch, and precomputes
+the log2 boundaries between neighbouring notes: finding the nearest note
+of one frequency or of a whole array is a single binary search.
+"""
+
+from fractions import Fraction
+import numpy as np
+
+
+NOTE_NAMES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+
+# Octaves covered by the note tables (C0 to B8)
+MIN_OCTAVE = 0
+MAX_OCTAVE = 8
+
+DEFAULT_REFERENCE = 440.0
+DEFAULT_REFERENCE_NOTE = 'A4'
+
+
+def _ratios_to_cents(ratios):
+    return tuple(1200 * np.log2(float(Fraction(ratio))) for ratio in ratios)
+
+
+def _meantone_cents(fifth):
+    """Twelve notes from a chain of equal fifths, Eb to G#"""
+    cents = [0.0] * 12
+    for steps in range(-3, 9):
+        cents[(7 * steps) % 12] = (steps * fifth) % 1200
+    return tuple(cents)
+
+
+# Cents of each note above the key note, by temperament
+TEMPERAMENTS = {
+    'equal': tuple(100.0 * step for step in range(12)),
+    # 5-limit just intonation
+    'just': _ratios_to_cents(['1', '16/15', '9/8', '6/5', '5/4', '4/3',
+                              '45/32', '3/2', '8/5', '5/3', '9/5', '15/8']),
+    # Quarter-comma meantone: pure major thirds, fifths of 5 ** (1/4)
+    'meantone': _meantone_cents(1200 * np.log2(5) / 4),
+    # Werckmeister III: four fifths narrowed by a quarter of the Pythagorean comma
+    'werckmeister': (0.0, 90.225, 192.180, 294.135, 390.225, 498.045,
+                     588.270, 696.090, 792.180, 888.270, 996.090, 1092.180),
+}
+
+
+def parse_note_name(note):
+    """
+    Split a note name into pitch class and octave
+    
+    Args:
+        note (str): Note name (e.g., 'A4', 'C#3')
+        
+    Returns:
+        tuple: (pitch_class, octave), pitch_class being an index into NOTE_NAMES
+    """
+    name = note.rstrip('-0123456789')
+    if name not in NOTE_NAMES or name == note:
+        raise ValueError(f"Invalid note name: {note}")
+    return NOTE_NAMES.index(name), int(note[len(name):])
+
+
+def read_scala(file_path):
+    """
+    Read a Scala (.scl) scale file
+    
+    Args:
+        file_path (str): Path to the .scl file
+        
+    Returns:
+        tuple: (description, cents) with the cents of every scale degree
+            above the first one, the last being the period (usually 1200)
+    """
+    with open(file_path, encoding='latin-1') as f:
+        lines = [line.strip() for line in f if not line.startswith('!')]
+    
+    if len(lines) < 2:
+        raise ValueError(f"Not a Scala file: {file_path}")
+    description = lines[0]
+    values = [line.split()[0] for line in lines[1:] if line]
+    count = int(values[0])
+    if len(values) - 1 < count:
+        raise ValueError(f"Scala file declares {count} notes but has {len(values) - 1}")
+    
+    cents = []
+    for value in values[1:count + 1]:
+        if '.' in value:
+            cents.append(float(value))
+        else:
+            cents.append(1200 * np.log2(float(Fraction(value))))
+    return description, cents
+
+
+class TuningSystem:
+    """
+    Note frequencies for a reference pitch and a temperament
+    
+    Instances are immutable and cheap to pickle, so they can be handed to
+    worker processes along with the other analysis options.
+    """
+    
+    def __init__(self, reference=DEFAULT_REFERENCE, temperament='equal', key='C',
+                 reference_note=DEFAULT_REFERENCE_NOTE, name=None):
+        """
+        Args:
+            reference (float): Frequency of the reference note in Hz
+                (e.g., 415 for baroque pitch, 442 for many orchestras)
+            temperament (str or sequence): Name from TEMPERAMENTS, or the
+                cents of the twelve notes above the key note
+            key (str): Note the temperament is built on (irrelevant for 'equal')
+            reference_note (str): Note sounding at the reference frequency
+            name (str): Label for displays (default: built from the arguments)
+        """
+        if isinstance(temperament, str):
+            if temperament not in TEMPERAMENTS:
+                raise ValueError(f"Unknown temperament: {temperament}")
+            offsets = TEMPERAMENTS[temperament]
+            if name is None:
+                name = temperament if temperament == 'equal' else f"{temperament} ({key})"
+        else:
+            offsets = temperament
+        
+        offsets = np.asarray(offsets, dtype=np.float64)
+        if offsets.shape != (12,):
+            raise ValueError("A temperament needs the cents of exactly 12 notes")
+        if key not in NOTE_NAMES:
+            raise ValueError(f"Invalid key: {key}")
+        if not reference > 0:
+            raise ValueError("Reference frequency must be positive")
+        
+        self.reference = float(reference)
+        self.reference_note = reference_note
+        self.key = key
+        self.offsets = offsets
+        self.name = name or 'custom'
+        
+        # Cents of every note above C0 of the temperament, then anchored so
+        # that the reference note sounds at the reference frequency
+        steps = np.arange(12 * MIN_OCTAVE, 12 * (MAX_OCTAVE + 1)) - NOTE_NAMES.index(key)
+        cents = 1200 * (steps // 12) + offsets[steps % 12]
+        pitch_class, octave = parse_note_name(reference_note)
+        reference_cents = cents[12 * (octave - MIN_OCTAVE) + pitch_class]
+        
+        self.names = np.array([f"{note}{octave}" for octave in range(MIN_OCTAVE, MAX_OCTAVE + 1)
+                               for note in NOTE_NAMES], dtype=object)
+        self.frequencies = self.reference * np.exp2((cents - reference_cents) / 1200)
+        self.log2_frequencies = np.log2(self.frequencies)
+        
+        # Geometric midpoints between neighbouring notes: the nearest note in
+        # log2 space (i.e. in cents) is a binary search away
+        self.boundaries = (self.log2_frequencies[:-1] + self.log2_frequencies[1:]) / 2
+        
+        for array in (self.names, self.log2_frequencies, self.frequencies, self.boundaries):
+            array.flags.writeable = False
+    
+    @classmethod
+    def from_scala(cls, file_path, reference=DEFAULT_REFERENCE, key='C',
+                   reference_note=DEFAULT_REFERENCE_NOTE):
+        """
+        Tuning from a Scala (.scl) file of 12 notes per octave
+        
+        Args:
+            file_path (str): Path to the .scl file
+            reference (float): Frequency of the reference note in Hz
+            key (str): Note the first scale degree is placed on
+            reference_note (str): Note sounding at the reference frequency
+            
+        Returns:
+            TuningSystem: The tuning
+        """
+        description, cents = read_scala(file_path)
+        if len(cents) != 12 or abs(cents[-1] - 1200) > 0.01:
+            raise ValueError("Only 12-note scales repeating at the octave (2/1) are supported")
+        return cls(reference, [0.0] + cents[:-1], key=key, reference_note=reference_note,
+                   name=description or file_path)
+    
+    def __repr__(self):
+        return (f"TuningSystem({self.name!r}, {self.reference_note}={self.reference:g} Hz, "
+                f"key={self.key!r})")
+    
+    @property
+    def note_frequencies(self):
+        """dict: Frequency of every note by name"""
+        return dict(zip(self.names, self.frequencies.tolist()))
+    
+    def params(self):
+        """
+        Returns:
+            dict: JSON-serializable description of the note table (for cache keys)
+        """
+        return {'reference': self.reference, 'reference_note': self.reference_note,
+                'key': self.key, 'offsets': [round(c, 6) for c in self.offsets.tolist()]}
+    
+    def note_frequency(self, note):
+        """
+        Args:
+            note (str): Note name (e.g., 'A4', 'C#3')
+            
+        Returns:
+            float: Frequency of the note in Hz
+        """
+        pitch_class, octave = parse_note_name(note)
+        if not MIN_OCTAVE <= octave <= MAX_OCTAVE:
+            raise ValueError(f"Note outside the table: {note}")
+        return float(self.frequencies[12 * (octave - MIN_OCTAVE) + pitch_class])
+    
+    def nearest_note(self, frequency):
+        """
+        Closest note of this tuning to a frequency
+        
+        Args:
+            frequency (float or numpy.array): Frequency in Hz, or an array of
+                frequencies to map in a single vectorized call
+                
+        Returns:
+            tuple: (note_name, exact_frequency, cents_deviation). For array
+                input each element is an array of the same shape; entries for
+                non-positive frequencies are None / NaN.
+        """
+        if np.ndim(frequency) > 0:
+            return self._nearest_notes(np.asarray(frequency, dtype=np.float64))
+        
+        if not frequency > 0 or not np.isfinite(frequency):
+            return None, None, None
+        
+        log2_freq = np.log2(frequency)
+        idx = np.searchsorted(self.boundaries, log2_freq)
+        
+        # Calculate cents deviation (100 cents = 1 equal-tempered semitone)
+        cents = 1200 * (log2_freq - self.log2_frequencies[idx])
+        
+        return self.names[idx], float(self.frequencies[idx]), float(cents)
+    
+    def _nearest_notes(self, frequencies):
+        """Vectorized form of nearest_note for numpy arrays"""
+        valid = np.isfinite(frequencies) & (frequencies > 0)
+        log2_freqs = np.log2(frequencies, out=np.full(frequencies.shape, np.nan), where=valid)
+        idx = np.searchsorted(self.boundaries, np.where(valid, log2_freqs, 0.0))
+        
+        notes = np.where(valid, self.names[idx], None)
+        exact_freqs = np.where(valid, self.frequencies[idx], np.nan)
+        cents = 1200 * (log2_freqs - self.log2_frequencies[idx])
+        
+        return notes, exact_freqs, cents
+
+
+def get_tuning(temperament='equal', reference=DEFAULT_REFERENCE, key='C'):
+    """
+    Tuning from command-line style options
+    
+    Args:
+        temperament (str): Name from TEMPERAMENTS or path to a .scl file
+        reference (float): Frequency of A4 in Hz
+        key (str): Note the temperament is built on
+        
+    Returns:
+        TuningSystem: The tuning
+    """
+    if temperament.lower().endswith('.scl'):
+        return TuningSystem.from_scala(temperament, reference, key=key)
+    return TuningSystem(reference, temperament, key=key)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Print the note table of a tuning")
+    parser.add_argument('--temperament', default='equal',
+                        help=f"{', '.join(TEMPERAMENTS)} or a Scala .scl file (default: equal)")
+    parser.add_argument('--reference', type=float, default=DEFAULT_REFERENCE,
+                        help="Frequency of A4 in Hz (default: 440)")
+    parser.add_argument('--key', choices=NOTE_NAMES, default='C',
+                        help="Note the temperament is built on (default: C)")
+    parser.add_argument('--octave', type=int, default=4, help="Octave to print (default: 4)")
+    args = parser.parse_args()
+    
+    tuning = get_tuning(args.temperament, args.reference, args.key)
+    equal = TuningSystem(args.reference)
+    print(tuning)
+    print(f"{'Note':<6} {'Frequency':>12} {'vs equal':>9}")
+    for note in NOTE_NAMES:
+        name = f"{note}{args.octave}"
+        frequency = tuning.note_frequency(name)
+        deviation = 1200 * np.log2(frequency / equal.note_frequency(name))
+        print(f"{name:<6} {frequency:9.3f} Hz {deviation:+8.1f}c")
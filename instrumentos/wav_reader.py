@@ -0,0 +1,314 @@
+"""
+WAV Reader Module
+Memory-mapped WAV access with per-chunk mono downmix and float conversion
+"""
+
+import copy
+import struct
+import numpy as np
+from instrumentation import count
+
+
+# WAVE format tags we know how to decode
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Default number of frames converted at once when materializing a view
+DEFAULT_CHUNK_SIZE = 1 << 18
+
+
+def read_wav_header(file_path):
+    """
+    Parse the RIFF header of a WAV file without reading the sample data
+    
+    Args:
+        file_path (str): Path to WAV file
+        
+    Returns:
+        dict: Header information containing:
+            - 'sample_rate': Sample rate in Hz
+            - 'channels': Number of interleaved channels
+            - 'sample_width': Bytes per sample (container size)
+            - 'format_tag': WAVE_FORMAT_PCM or WAVE_FORMAT_IEEE_FLOAT
+            - 'data_offset': Byte offset of the first sample
+            - 'num_samples': Number of frames (samples per channel)
+    """
+    with open(file_path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError("Not a RIFF/WAVE file")
+        
+        fmt = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError("No data chunk found")
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+            
+            if chunk_id == b'fmt ':
+                fmt_data = f.read(chunk_size)
+                format_tag, channels, sample_rate, _, block_align, bits = \
+                    struct.unpack('<HHIIHH', fmt_data[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_data) >= 26:
+                    # The real format is the first two bytes of the SubFormat GUID
+                    format_tag = struct.unpack('<H', fmt_data[24:26])[0]
+                fmt = (format_tag, channels, sample_rate, block_align, bits)
+                if chunk_size % 2:
+                    f.seek(1, 1)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError("Data chunk found before fmt chunk")
+                data_offset = f.tell()
+                break
+            else:
+                # Chunks are word aligned
+                f.seek(chunk_size + chunk_size % 2, 1)
+    
+    format_tag, channels, sample_rate, block_align, bits = fmt
+    if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        raise ValueError(f"Unsupported WAV format tag: {format_tag:#06x}")
+    if channels < 1 or block_align < channels:
+        raise ValueError("Invalid WAV fmt chunk")
+    
+    sample_width = block_align // channels
+    if format_tag == WAVE_FORMAT_PCM and sample_width not in (1, 2, 3, 4):
+        raise ValueError(f"Unsupported PCM sample width: {sample_width} bytes")
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and sample_width not in (4, 8):
+        raise ValueError(f"Unsupported float sample width: {sample_width} bytes")
+    
+    # Some writers leave the data size at 0 or 0xFFFFFFFF while streaming,
+    # so never trust it past the end of the file
+    with open(file_path, 'rb') as f:
+        f.seek(0, 2)
+        available = f.tell() - data_offset
+    data_size = min(chunk_size, available)
+    
+    return {
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'sample_width': sample_width,
+        'format_tag': format_tag,
+        'data_offset': data_offset,
+        'num_samples': data_size // block_align
+    }
+
+
+def to_float32(samples):
+    """
+    Scale integer or float samples to float32 in [-1.0, 1.0)
+    
+    Args:
+        samples (numpy.array): Samples in their native dtype. 24-bit data
+            must already be left-justified into int32.
+        
+    Returns:
+        numpy.array: float32 samples (a new array)
+    """
+    if samples.dtype == np.uint8:
+        out = samples.astype(np.float32)
+        out -= 128.0
+        out /= 128.0
+    elif samples.dtype.kind == 'i':
+        out = samples.astype(np.float32)
+        out /= float(2 ** (8 * samples.dtype.itemsize - 1))
+    else:
+        out = samples.astype(np.float32)
+    return out
+
+
+def to_mono_float32(samples):
+    """
+    Downmix (frames, channels) samples to mono and convert to float32
+    
+    The channel mean is accumulated directly in float32, so no float64
+    copy of the block is ever made.
+    
+    Args:
+        samples (numpy.array): 1-D mono or 2-D (frames, channels) samples
+        
+    Returns:
+        numpy.array: Mono float32 samples
+    """
+    if samples.ndim > 1 and samples.shape[1] > 1:
+        mono = samples.mean(axis=1, dtype=np.float32)
+        if samples.dtype == np.uint8:
+            mono -= 128.0
+            mono /= 128.0
+        elif samples.dtype.kind == 'i':
+            mono /= float(2 ** (8 * samples.dtype.itemsize - 1))
+        return mono
+    
+    return to_float32(samples.reshape(-1))
+
+
+class AudioView:
+    """
+    Lazy, memory-mapped view of a WAV file as mono float32 samples
+    
+    Nothing is decoded up front: indexing or iterating reads only the
+    frames requested from the memory map, downmixes them to mono and
+    scales them to float32 on demand. Supports 8/16/24/32-bit PCM and
+    32/64-bit float data with any number of channels.
+    
+    With mono=False the view instead returns (frames, channels) blocks in
+    the file's native dtype, leaving conversion to the caller.
+    """
+    
+    def __init__(self, file_path, mono=True):
+        """
+        Open a WAV file as a lazy view
+        
+        Args:
+            file_path (str): Path to WAV file
+            mono (bool): Downmix to mono float32 (False: native
+                (frames, channels) samples)
+        """
+        header = read_wav_header(file_path)
+        
+        self.file_path = file_path
+        self.mono = mono
+        self.sample_rate = header['sample_rate']
+        self.channels = header['channels']
+        self.sample_width = header['sample_width']
+        self.num_samples = header['num_samples']
+        
+        if header['format_tag'] == WAVE_FORMAT_IEEE_FLOAT:
+            native = np.dtype(f'<f{self.sample_width}')
+        elif self.sample_width == 1:
+            native = np.dtype(np.uint8)
+        elif self.sample_width == 3:
+            native = None
+        else:
+            native = np.dtype(f'<i{self.sample_width}')
+        
+        # 24-bit samples have no numpy dtype: map raw bytes and repack per chunk
+        if native is None:
+            self.dtype = np.dtype('<i4')
+            shape = (self.num_samples, self.channels, 3)
+            map_dtype = np.uint8
+        else:
+            self.dtype = native
+            shape = (self.num_samples, self.channels)
+            map_dtype = native
+        
+        if self.num_samples > 0:
+            self._raw = np.memmap(file_path, dtype=map_dtype, mode='r',
+                                  offset=header['data_offset'], shape=shape)
+        else:
+            self._raw = np.zeros(shape, dtype=map_dtype)
+    
+    def __len__(self):
+        return self.num_samples
+    
+    @property
+    def shape(self):
+        if self.mono:
+            return (self.num_samples,)
+        return (self.num_samples, self.channels)
+    
+    @property
+    def duration(self):
+        return self.num_samples / self.sample_rate
+    
+    def _native(self, raw):
+        """Convert a block of mapped frames to (frames, channels) native samples"""
+        count('bytes_read', raw.nbytes)
+        if raw.ndim == 3:
+            padded = np.zeros(raw.shape[:2] + (4,), dtype=np.uint8)
+            padded[..., 1:] = raw
+            return padded.view('<i4')[..., 0]
+        return raw
+    
+    def read_native(self, start=0, stop=None):
+        """
+        Read a range of frames in the native dtype with all channels
+        
+        Args:
+            start (int): First frame
+            stop (int): One past the last frame (default: end of file)
+            
+        Returns:
+            numpy.array: (frames, channels) samples
+        """
+        return np.array(self._native(self._raw[start:stop]))
+    
+    def read(self, start=0, stop=None):
+        """
+        Read a range of frames as mono float32
+        
+        Args:
+            start (int): First frame
+            stop (int): One past the last frame (default: end of file)
+            
+        Returns:
+            numpy.array: Mono float32 samples ((frames, channels) native
+                samples if the view was opened with mono=False)
+        """
+        return self._convert(self._raw[start:stop])
+    
+    def _convert(self, raw):
+        if self.mono:
+            return to_mono_float32(self._native(raw))
+        return np.array(self._native(raw))
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._convert(self._raw[key])
+        return self._convert(self._raw[key:key + 1 or None])[0]
+    
+    def select_channel(self, index):
+        """
+        View of a single channel of the file
+        
+        Args:
+            index (int): Channel number
+            
+        Returns:
+            AudioView: Mono view of that channel only (sharing the memory map)
+        """
+        if not -self.channels <= index < self.channels:
+            raise IndexError(f"Channel {index} out of range ({self.channels} channels)")
+        index %= self.channels
+        
+        view = copy.copy(self)
+        view._raw = self._raw[:, index:index + 1]
+        view.channels = 1
+        view.mono = True
+        return view
+    
+    def iter_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE, start=0, stop=None):
+        """
+        Iterate over the file as consecutive mono float32 chunks
+        
+        Args:
+            chunk_size (int): Frames per chunk
+            start (int): First frame
+            stop (int): One past the last frame (default: end of file)
+            
+        Yields:
+            numpy.array: Chunk as returned by read() (the last one may be shorter)
+        """
+        stop = self.num_samples if stop is None else min(stop, self.num_samples)
+        for chunk_start in range(start, stop, chunk_size):
+            yield self.read(chunk_start, min(chunk_start + chunk_size, stop))
+    
+    def __array__(self, dtype=None, copy=None):
+        if not self.mono:
+            out = self.read_native()
+            return out if dtype is None else out.astype(dtype, copy=False)
+        
+        # Materialize chunk by chunk into a single preallocated buffer
+        out = np.empty(self.num_samples, dtype=np.float32)
+        pos = 0
+        for chunk in self.iter_chunks():
+            out[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+        if dtype is not None:
+            out = out.astype(dtype, copy=False)
+        return out
+    
+    def close(self):
+        """Release the memory map"""
+        self._raw = np.zeros((0,) + self._raw.shape[1:], dtype=self._raw.dtype)
+        self.num_samples = 0